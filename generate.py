@@ -1,51 +1,222 @@
-# 학습된 모델 로드
-model = torch.hub.load('ultralytics/yolov11', 'custom', path='path/to/trained_model.pt')
+# generate.py
+#
+# 학습된 YOLO 가중치로 층 도면 이미지(1.jpg, 2.jpg ...)에서 노드를 검출해
+# graphmaker 와 같은 형식의 층 JSON(1f.json, 2f.json ...)을 만든다.
+#   - 큰 도면은 TILE_SIZE 타일(겹침 TILE_OVERLAP)로 잘라, 여러 층 이미지의 타일을 한 번에 배치 추론
+#   - 타일 겹침 구간의 중복 검출은 같은 유형끼리 중심 거리로 합침
+#   - 간선은 graphmaker 의 Auto Edges 와 같은 유형별 규칙(전체 그래프/auto_edges.py)으로 만든다:
+#     Corridor → 가장 가까운 Corridor 2개, 그 외 → 가장 가까운 Corridor 1개. 반경(m) 밖 후보는 버림
+#   - 최근접 / 중복 검출 탐색은 행 블록 단위로 계산해 n×n 거리 행렬을 만들지 않음
+#
+# 실행 예시:
+#   python generate.py --weights best.pt --images 제1공학관/4.jpg
+#   python generate.py --weights best.pt --folder 새건물 --scale 0.065
 
-# 객체 감지 및 JSON 생성 함수
-def create_json_from_image(image_path):
-    img = cv2.imread(image_path)
-    results = model(img)
-    detections = results.pandas().xyxy[0]  # 감지된 객체 데이터프레임
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 간선 규칙과 kNN 은 graphmaker 와 공유
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '전체 그래프'))
+from auto_edges import KNN_CHUNK, propose_edges
+
+# 학습(train.py)과 추론이 같은 타일 크기를 써야 검출 크기가 맞는다
+TILE_SIZE = 1024
+TILE_OVERLAP = 128
+
+EDGE_RADIUS_M = 15.0  # 이보다 먼 후보는 연결하지 않음 (m)
+MERGE_PX = 20.0      # 타일 겹침에서 같은 유형 검출 중심이 이 거리(px) 안이면 하나로 합침
+
+
+def tile_offsets(width, height, tile=TILE_SIZE, overlap=TILE_OVERLAP):
+    """이미지를 덮는 타일 좌상단 좌표 리스트. 마지막 타일은 이미지 끝에 맞춰 당긴다."""
+    def starts(n):
+        if n <= tile:
+            return [0]
+        step = tile - overlap
+        xs = list(range(0, n - tile, step))
+        return xs + [n - tile]
+    return [(x, y) for y in starts(height) for x in starts(width)]
+
+
+def neighbors_within(xy, radius):
+    """각 점에서 radius 안에 있는 점(자기 자신 포함)의 인덱스 배열 리스트. KNN_CHUNK 행씩 계산."""
+    out = []
+    for start in range(0, len(xy), KNN_CHUNK):
+        blk = xy[start:start + KNN_CHUNK]
+        d = np.hypot(blk[:, None, 0] - xy[None, :, 0], blk[:, None, 1] - xy[None, :, 1])
+        rows, cols = np.nonzero(d <= radius)
+        out.extend(np.split(cols, np.searchsorted(rows, np.arange(1, len(blk)))))
+    return out
+
+
+def build_edges(xy, types, scale, radius_m=EDGE_RADIUS_M):
+    """
+    노드 좌표(px)와 유형으로 희소 간선 (i, j, weight[m]) 리스트를 만든다 (i < j).
+    후보는 auto_edges.propose_edges (Corridor → Corridor k 개, 그 외 → 가장 가까운 Corridor)이고
+    radius_m 보다 먼 후보는 버린다.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    pairs = propose_edges(xy, types)
+    if len(pairs) == 0:
+        return []
+    diff = xy[pairs[:, 0]] - xy[pairs[:, 1]]
+    weights = np.hypot(diff[:, 0], diff[:, 1]) * scale
+    keep = weights <= radius_m
+    return [(int(i), int(j), float(w)) for (i, j), w in zip(pairs[keep], weights[keep])]
+
+
+def merge_detections(boxes, classes, confs, min_dist=MERGE_PX):
+    """같은 유형이고 중심이 min_dist 이내인 검출은 신뢰도가 높은 것 하나만 남긴다. 남길 인덱스 반환."""
+    centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], 1)
+    near = neighbors_within(centers, min_dist)
+    keep = []
+    dropped = np.zeros(len(boxes), dtype=bool)
+    for i in np.argsort(-confs):
+        if dropped[i]:
+            continue
+        keep.append(i)
+        js = near[i]
+        dropped[js[classes[js] == classes[i]]] = True
+    return np.array(sorted(keep), dtype=np.intp)
+
+
+def load_model(weights):
+    """로컬 가중치 파일로 YOLO 모델 로드 (네트워크 접근 없음)."""
+    from ultralytics import YOLO
+    return YOLO(weights)
+
+
+def detect_floors(model, image_paths, batch=16, conf=0.25):
+    """
+    여러 층 이미지를 타일로 잘라 배치 추론하고 이미지별 검출 결과를 반환.
+    반환값: {image_path: (boxes(n,4) 원본 좌표, classes(n,), confs(n,), (width, height))}
+    """
+    tiles = []  # (image_path, x0, y0)
+    images = {}
+    for path in image_paths:
+        img = cv2.imread(path)
+        if img is None:
+            raise FileNotFoundError(path)
+        images[path] = img
+        h, w = img.shape[:2]
+        tiles.extend((path, x, y) for x, y in tile_offsets(w, h))
+
+    found = {p: ([], [], []) for p in image_paths}
+    for start in range(0, len(tiles), batch):
+        chunk = tiles[start:start + batch]
+        crops = [images[p][y:y + TILE_SIZE, x:x + TILE_SIZE] for p, x, y in chunk]
+        results = model.predict(crops, imgsz=TILE_SIZE, conf=conf, verbose=False)
+        for (path, x, y), r in zip(chunk, results):
+            b = r.boxes
+            if len(b) == 0:
+                continue
+            found[path][0].append(b.xyxy.cpu().numpy() + np.array([x, y, x, y], dtype=np.float32))
+            found[path][1].append(b.cls.cpu().numpy().astype(int))
+            found[path][2].append(b.conf.cpu().numpy())
+
+    out = {}
+    for path, (boxes, classes, confs) in found.items():
+        h, w = images[path].shape[:2]
+        if not boxes:
+            out[path] = (np.empty((0, 4)), np.empty(0, dtype=int), np.empty(0), (w, h))
+            continue
+        boxes, classes, confs = np.concatenate(boxes), np.concatenate(classes), np.concatenate(confs)
+        keep = merge_detections(boxes, classes, confs)
+        out[path] = (boxes[keep], classes[keep], confs[keep], (w, h))
+    return out
+
+
+def floor_json(image_path, boxes, classes, names, scale):
+    """검출 결과를 graphmaker 층 JSON 형식(dict)으로 변환."""
+    xy = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], 1) if len(boxes) else np.empty((0, 2))
+    types = [names[int(c)] for c in classes]
+    # 사람이 보기 쉽게 위→아래, 왼→오른 순서로 id 부여
+    order = np.lexsort((xy[:, 0], xy[:, 1])) if len(xy) else np.empty(0, dtype=int)
+    xy = xy[order]
+    types = [types[i] for i in order]
 
     nodes = []
-    edges = []
-    node_id = 1
-
-    # 노드 생성
-    for _, row in detections.iterrows():
-        node = {
-            "id": node_id,
-            "name": f"{row['name']}{node_id}",
-            "type": row['name'],
-            "x": (row['xmin'] + row['xmax']) / 2,
-            "y": (row['ymin'] + row['ymax']) / 2
-        }
-        nodes.append(node)
-        node_id += 1
-
-    # 엣지 생성
-    for i in range(len(nodes)):
-        for j in range(i + 1, len(nodes)):
-            edge = {
-                "source": nodes[i]['id'],
-                "target": nodes[j]['id'],
-                "weight": ((nodes[i]['x'] - nodes[j]['x'])**2 + (nodes[i]['y'] - nodes[j]['y'])**2)**0.5
-            }
-            edges.append(edge)
-
-    json_data = {
+    for k, ((x, y), t) in enumerate(zip(xy.tolist(), types), start=1):
+        nodes.append({"id": k, "name": f"{t}{k}", "type": t, "x": x, "y": y})
+    edges = [{"source": i + 1, "target": j + 1, "weight": w} for i, j, w in build_edges(xy, types, scale)]
+    return {
         "background": Path(image_path).name,
-        "scale": 1.0,
+        "scale": scale,
         "nodes": nodes,
-        "edges": edges
+        "edges": edges,
     }
 
-    output_path = f"{Path(image_path).stem}.json"
-    with open(output_path, 'w') as f:
-        json.dump(json_data, f, indent=4)
-    return output_path
 
-# 새로운 이미지 처리
-new_image = '4.jpg'
-output_json = create_json_from_image(new_image)
-print(f"JSON 파일이 생성되었습니다: {output_json}")
+def output_path(image_path):
+    """4.jpg → 같은 폴더의 4f.json (graphmerge 가 읽는 이름)."""
+    p = Path(image_path)
+    return str(p.with_name(f"{p.stem}f.json"))
+
+
+def floor_scale(json_path, default):
+    """이미 있는 층 JSON 의 축척을 재사용, 없으면 default."""
+    if os.path.exists(json_path):
+        with open(json_path, 'r') as f:
+            return json.load(f).get('scale', default)
+    return default
+
+
+def create_json_from_images(model, image_paths, scale=1.0, batch=16, conf=0.25, force=False):
+    """이미지들을 한 번에 검출하고 층별 JSON 을 저장. 저장한 경로 리스트 반환."""
+    targets = []
+    for path in image_paths:
+        out = output_path(path)
+        if os.path.exists(out) and not force:
+            print(f"건너뜀 (이미 있음, --force 로 덮어쓰기): {out}")
+            continue
+        targets.append(path)
+    if not targets:
+        return []
+
+    detections = detect_floors(model, targets, batch=batch, conf=conf)
+    written = []
+    for path in targets:
+        boxes, classes, _, _ = detections[path]
+        out = output_path(path)
+        data = floor_json(path, boxes, classes, model.names, floor_scale(out, scale))
+        with open(out, 'w') as f:
+            json.dump(data, f, indent=4)
+        print(f"{out}: 노드 {len(data['nodes'])}개, 간선 {len(data['edges'])}개")
+        written.append(out)
+    return written
+
+
+def floor_images(folder):
+    """폴더의 층 도면 이미지(1.jpg, 2.jpg ...)를 층 번호 순으로."""
+    paths = [p for p in glob.glob(os.path.join(folder, '*.jpg')) if re.fullmatch(r'\d+', Path(p).stem)]
+    return sorted(paths, key=lambda p: int(Path(p).stem))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', required=True, help='학습된 YOLO 가중치 (.pt)')
+    parser.add_argument('--images', nargs='*', default=[], help='층 도면 이미지 경로들')
+    parser.add_argument('--folder', default=None, help='폴더의 모든 층 이미지(1.jpg, 2.jpg ...)를 한 번에 처리')
+    parser.add_argument('--scale', type=float, default=1.0, help='미터/픽셀 (기존 층 JSON 이 있으면 그 값을 사용)')
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--force', action='store_true', help='이미 있는 층 JSON 덮어쓰기')
+    args = parser.parse_args()
+
+    images = list(args.images)
+    if args.folder:
+        images += floor_images(args.folder)
+    if not images:
+        parser.error('--images 또는 --folder 가 필요합니다')
+
+    model = load_model(args.weights)
+    written = create_json_from_images(model, images, args.scale, args.batch, args.conf, args.force)
+    print(f"JSON 파일 {len(written)}개가 생성되었습니다")
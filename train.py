@@ -1,33 +1,162 @@
-import torch
-import cv2
+# train.py
+#
+# graphmaker 층 JSON(1f.json ...) + 층 도면 이미지로 YOLO 학습 데이터셋을 만들고, 로컬 가중치로 학습한다.
+#   - 노드 하나 = 유형별 고정 크기 박스 하나 (노드 좌표가 박스 중심)
+#   - 큰 도면은 generate.py 와 같은 타일(TILE_SIZE, 겹침 TILE_OVERLAP)로 잘라 타일마다 이미지/라벨 저장
+#   - 층 단위로 병렬 변환 (프로세스 풀), train/val 은 층 단위로 나눔 (같은 층의 타일이 양쪽에 섞이지 않게)
+#   - 학습은 로컬 가중치 파일만 사용 (torch.hub / 자동 다운로드 없음)
+#
+# 실행 예시:
+#   python train.py convert --folders "train data" 제1공학관 --out dataset
+#   python train.py train --data dataset/data.yaml --weights yolo11s.pt --epochs 100
+
+import argparse
+import glob
 import json
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# YOLOv11 모델 로드
-model = torch.hub.load('ultralytics/yolov11', 'yolov11s', pretrained=True)
+import cv2
+
+from generate import TILE_SIZE, TILE_OVERLAP, tile_offsets
+
+CLASSES = ['Room', 'Corridor', 'Restroom', 'Stair', 'Elevator', 'Door', 'Outside']
+# 유형별 박스 한 변 길이 (도면 픽셀)
+BOX_SIZES = {
+    'Room': 60,
+    'Corridor': 40,
+    'Restroom': 60,
+    'Stair': 80,
+    'Elevator': 60,
+    'Door': 40,
+    'Outside': 40,
+}
 
-# 학습 데이터 준비
-train_images = ['1.jpg', '2.jpg', '3.jpg']
-train_jsons = ['1.json', '2.json', '3.json']
 
-# JSON에서 레이블 추출
-def load_labels(json_path):
+def floor_pairs(folder):
+    """폴더의 (층 JSON, 배경 이미지) 쌍. 이미지는 JSON 의 background 파일명, 없으면 <n>.jpg."""
+    pairs = []
+    for json_path in glob.glob(os.path.join(folder, '*f.json')):
+        m = re.fullmatch(r'(\d+)f', Path(json_path).stem)
+        if not m:
+            continue
+        with open(json_path, 'r') as f:
+            bg = json.load(f).get('background', '')
+        candidates = [os.path.join(folder, os.path.basename(bg.replace('\\', '/')))] if bg else []
+        candidates.append(os.path.join(folder, f'{m.group(1)}.jpg'))
+        image = next((p for p in candidates if os.path.exists(p)), None)
+        if image:
+            pairs.append((json_path, image))
+    return sorted(pairs, key=lambda p: int(Path(p[0]).stem[:-1]))
+
+
+def tile_labels(nodes, x0, y0, tw, th):
+    """타일(x0, y0, tw, th) 안에 중심이 있는 노드들의 YOLO 라벨 줄 리스트 (박스는 타일 경계로 자름)."""
+    lines = []
+    for n in nodes:
+        cls = CLASSES.index(n['type'])
+        half = BOX_SIZES[n['type']] / 2
+        cx, cy = n['x'] - x0, n['y'] - y0
+        if not (0 <= cx < tw and 0 <= cy < th):
+            continue
+        l, t = max(cx - half, 0), max(cy - half, 0)
+        r, b = min(cx + half, tw), min(cy + half, th)
+        lines.append(f"{cls} {(l + r) / 2 / tw:.6f} {(t + b) / 2 / th:.6f} {(r - l) / tw:.6f} {(b - t) / th:.6f}")
+    return lines
+
+
+def convert_floor(json_path, image_path, out_dir, split):
+    """
+    층 하나를 타일 이미지 + 라벨로 저장. 프로세스 풀 워커에서 실행.
+    반환값: (저장한 타일 수, 라벨 수, 이미지 밖이거나 모르는 유형이라 건너뛴 노드 수)
+    """
     with open(json_path, 'r') as f:
         data = json.load(f)
-    labels = []
-    for node in data['nodes']:
-        labels.append({
-            'name': node['type'],
-            'x_center': node['x'],
-            'y_center': node['y']
-        })
-    return labels
-
-# 이미지와 레이블 매핑
-for img_path, json_path in zip(train_images, train_jsons):
-    img = cv2.imread(img_path)
-    labels = load_labels(json_path)
-    # train/images, train/labels
-    # YOLO 형식(.txt 파일)으로 변환 필요
-
-# 터미널에서 실행 예시: python train.py --img 640 --batch 16 --epochs 10 --data custom_data.yaml --weights yolov11s.pt
+    img = cv2.imread(image_path)
+    if img is None:
+        raise FileNotFoundError(image_path)
+    h, w = img.shape[:2]
+    nodes = [n for n in data.get('nodes', []) if n['type'] in BOX_SIZES and 0 <= n['x'] < w and 0 <= n['y'] < h]
+    skipped = len(data.get('nodes', [])) - len(nodes)
+
+    prefix = f"{Path(json_path).parent.name}_{Path(json_path).stem}".replace(' ', '_')
+    img_dir = os.path.join(out_dir, 'images', split)
+    lbl_dir = os.path.join(out_dir, 'labels', split)
+    tiles = labels = 0
+    for x0, y0 in tile_offsets(w, h, TILE_SIZE, TILE_OVERLAP):
+        crop = img[y0:y0 + TILE_SIZE, x0:x0 + TILE_SIZE]
+        lines = tile_labels(nodes, x0, y0, crop.shape[1], crop.shape[0])
+        name = f"{prefix}_{x0}_{y0}"
+        cv2.imwrite(os.path.join(img_dir, name + '.jpg'), crop)
+        with open(os.path.join(lbl_dir, name + '.txt'), 'w') as f:
+            f.write('\n'.join(lines) + ('\n' if lines else ''))
+        tiles += 1
+        labels += len(lines)
+    return tiles, labels, skipped
+
+
+def build_dataset(folders, out_dir='dataset', val_ratio=0.2, seed=0, workers=None):
+    """여러 건물 폴더의 층들을 병렬로 변환하고 data.yaml 경로를 반환."""
+    pairs = [p for folder in folders for p in floor_pairs(folder)]
+    if not pairs:
+        raise ValueError('변환할 층 JSON + 이미지 쌍이 없습니다')
+    random.Random(seed).shuffle(pairs)
+    n_val = max(1, round(len(pairs) * val_ratio)) if len(pairs) > 1 else 0
+    splits = ['val'] * n_val + ['train'] * (len(pairs) - n_val)
+    for split in ('train', 'val'):
+        os.makedirs(os.path.join(out_dir, 'images', split), exist_ok=True)
+        os.makedirs(os.path.join(out_dir, 'labels', split), exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convert_floor, j, i, out_dir, s) for (j, i), s in zip(pairs, splits)]
+        for ((json_path, _), split), fut in zip(zip(pairs, splits), futures):
+            tiles, labels, skipped = fut.result()
+            note = f", 건너뛴 노드 {skipped}개" if skipped else ''
+            print(f"[{split}] {json_path}: 타일 {tiles}개, 라벨 {labels}개{note}")
+
+    yaml_path = os.path.join(out_dir, 'data.yaml')
+    with open(yaml_path, 'w', encoding='utf-8') as f:
+        f.write(f"path: {os.path.abspath(out_dir)}\n")
+        f.write("train: images/train\n")
+        f.write("val: images/val\n" if n_val else "val: images/train\n")
+        f.write("names:\n")
+        for k, name in enumerate(CLASSES):
+            f.write(f"  {k}: {name}\n")
+    return yaml_path
+
+
+def train(data_yaml, weights, epochs=100, batch=16, device=None, project='runs'):
+    """로컬 가중치 파일에서 시작해 학습. 파일이 없으면 다운로드하지 않고 바로 실패한다."""
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f"가중치 파일이 없습니다: {weights} (로컬 .pt 경로를 지정하세요)")
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    return model.train(data=data_yaml, imgsz=TILE_SIZE, epochs=epochs, batch=batch,
+                       device=device, project=project)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('convert', help='층 JSON + 이미지 → YOLO 데이터셋')
+    p.add_argument('--folders', nargs='+', required=True)
+    p.add_argument('--out', default='dataset')
+    p.add_argument('--val-ratio', type=float, default=0.2)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--workers', type=int, default=None)
+    p = sub.add_parser('train', help='로컬 가중치로 학습')
+    p.add_argument('--data', default='dataset/data.yaml')
+    p.add_argument('--weights', required=True, help='시작 가중치 (.pt, 로컬 파일)')
+    p.add_argument('--epochs', type=int, default=100)
+    p.add_argument('--batch', type=int, default=16)
+    p.add_argument('--device', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        yaml_path = build_dataset(args.folders, args.out, args.val_ratio, args.seed, args.workers)
+        print(f"데이터셋 설정: {yaml_path}")
+    else:
+        train(args.data, args.weights, args.epochs, args.batch, args.device)
@@ -0,0 +1,82 @@
+# auto_edges.py
+#
+# 노드 좌표/유형으로 간선 후보를 만드는 규칙 (numpy 만 사용, Qt 없이 import 가능).
+#   - 유형마다 연결할 유형과 개수: Corridor → 가장 가까운 Corridor 2개, 나머지 → 가장 가까운 Corridor 1개
+#     (Outside → Door). 복도끼리 먼저 이어지므로 자동 생성한 층도 복도 축이 끊기지 않는다
+#   - 최근접 탐색은 행 블록 단위 kNN 이라 메모리가 KNN_CHUNK x (대상 유형 노드 수) 를 넘지 않음
+#   - graphmaker 의 Auto Edges 와 generate.py (도면 자동 디지타이징) 가 같은 규칙을 쓴다
+
+import numpy as np
+
+# Auto Edges: node type -> (type it links to, number of nearest such nodes); other types use DEFAULT_EDGE_RULE
+EDGE_RULES = {
+    'Corridor': ('Corridor', 2),
+    'Room': ('Corridor', 1),
+    'Restroom': ('Corridor', 1),
+    'Stair': ('Corridor', 1),
+    'Elevator': ('Corridor', 1),
+    'Door': ('Corridor', 1),
+    'Outside': ('Door', 1),
+}
+DEFAULT_EDGE_RULE = ('Corridor', 1)
+# beyond the nearest one, a proposed link may be at most this many times the median nearest spacing
+EDGE_MAX_FACTOR = 2.5
+KNN_CHUNK = 1024
+
+
+def knn(a, b, k, exclude_self=False):
+    """
+    Indices and distances of the k nearest rows of b for every row of a (both (n, 2) arrays),
+    sorted by distance. Squared distances are expanded as |a|^2 + |b|^2 - 2ab in row chunks,
+    so memory stays at KNN_CHUNK x len(b). exclude_self skips the diagonal when a is b.
+    """
+    k = min(k, len(b) - (1 if exclude_self else 0))
+    idx = np.empty((len(a), max(k, 0)), dtype=np.intp)
+    dist = np.empty((len(a), max(k, 0)))
+    if k <= 0:
+        return idx, dist
+    bb = (b * b).sum(1)
+    for start in range(0, len(a), KNN_CHUNK):
+        blk = a[start:start + KNN_CHUNK]
+        d2 = (blk * blk).sum(1)[:, None] + bb[None, :] - 2.0 * blk @ b.T
+        if exclude_self:
+            d2[np.arange(len(blk)), np.arange(start, start + len(blk))] = np.inf
+        part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        pd = np.take_along_axis(d2, part, 1)
+        order = np.argsort(pd, axis=1)
+        idx[start:start + len(blk)] = np.take_along_axis(part, order, 1)
+        dist[start:start + len(blk)] = np.sqrt(np.maximum(np.take_along_axis(pd, order, 1), 0))
+    return idx, dist
+
+
+def propose_edges(xy, types, existing=(), rules=EDGE_RULES, max_factor=EDGE_MAX_FACTOR):
+    """
+    Proposed edges as (m, 2) index pairs (i < j) over node coordinates xy (n, 2) and node
+    types. Each node links to the nearest node(s) of the type its rule allows; links past
+    the nearest one are dropped when longer than max_factor x the median nearest spacing
+    for that rule. Pairs already in existing (index pairs, any order) are left out.
+    """
+    types = np.asarray(types)
+    n = len(types)
+    found = []
+    for src_type in np.unique(types):
+        dst_type, k = rules.get(src_type, DEFAULT_EDGE_RULE)
+        src = np.flatnonzero(types == src_type)
+        dst = np.flatnonzero(types == dst_type)
+        same = src_type == dst_type
+        idx, dist = knn(xy[src], xy[dst], k, exclude_self=same)
+        if idx.size == 0:
+            continue
+        keep = np.ones(idx.shape, dtype=bool)
+        if idx.shape[1] > 1:
+            keep[:, 1:] = dist[:, 1:] <= max_factor * np.median(dist[:, 0])
+        pairs = np.stack([np.repeat(src, idx.shape[1]), dst[idx].ravel()], 1)[keep.ravel()]
+        found.append(pairs)
+    if not found:
+        return np.empty((0, 2), dtype=np.intp)
+    pairs = np.sort(np.concatenate(found), axis=1)
+    codes = np.unique(pairs[:, 0].astype(np.int64) * n + pairs[:, 1])
+    existing = np.sort(np.asarray(existing, dtype=np.int64).reshape(-1, 2), axis=1)
+    if len(existing):
+        codes = codes[~np.isin(codes, existing[:, 0] * n + existing[:, 1])]
+    return np.stack([codes // n, codes % n], 1).astype(np.intp)
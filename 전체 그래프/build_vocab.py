@@ -1,43 +1,56 @@
 # build_vocab.py
 
+import argparse
 import json
+from collections import Counter
 from tqdm import tqdm
 
-class MazeSeqDataset:
-    def __init__(self, data_path, token2idx=None, build_vocab=False):
-        self.pairs = []
-        self.token2idx = token2idx or {}
-        self.build_vocab = build_vocab
-        self._all_tokens = set()
+SPECIALS = ['<PAD>', '<SOS>', '<EOS>']
 
-        # 1) 데이터 읽기
-        with open(data_path, 'r', encoding='utf-8') as f:
-            lines = [l.strip() for l in f if l.strip()]
 
-        # 2) 토큰 수집
-        for line in tqdm(lines, desc="Scanning tokens"):
+def count_tokens(data_path):
+    """
+    training_data.txt 를 한 줄씩 스트리밍하며 토큰 빈도만 센다.
+    (start, end, 출력 토큰) 쌍은 메모리에 저장하지 않음.
+    """
+    counts = Counter()
+    with open(data_path, 'r', encoding='utf-8') as f:
+        for line in tqdm(f, desc="Scanning tokens"):
+            line = line.strip()
+            if not line:
+                continue
             lhs, rhs = line.split('|')
-            start_id, end_id = lhs.strip().split()
-            inp = [start_id, end_id]
-            out = rhs.strip().split()
-            self._all_tokens.update(inp)
-            self._all_tokens.update(out)
-            self.pairs.append((inp, out))
-
-        # 3) vocab 생성
-        specials = ['<PAD>','<SOS>','<EOS>']
-        idx = 0
-        for sp in specials:
-            self.token2idx[sp] = idx; idx += 1
-        for tok in sorted(self._all_tokens):
-            if tok not in self.token2idx:
-                self.token2idx[tok] = idx; idx += 1
-
-        print(f"Built vocab size = {len(self.token2idx)}")
+            counts.update(lhs.split())
+            counts.update(rhs.split())
+    return counts
+
+
+def build_token2idx(counts, min_count=1):
+    """특수 토큰 다음에 정렬된 토큰 순서로 인덱스 부여 (min_count 미만 토큰 제외)."""
+    token2idx = {}
+    for sp in SPECIALS:
+        token2idx[sp] = len(token2idx)
+    for tok in sorted(counts):
+        if counts[tok] >= min_count and tok not in token2idx:
+            token2idx[tok] = len(token2idx)
+    return token2idx
+
 
 if __name__ == '__main__':
-    DATA_PATH = 'training_data.txt'
-    ds = MazeSeqDataset(DATA_PATH, build_vocab=True)
-    with open('token2idx.json', 'w', encoding='utf-8') as f:
-        json.dump(ds.token2idx, f, ensure_ascii=False, indent=2)
-    print("Saved token2idx.json")
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='training_data.txt')
+    parser.add_argument('--out', default='token2idx.json')
+    parser.add_argument('--counts-out', default=None, help='토큰 빈도 JSON 저장 경로 (선택)')
+    args = parser.parse_args()
+
+    counts = count_tokens(args.data)
+    token2idx = build_token2idx(counts)
+    print(f"Built vocab size = {len(token2idx)}")
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(token2idx, f, ensure_ascii=False, indent=2)
+    print(f"Saved {args.out}")
+    if args.counts_out:
+        with open(args.counts_out, 'w', encoding='utf-8') as f:
+            json.dump(dict(counts.most_common()), f, ensure_ascii=False, indent=2)
+        print(f"Saved {args.counts_out}")
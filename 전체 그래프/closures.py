@@ -0,0 +1,99 @@
+# closures.py
+#
+# 운영 중 폐쇄(엘리베이터 점검, 청소 중인 통로)를 여러 프로세스가 공유하는 방법.
+#   - 폐쇄 목록은 그래프 옆 closures.json 한 파일 ({"version", "nodes": [...], "edges": [[a, b], ...]})
+#   - 쓰는 쪽은 임시 파일에 쓰고 os.replace 로 바꿔서, 읽는 쪽이 반쯤 쓴 파일을 보지 않게 한다
+#   - version 은 쓸 때마다 새로 매기는 세대 번호 (time.time_ns() 기준, 이전 값보다 항상 큼) 라서
+#     파일을 지웠다가 다시 써도 예전 값이 되풀이되지 않는다
+#   - 각 프로세스는 요청마다 ClosureBoard.sync(engine) 를 호출: 파일 (mtime, 크기) 를 먼저 비교하고(os.stat 한 번)
+#     바뀌었을 때만 읽은 뒤, version 이 마지막으로 반영한 것과 다를 때만 CompiledGraph.set_closures 로 반영
+#     → 다음 요청부터 모든 워커에 적용 (touch 나 같은 내용을 다시 복사한 경우는 다시 컴파일하지 않음)
+#   - 쓰는 쪽은 하나라고 가정 (관리용 엔드포인트 / 스크립트). 파일 잠금은 하지 않음
+#
+# 실행 예시:
+#   python closures.py close-node 산학협력관_1f_37
+#   python closures.py close-edge 산학협력관_1f_49 산학협력관_1f_48
+#   python closures.py open-node 산학협력관_1f_37
+#   python closures.py clear
+#   python closures.py show
+
+import argparse
+import json
+import os
+import time
+
+CLOSURES_FILE = 'closures.json'
+
+
+class ClosureBoard:
+    def __init__(self, path=CLOSURES_FILE):
+        self.path = path
+        self.seen = None      # 마지막으로 읽은 파일의 (mtime_ns, 크기), 파일이 없으면 -1
+        self.version = None   # 마지막으로 engine 에 반영한 version
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return {'version': 0, 'nodes': [], 'edges': []}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, data):
+        data['version'] = max(data.get('version', 0) + 1, time.time_ns())
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+        return data
+
+    def update(self, close_nodes=(), open_nodes=(), close_edges=(), open_edges=(), clear=False):
+        """현재 목록에 닫기/열기를 적용해 저장하고 새 목록을 반환."""
+        current = self.read()
+        nodes, edges = ([], []) if clear else (current['nodes'], current['edges'])
+        nodes = [n for n in nodes if n not in set(open_nodes)]
+        nodes += [n for n in close_nodes if n not in nodes]
+        opened = {frozenset(e) for e in open_edges}
+        edges = [e for e in edges if frozenset(e) not in opened]
+        have = {frozenset(e) for e in edges}
+        edges += [list(e) for e in close_edges if frozenset(e) not in have]
+        return self.write({'version': current['version'], 'nodes': nodes, 'edges': edges})
+
+    def sync(self, engine):
+        """파일이 바뀌었으면 engine 에 반영하고 set_closures 결과를, 아니면 None 을 반환."""
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = -1
+        if stamp == self.seen:
+            return None
+        self.seen = stamp
+        data = self.read()
+        if data['version'] == self.version:
+            return None
+        self.version = data['version']
+        return engine.set_closures(data['nodes'], [tuple(e) for e in data['edges']])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', choices=['close-node', 'open-node', 'close-edge', 'open-edge', 'clear', 'show'])
+    parser.add_argument('ids', nargs='*')
+    parser.add_argument('--file', default=CLOSURES_FILE)
+    args = parser.parse_args()
+
+    board = ClosureBoard(args.file)
+    if args.command in ('close-edge', 'open-edge') and len(args.ids) != 2:
+        parser.error('간선은 노드 id 두 개가 필요합니다')
+    if args.command == 'close-node':
+        data = board.update(close_nodes=args.ids)
+    elif args.command == 'open-node':
+        data = board.update(open_nodes=args.ids)
+    elif args.command == 'close-edge':
+        data = board.update(close_edges=[args.ids])
+    elif args.command == 'open-edge':
+        data = board.update(open_edges=[args.ids])
+    elif args.command == 'clear':
+        data = board.update(clear=True)
+    else:
+        data = board.read()
+    print(json.dumps(data, ensure_ascii=False, indent=2))
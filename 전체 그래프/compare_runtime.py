@@ -1,6 +1,11 @@
 # compare_runtime.py
+#
+# ROUTE_METRICS=1 로 실행하면 구간별 시간(그래프 JSON 로드, 다익스트라, format_path, 토큰화, 디코딩 step ...)과
+# 다익스트라 확장 노드 수 / 디코딩 step 수를 함께 출력하고 METRICS_OUT(기본 runtime_metrics.json)에 저장.
+# ROUTE_PROFILE=cprofile | torch 로 프로파일러 기록도 남길 수 있음 (metrics.py)
 
-import time, sys, json
+import os, time, sys, json
+import metrics
 from transformer_pathfinder import infer_sequence
 from pathfinder import shortest_path, format_path
 
@@ -46,5 +51,24 @@ def main():
 
     print(f"Dijkstra elapsed: {(t3-t2)*1000:.2f} ms")
 
+    if metrics.ENABLED:
+        print_breakdown(metrics.as_dict())
+        out = os.environ.get('METRICS_OUT', 'runtime_metrics.json')
+        metrics.dump_json(out)
+        print(f"metrics → {out}")
+
+# 5) 구간별 시간 / 개수 요약 (횟수, 합계, 평균)
+def print_breakdown(data):
+    print("\n=== Breakdown ===")
+    for name, h in sorted(data['histograms'].items()):
+        if not h['count']:
+            continue
+        if name.endswith('_seconds'):
+            print(f"{name[:-8]:<24} x{h['count']:<4} total {h['sum']*1000:9.2f} ms  avg {h['sum']/h['count']*1000:8.3f} ms")
+        else:
+            print(f"{name:<24} x{h['count']:<4} avg {h['sum']/h['count']:.1f}")
+    for name, v in sorted(data['counters'].items()):
+        print(f"{name:<24} {v}")
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,60 @@
+# distance_tokens.py
+#
+# 학습 시퀀스의 거리 토큰 인코딩.
+#   - 'round5' : 5m 단위 반올림 한 토큰 (D=125). 캠퍼스가 커질수록 토큰 종류가 늘어남 (기존 방식)
+#   - 'digits' : 자리수별 토큰 (D100=1 D10=2 D1=5). 자리당 10개, 거리 범위와 무관하게 vocab 고정
+#   - 'log'    : 로그 간격 버킷 대표값 한 토큰 (D=120). 먼 거리일수록 넓은 버킷
+
+import bisect
+
+DIST_ENCODINGS = ('round5', 'digits', 'log')
+
+# 'log' 인코딩의 버킷 대표값(m). 인접 대표값의 중간점이 버킷 경계가 된다.
+LOG_BUCKETS = [0, 5, 10, 15, 20, 25, 30, 40, 50, 60, 80, 100, 120, 160, 200, 250, 300, 400, 500, 650, 800, 1000]
+
+
+def round5(dist):
+    return int(round(dist / 5.0)) * 5
+
+
+def encode_distance(dist, encoding='round5', buckets=LOG_BUCKETS):
+    """거리(m)를 토큰 리스트로 변환."""
+    if encoding == 'round5':
+        return [f"D={round5(dist)}"]
+    if encoding == 'digits':
+        digits = str(round5(dist))
+        n = len(digits)
+        return [f"D{10 ** (n - 1 - k)}={d}" for k, d in enumerate(digits)]
+    if encoding == 'log':
+        i = bisect.bisect_left(buckets, dist)
+        if i == len(buckets):
+            i -= 1
+        elif i > 0 and dist - buckets[i - 1] <= buckets[i] - dist:
+            i -= 1
+        return [f"D={buckets[i]}"]
+    raise ValueError(f"Unknown distance encoding: {encoding}")
+
+
+def is_distance_token(tok):
+    return tok.startswith('D') and '=' in tok
+
+
+def token_distance(tok):
+    """거리 토큰 하나가 나타내는 거리(m). 'digits' 토큰은 자리값을 곱해 반환, 거리 토큰이 아니면 None."""
+    if not is_distance_token(tok):
+        return None
+    place, value = tok[1:].split('=', 1)
+    try:
+        return float(value) * (int(place) if place else 1)
+    except ValueError:
+        return None
+
+
+def distance_bounds(dist, encoding='round5', buckets=LOG_BUCKETS):
+    """디코딩한 거리값이 나타내는 실제 거리 구간 [lo, hi]."""
+    if encoding == 'log' and dist in buckets:
+        i = buckets.index(dist)
+        lo = (buckets[i - 1] + dist) / 2 if i > 0 else 0.0
+        hi = (dist + buckets[i + 1]) / 2 if i + 1 < len(buckets) else float('inf')
+        return lo, hi
+    return dist - 2.5, dist + 2.5
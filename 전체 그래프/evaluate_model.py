@@ -0,0 +1,282 @@
+# evaluate_model.py
+#
+# 검증 데이터에 대해 teacher forcing 없이(free-running) 배치 greedy 디코딩을 CPU 에서 실행하고
+# exact match / token accuracy / 거리 오차와 그래프 재생(replay) 유효성, 추론 비용을 JSON 리포트로 저장.
+#
+# 실행 예시:
+#   python evaluate_model.py --checkpoint transformer_maze_model.pt --out eval_report.json
+
+import argparse
+import heapq
+import json
+import os
+import time
+
+import torch
+from torch.utils.data import DataLoader, random_split
+
+from transformer_pathfinder import token2idx, idx2token, load_model, greedy_decode
+from pathfinder import nodes, engine
+from distance_tokens import DIST_ENCODINGS, distance_bounds, is_distance_token, token_distance
+from pipeline import require_fresh
+
+PAD, SOS, EOS = token2idx['<PAD>'], token2idx['<SOS>'], token2idx['<EOS>']
+
+# 거리 토큰 인덱스 → 거리(m) 룩업 테이블 (나머지 토큰은 0). 'digits' 토큰은 자리값이 곱해져 있어 합산하면 거리
+dist_table = torch.zeros(len(token2idx))
+for tok, idx in token2idx.items():
+    d = token_distance(tok)
+    if d is not None:
+        dist_table[idx] = d
+
+
+# -- 1) 데이터 로드 ------------------------------------------------------------------------------------------------
+
+def load_pairs(data_path):
+    """training_data.txt 를 한 줄씩 읽어 (입력 인덱스, 출력 인덱스) 리스트로 변환."""
+    data = []
+    with open(data_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            lhs, rhs = line.split('|')
+            ins = lhs.split()
+            outs = rhs.split()
+            in_idx = [SOS] + [token2idx[t] for t in ins] + [EOS]
+            out_idx = [SOS] + [token2idx[t] for t in outs] + [EOS]
+            data.append((in_idx, out_idx))
+    return data
+
+
+def collate_fn(batch):
+    in_seqs, out_seqs = zip(*batch)
+    max_in = max(len(s) for s in in_seqs)
+    max_out = max(len(s) for s in out_seqs)
+    in_batch = [s + [PAD] * (max_in - len(s)) for s in in_seqs]
+    out_batch = [s + [PAD] * (max_out - len(s)) for s in out_seqs]
+    return torch.tensor(in_batch, dtype=torch.long), torch.tensor(out_batch, dtype=torch.long)
+
+
+def pad_to(t, length):
+    if t.size(1) >= length:
+        return t
+    return torch.cat([t, t.new_full((t.size(0), length - t.size(1)), PAD)], dim=1)
+
+
+# -- 2) 그래프 재생(replay) 유효성 검사 ------------------------------------------------------------------------------
+
+# path_to_feature_sequence 는 (u, v) 사이 중복 간선 중 처음 나온 weight 를 거리로 쓰므로 동일하게 맞춤
+# (엔진 CSR 은 출발 노드별 입력 순서를 유지하므로 앞에서부터 setdefault 하면 처음 나온 weight 가 남는다)
+first_weight = {}
+for src, tgt, wt in zip(engine.sources.tolist(), engine.indices.tolist(), engine.weights.tolist()):
+    first_weight.setdefault(engine.ids[src], {}).setdefault(engine.ids[tgt], wt)
+
+# 이름 → 노드 ID 목록 (token_to_graphid.json 은 중복 이름을 마지막 것으로 덮어씀)
+name_ids = {}
+for nid, n in nodes.items():
+    name_ids.setdefault(n['name'], []).append(nid)
+
+_reach_cache = {}
+
+def _stop_distances(u):
+    """
+    u 에서 출발해 Corridor 노드만 경유하여 도달 가능한 노드까지의 최단 거리.
+    compress_stops 는 Corridor 가 아닌 노드를 모두 정류장으로 남기므로
+    두 정류장 사이의 중간 노드는 항상 Corridor 이다.
+    """
+    if u in _reach_cache:
+        return _reach_cache[u]
+    dist = {u: 0.0}
+    pq = [(0.0, u)]
+    while pq:
+        d, x = heapq.heappop(pq)
+        if d > dist[x]:
+            continue
+        if x != u and nodes[x]['type'] != 'Corridor':
+            continue
+        for v, w in first_weight.get(x, {}).items():
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heapq.heappush(pq, (nd, v))
+    _reach_cache[u] = dist
+    return dist
+
+
+def parse_steps(tokens):
+    """'D=.. TYPE=.. [TURN_*]' 토큰을 (거리, 타입) 스텝 리스트로 변환. 형식이 틀리면 None."""
+    steps = []
+    i = 0
+    while i < len(tokens) and tokens[i] != 'END':
+        d = None
+        while i < len(tokens) and is_distance_token(tokens[i]):
+            td = token_distance(tokens[i])
+            if td is None:
+                return None
+            d = (d or 0.0) + td
+            i += 1
+        if d is None or i >= len(tokens) or not tokens[i].startswith('TYPE='):
+            return None
+        steps.append((d, tokens[i][5:]))
+        i += 1
+        if i < len(tokens) and tokens[i] in ('TURN_LEFT', 'TURN_RIGHT'):
+            i += 1
+    if i >= len(tokens) or not steps:
+        return None
+    return steps
+
+
+def replay_route(tokens, start_ids, end_ids, dist_encoding='round5'):
+    """
+    예측 토큰 시퀀스를 그래프 위에서 재생한다.
+    각 스텝 (D, TYPE) 마다 현재 후보 정류장에서 거리 D 의 구간(distance_bounds) 안에 있는 TYPE 노드를 다음 후보로 삼고,
+    마지막 후보 집합이 end_ids 와 겹치면 유효한 경로로 판단.
+    같은 이름의 방이 여러 개일 수 있으므로 시작/도착은 노드 ID 집합으로 받는다.
+    후보 집합은 한 층의 같은 타입 노드 수로 제한되고 노드별 거리표는 캐시된다.
+    """
+    steps = parse_steps(tokens)
+    if steps is None:
+        return False
+    frontier = set(start_ids)
+    for d, ntype in steps:
+        lo, hi = distance_bounds(d, dist_encoding)
+        lo, hi = lo - 1e-6, hi + 1e-6
+        nxt = set()
+        for u in frontier:
+            for v, dv in _stop_distances(u).items():
+                if v != u and nodes[v]['type'] == ntype and lo <= dv <= hi:
+                    nxt.add(v)
+        if not nxt:
+            return False
+        frontier = nxt
+    return not frontier.isdisjoint(end_ids)
+
+
+# -- 3) 평가 ------------------------------------------------------------------------------------------------------
+
+@torch.no_grad()
+def evaluate(model, loader, max_len=100, dist_encoding='round5'):
+    """배치 단위로 디코딩하고 모든 지표를 텐서 연산으로 누적."""
+    n = n_exact = n_tok = n_tok_correct = n_valid = n_steps = 0
+    abs_err_sum = 0.0
+    n_dist_exact = 0
+    len_total = torch.zeros(max_len + 2, dtype=torch.long)
+    len_exact = torch.zeros(max_len + 2, dtype=torch.long)
+    decode_s = 0.0
+
+    for src, tgt in loader:
+        t0 = time.perf_counter()
+        pred = greedy_decode(model, src, max_len=max_len)
+        decode_s += time.perf_counter() - t0
+        n_steps += pred.size(1) - 1
+
+        T = max(pred.size(1), tgt.size(1))
+        pred, tgt = pad_to(pred, T)[:, 1:], pad_to(tgt, T)[:, 1:]
+        mask = tgt != PAD
+
+        exact = (pred == tgt).all(dim=1)
+        lengths = mask.sum(dim=1) - 1   # <EOS> 제외 토큰 수
+        len_total += torch.bincount(lengths, minlength=len_total.numel())[:len_total.numel()]
+        len_exact += torch.bincount(lengths[exact], minlength=len_exact.numel())[:len_exact.numel()]
+
+        n += src.size(0)
+        n_exact += int(exact.sum())
+        n_tok += int(mask.sum())
+        n_tok_correct += int(((pred == tgt) & mask).sum())
+
+        dist_err = (dist_table[pred].sum(dim=1) - dist_table[tgt].sum(dim=1)).abs()
+        abs_err_sum += float(dist_err.sum())
+        n_dist_exact += int((dist_err == 0).sum())
+
+        # 그래프 재생은 경로마다 탐색이 필요하므로 행 단위로 수행 (exact match 는 자명하게 유효)
+        for i in range(src.size(0)):
+            if exact[i]:
+                n_valid += 1
+                continue
+            start_tok, end_tok = idx2token[int(src[i, 1])], idx2token[int(src[i, 2])]
+            row = pred[i].tolist()
+            if EOS not in row:
+                continue
+            toks = [idx2token[t] for t in row[:row.index(EOS)]]
+            if replay_route(toks, name_ids.get(start_tok, ()), name_ids.get(end_tok, ()), dist_encoding):
+                n_valid += 1
+
+    lengths = torch.nonzero(len_total).flatten().tolist()
+    return {
+        'metrics': {
+            'num_sequences': n,
+            'exact_match': n_exact / max(n, 1),
+            'token_accuracy': n_tok_correct / max(n_tok, 1),
+            'distance_mae_m': abs_err_sum / max(n, 1),
+            'distance_exact_rate': n_dist_exact / max(n, 1),
+            'graph_valid_rate': n_valid / max(n, 1),
+            'length_wise_exact_match': {
+                str(L): int(len_exact[L]) / int(len_total[L]) for L in lengths
+            },
+        },
+        'inference': {
+            'total_decode_s': decode_s,
+            'ms_per_sequence': decode_s * 1000 / max(n, 1),
+            'sequences_per_s': n / decode_s if decode_s else 0.0,
+            'mean_decode_steps_per_batch': n_steps / max(len(loader), 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transformer pathfinder 검증셋 평가')
+    parser.add_argument('--data', default='training_data.txt')
+    parser.add_argument('--checkpoint', default='transformer_maze_model.pt')
+    parser.add_argument('--dist-encoding', choices=DIST_ENCODINGS, default='round5',
+                        help='학습 데이터 생성 시 사용한 거리 토큰 인코딩')
+    parser.add_argument('--val-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-len', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=0, help='검증 샘플 수 제한 (0 = 전체)')
+    parser.add_argument('--threads', type=int, default=0, help='torch CPU 스레드 수 (0 = 기본값)')
+    parser.add_argument('--out', default='eval_report.json')
+    args = parser.parse_args()
+
+    # 그래프보다 오래된 token2idx / 학습 데이터로 평가하지 않도록 먼저 확인
+    require_fresh([os.path.basename(p) for p in (args.data, 'token2idx.json', 'token_to_graphid.json')])
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    cpu = torch.device('cpu')
+    model = load_model(args.checkpoint, map_location=cpu)
+
+    full = load_pairs(args.data)
+    val_len = max(1, int(len(full) * args.val_ratio))
+    _, val_ds = random_split(full, [len(full) - val_len, val_len],
+                             generator=torch.Generator().manual_seed(args.seed))
+    if args.limit:
+        val_ds = torch.utils.data.Subset(val_ds, range(min(args.limit, len(val_ds))))
+    loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False, collate_fn=collate_fn)
+
+    report = evaluate(model, loader, max_len=args.max_len, dist_encoding=args.dist_encoding)
+    report['checkpoint'] = {
+        'path': args.checkpoint,
+        'bytes': os.path.getsize(args.checkpoint),
+        'num_parameters': sum(p.numel() for p in model.parameters()),
+        'vocab_size': len(token2idx),
+    }
+    report['inference'].update({
+        'device': 'cpu',
+        'threads': torch.get_num_threads(),
+        'batch_size': args.batch_size,
+    })
+    report['split'] = {'val_ratio': args.val_ratio, 'seed': args.seed, 'num_val': len(val_ds)}
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    m = report['metrics']
+    print(f"exact={m['exact_match']:.4f} token_acc={m['token_accuracy']:.4f} "
+          f"dist_mae={m['distance_mae_m']:.2f}m valid={m['graph_valid_rate']:.4f} "
+          f"| {report['inference']['ms_per_sequence']:.2f} ms/seq")
+    print(f"Saved {args.out}")
+
+
+if __name__ == '__main__':
+    main()
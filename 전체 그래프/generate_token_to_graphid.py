@@ -8,10 +8,13 @@ def main():
         graph = json.load(f)
 
     # 2) token(name) → graph_id(id) 매핑 생성
+    #    같은 이름이 여러 노드에 있으면 마지막 노드로 덮어씀 (모든 후보가 필요하면 name_index.py 사용)
     mapping = {}
+    overwritten = 0
     for node in graph['nodes']:
         token = node['name']   # training_data.txt 의 start/end 에 쓰인 바로 그 토큰
         graph_id = node['id']  # pathfinder.py 가 내부적으로 쓰는 그래프의 노드 ID
+        overwritten += token in mapping
         mapping[token] = graph_id
 
     # 3) JSON 으로 저장
@@ -19,6 +22,8 @@ def main():
         json.dump(mapping, f, ensure_ascii=False, indent=2)
 
     print(f"token_to_graphid.json 생성 완료: 총 {len(mapping)}개 매핑")
+    if overwritten:
+        print(f"경고: 중복 이름 {overwritten}개는 마지막 노드로 덮어썼습니다")
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,15 @@
 # generate_training_data.py
+import gzip
 import json
 import math
 import heapq
 import os
+import argparse
+
+import numpy as np
+
+from distance_tokens import DIST_ENCODINGS, LOG_BUCKETS, encode_distance
+from graph_engine import turn_angles
 
 # -- 1) merged_graph.json 로드 및 그래프 초기화 ----------------------------------------------------------------
 
@@ -18,6 +25,13 @@ for e in graph['edges']:
     src, tgt, w = e['source'], e['target'], e['weight']
     adj.setdefault(src, []).append((tgt, w))
 
+# 회전 계산용 노드 배열: 경로 하나의 좌표를 모아 회전 각도를 한 번에 계산 (graph_engine.turn_angles)
+# 건물 번호는 id 의 첫 토큰 (예전 compute_turn 의 split('_')[0] 비교와 같음)
+node_pos = {nid: i for i, nid in enumerate(nodes)}
+node_x = np.array([n['x'] for n in nodes.values()], dtype=np.float64)
+node_y = np.array([n['y'] for n in nodes.values()], dtype=np.float64)
+node_building = np.unique([nid.split('_')[0] for nid in nodes], return_inverse=True)[1]
+
 
 # -- 2) Dijkstra 최단 경로 함수 ----------------------------------------------------------------------------------
 
@@ -60,81 +74,61 @@ def shortest_path(start_id, end_id):
 
 # -- 3) 회전(turn) 계산 함수 ---------------------------------------------------------------------------------------
 
+def path_turns(path_ids):
+    """
+    경로 전체의 회전을 한 번에 계산해 (angle, direction) 배열로 반환.
+    angle 은 각도(도, 다른 건물에 걸치거나 계산할 수 없으면 nan),
+    direction 은 +1 우회전, -1 좌회전, 0 직진 (같은 건물 안에서만 각도 계산, 양 끝 노드는 직진).
+    """
+    idx = [node_pos[nid] for nid in path_ids]
+    return turn_angles(node_x[idx], node_y[idx], node_building[idx])
+
+
 def compute_turn(prev_node, curr_node, next_node):
     """
-    prev->curr->next 노드를 보고 각도와 방향(좌/우)을 계산.
-    같은 복도(Corridor) 구간이어야 각도 계산. 아니면 '직진'으로 처리.
-    양-수(positive)일 때 우회전, 음-수(negative)일 때 좌회전.
+    prev->curr->next 노드 하나의 회전을 '90도 우회전' / '직진' 문자열로 (path_turns 를 세 노드에 적용).
     """
-    f1 = prev_node['id'].split('_')[0]
-    f2 = curr_node['id'].split('_')[0]
-    f3 = next_node['id'].split('_')[0]
-    if f1 != f2 or f2 != f3:
-        return '직진'
-    v1 = (curr_node['x'] - prev_node['x'], curr_node['y'] - prev_node['y'])
-    v2 = (next_node['x'] - curr_node['x'], next_node['y'] - curr_node['y'])
-    norm1 = math.hypot(*v1)
-    norm2 = math.hypot(*v2)
-    if norm1 == 0 or norm2 == 0:
+    angle, direction = path_turns([prev_node['id'], curr_node['id'], next_node['id']])
+    if direction[1] == 0:
         return '직진'
-    cos_a = max(-1, min(1, (v1[0]*v2[0] + v1[1]*v2[1]) / (norm1*norm2)))
-    angle = math.degrees(math.acos(cos_a))
-    if abs(angle - 180) < 10:
-        return '직진'
-    cross = v1[0]*v2[1] - v1[1]*v2[0]
-    direction = '우회전' if cross > 0 else '좌회전'
-    return f"{int(round(angle))}도 {direction}"
+    return f"{int(round(angle[1]))}도 {'우회전' if direction[1] > 0 else '좌회전'}"
 
 
 # -- 4) 중요 정류장(스톱)만 골라내는 함수 ----------------------------------------------------------------------------
 
-def compress_stops(path_ids):
+def compress_stops(path_ids, turns=None):
     """
     원본 path_ids(전체 노드 ID 리스트)에서
     중요 정류장만 뽑아낸 stops 리스트를 반환.
     Corridors 구간 중 회전(각도)이 생기는 노드 포함.
     엘리베이터/계단/Elevator/Stair/Room 등도 모두 포함.
+    turns: 이미 계산한 path_turns(path_ids) 결과 (없으면 여기서 계산)
     """
-    stops = [path_ids[0]]
-    L = len(path_ids)
-    for i in range(1, L - 1):
-        nid = path_ids[i]
-        ntype = nodes[nid]['type']
-        if ntype in ('Elevator', 'Stair'):
-            stops.append(nid)
-        elif ntype != 'Corridor':
-            stops.append(nid)
-        else:
-            # Corridor인데, 직진이 아닐 경우(=회전)
-            turn = compute_turn(nodes[path_ids[i-1]], nodes[nid], nodes[path_ids[i+1]])
-            if turn != '직진':
-                # 15도 이내 서로 평행 corridor 라면 무시
-                try:
-                    angle_val = int(turn.split('도')[0])
-                except:
-                    angle_val = None
-                if (angle_val is not None
-                    and angle_val <= 15
-                    and nodes[path_ids[i-1]]['type'] == 'Corridor'
-                    and nodes[path_ids[i+1]]['type'] == 'Corridor'):
-                    continue
-                stops.append(nid)
-    stops.append(path_ids[-1])
-    return stops
+    angle, direction = path_turns(path_ids) if turns is None else turns
+    corridor = np.array([nodes[nid]['type'] == 'Corridor' for nid in path_ids])
+    # Corridor인데 회전이 있으면 스톱. 단, 앞뒤도 corridor 이고 반올림한 각도가 15도 이내면(거의 평행) 무시
+    with np.errstate(invalid='ignore'):
+        slight = (np.rint(angle[1:-1]) <= 15) & corridor[:-2] & corridor[2:]
+    keep = ~corridor[1:-1] | ((direction[1:-1] != 0) & ~slight)
+    return [path_ids[0]] + [path_ids[i] for i in (np.flatnonzero(keep) + 1).tolist()] + [path_ids[-1]]
 
 
 # -- 5) stops 기반으로 “D=거리 TYPE=노드타입 TURN_DIR” 형태로 핵심 정보만 뽑는 함수 ----------------------------------------
 
-def path_to_feature_sequence(path_ids):
+def path_to_feature_sequence(path_ids, dist_encoding='round5', log_buckets=LOG_BUCKETS):
     """
     전체 path_ids 대신, compress_stops()를 거친 stops 리스트를 이용해서
     (거리, 타입, 회전 정보)만 남긴 토큰 시퀀스를 만들어 반환.
     - 거리(Distance)는 5m 단위로 반올림(round) → 정수로 출력
+      dist_encoding 으로 토큰 형태 선택 (distance_tokens.py 참고):
+      'round5' → D=125, 'digits' → D100=1 D10=2 D1=5, 'log' → D=120 (log_buckets 대표값)
     - TYPE=Room/Elevator/Stair/Corridor 등
     - 회전 정보: TURN_LEFT 또는 TURN_RIGHT (회전 각도는 무시)
     최종적으로 "D=xx TYPE=yy [TURN_LEFT|TURN_RIGHT]" 토큰들이 공백으로 분리된 리스트 형태로 반환.
     """
-    stops = compress_stops(path_ids)
+    turns = path_turns(path_ids)
+    direction = turns[1]
+    stops = compress_stops(path_ids, turns)
     tokens = []
 
     # 첫 번째 노드는 타입 정보만 붙이고 거리 정보는 뒤에서 붙이므로 생략
@@ -154,9 +148,8 @@ def path_to_feature_sequence(path_ids):
                 if v == path_ids[k + 1]:
                     dist += w
                     break
-        # 5m 단위 반올림
-        dist_rounded = int(round(dist / 5.0)) * 5
-        tokens.append(f"D={dist_rounded}")
+        # 거리 토큰 (기본: 5m 단위 반올림)
+        tokens.extend(encode_distance(dist, dist_encoding, log_buckets))
 
         # 2) 현재 스톱 타입
         ctype = nodes[curr_stop]['type']
@@ -165,15 +158,11 @@ def path_to_feature_sequence(path_ids):
         # 3) 회전 정보: curr_stop이 Corridor 구간일 때, 이전/다음 스톱이 모두 존재하면 회전 여부 계산
         if curr_stop not in (path_ids[0], path_ids[-1]) and ctype == 'Corridor':
             i_abs = path_ids.index(curr_stop)
-            turn = compute_turn(nodes[path_ids[i_abs - 1]],
-                                nodes[curr_stop],
-                                nodes[path_ids[i_abs + 1]])
-            if turn != '직진':
-                # 방향만 LEFT/RIGHT로 바꿔 붙이기
-                if '우회전' in turn:
-                    tokens.append("TURN_RIGHT")
-                elif '좌회전' in turn:
-                    tokens.append("TURN_LEFT")
+            # 방향만 LEFT/RIGHT로 붙이기
+            if direction[i_abs] > 0:
+                tokens.append("TURN_RIGHT")
+            elif direction[i_abs] < 0:
+                tokens.append("TURN_LEFT")
     # 마지막에 항상 END 토큰 붙이기
     tokens.append("END")
     return tokens
@@ -181,49 +170,351 @@ def path_to_feature_sequence(path_ids):
 
 # -- 6) 학습 데이터 파일 생성 함수 ----------------------------------------------------------------------------------
 
-def generate_training_file(output_txt_path):
+def shortest_path_tree(start_id, graph_adj=None):
+    """
+    start_id 에서 모든 노드까지 Dijkstra 를 끝까지 돌려 (dist, prev) dict 를 반환.
+    shortest_path() 와 같은 순서로 노드를 확정하므로 각 도착점까지의 경로도 동일하다.
+    """
+    graph_adj = adj if graph_adj is None else graph_adj
+    dist = {start_id: 0}
+    prev = {}
+    pq = [(0, start_id)]
+    visited = set()
+    while pq:
+        d, u = heapq.heappop(pq)
+        if u in visited:
+            continue
+        visited.add(u)
+        for v, w in graph_adj.get(u, []):
+            nd = d + w
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(pq, (nd, v))
+    return dist, prev
+
+
+def tree_path(prev, start_id, end_id):
+    """shortest_path_tree 의 prev 로 start_id → end_id 경로 복원. 경로가 없으면 빈 리스트."""
+    path = []
+    u = end_id
+    while u != start_id:
+        path.append(u)
+        u = prev.get(u, None)
+        if u is None:
+            return []
+    path.append(start_id)
+    return list(reversed(path))
+
+
+def index_path(output_txt_path):
+    return output_txt_path + '.idx.npz'
+
+
+def graph_snapshot_path(output_txt_path):
+    # .json 으로 끝나면 merge_all 이 건물 그래프로 착각할 수 있어서 gzip 으로 압축한 별도 확장자를 쓴다
+    return output_txt_path + '.graph.gz'
+
+
+def save_graph_snapshot(output_txt_path, graph):
+    path = graph_snapshot_path(output_txt_path)
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def load_graph(path):
+    """그래프 JSON 읽기 (생성 때 남긴 .gz 스냅샷 또는 --old-graph 로 준 일반 JSON)."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_index(output_txt_path, index):
+    tmp = index_path(output_txt_path) + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **index)
+    os.replace(tmp, index_path(output_txt_path))
+
+
+def load_index(output_txt_path):
+    path = index_path(output_txt_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+def generate_training_file(output_txt_path, dist_encoding='round5'):
     """
     merged_graph.json에 있는 모든 Room 노드의 가능한 쌍(combination)을 순회하며
     최단 경로를 뽑아 “시작_방_이름 끝_방_이름 | D=.. TYPE=.. … END” 형식으로
     output_txt_path에 한 줄씩 기록한다.
+    시작 방마다 최단 경로 트리를 한 번만 구하고, 증분 재생성(regenerate_incremental)에 쓰이도록
+    소스별 거리/선행 노드와 줄 위치를 인덱스(<output>.idx.npz)에, 사용한 그래프를 스냅샷(<output>.graph.gz)으로 남긴다.
     """
     # 먼저, Room 타입 노드 ID 리스트와 name 리스트 추출
     room_nodes = [n for n in nodes.values() if n['type'] == 'Room']
     room_ids = [n['id'] for n in room_nodes]
     room_names = {n['id']: n['name'] for n in room_nodes}  # id → name
 
-    # output 파일 열기
-    with open(output_txt_path, 'w', encoding='utf-8') as fout:
-        N = len(room_ids)
+    node_ids = list(nodes)
+    col = {nid: k for k, nid in enumerate(node_ids)}
+    N = len(room_ids)
+    dist_mat = np.full((N, len(node_ids)), np.inf)
+    pred_mat = np.full((N, len(node_ids)), -1, dtype=np.int32)
+    line_off = np.full((N, N), -1, dtype=np.int64)
+    line_len = np.zeros((N, N), dtype=np.int32)
+
+    # output 파일 열기 (줄 위치를 바이트 단위로 기록하므로 바이너리로 씀)
+    with open(output_txt_path, 'wb') as fout:
         for i in range(N):
+            start_id = room_ids[i]
+            start_name = room_names[start_id]
+            dist, prev = shortest_path_tree(start_id)
+            for v, d in dist.items():
+                dist_mat[i, col[v]] = d
+            for v, u in prev.items():
+                pred_mat[i, col[v]] = col[u]
+
             for j in range(N):
                 if i == j:
                     continue
-                start_id = room_ids[i]
                 end_id = room_ids[j]
-                start_name = room_names[start_id]
                 end_name = room_names[end_id]
 
                 # 최단 경로 구하기
-                path_ids = shortest_path(start_id, end_id)
+                path_ids = tree_path(prev, start_id, end_id)
                 if not path_ids:
                     continue  # 경로 없으면 스킵
 
                 # 핵심 feature 시퀀스로 변환
-                feat_tokens = path_to_feature_sequence(path_ids)
+                feat_tokens = path_to_feature_sequence(path_ids, dist_encoding)
                 feat_seq_str = " ".join(feat_tokens)
 
                 # 한 줄에 “시작_방_이름 끝_방_이름 | feat_seq END” 기록
-                fout.write(f"{start_name} {end_name} | {feat_seq_str}\n")
-
+                line = f"{start_name} {end_name} | {feat_seq_str}\n".encode('utf-8')
+                line_off[i, j] = fout.tell()
+                line_len[i, j] = len(line)
+                fout.write(line)
+
+    save_index(output_txt_path, {
+        'room_ids': np.array(room_ids),
+        'node_ids': np.array(node_ids),
+        'dist': dist_mat,
+        'pred': pred_mat,
+        'line_off': line_off,
+        'line_len': line_len,
+        'dist_encoding': np.array(dist_encoding),
+    })
+    save_graph_snapshot(output_txt_path, graph)
     print(f"[완료] 학습 데이터 파일을 생성했습니다: {output_txt_path}")
 
 
+# -- 7) 그래프 수정 후 바뀐 쌍만 다시 만드는 증분 재생성 ---------------------------------------------------------------
+
+def _edge_summary(graph_adj):
+    """{(u, v): (최소 weight, 처음 나온 weight)}. Dijkstra 는 최소값, 거리 토큰은 처음 나온 weight 를 쓴다."""
+    summary = {}
+    for u, lst in graph_adj.items():
+        for v, w in lst:
+            if (u, v) in summary:
+                mn, first = summary[(u, v)]
+                summary[(u, v)] = (min(mn, w), first)
+            else:
+                summary[(u, v)] = (w, w)
+    return summary
+
+
+def regenerate_incremental(output_txt_path, old_graph_path=None, dist_encoding='round5'):
+    """
+    이전 그래프(old_graph_path, 기본값은 생성 시 남긴 스냅샷)와 현재 merged_buildings_graph.json 을 비교해
+    영향받을 수 있는 시작 방만 골라 경로를 다시 구하고, 나머지 줄은 기존 파일에서 그대로 복사한다.
+
+    시작 방 s 가 영향받는 조건 (인덱스에 저장된 이전 거리 dist / 선행 노드 pred 로 한 번에 판정):
+      - 제거되었거나 weight 가 커진 간선 (u, v) 가 s 의 최단 경로 트리 간선 (pred[v] == u)
+      - 추가되었거나 weight 가 작아진 간선 (u, v, w) 가 dist[u] + w <= dist[v] 를 만족
+      - 거리 토큰에 쓰이는 첫 번째 weight 가 바뀐 간선이 트리 간선
+      - 타입/좌표/이름이 바뀐 노드에 s 가 도달 가능
+    영향받은 s 는 새 트리를 한 번 구하고, 도착점별로 경로와 관련 노드가 그대로면 기존 줄을 재사용한다.
+    결과 파일과 인덱스는 임시 파일에 쓴 뒤 교체한다. 반환값: 재계산/재사용 쌍 수 등 통계 dict.
+    """
+    index = load_index(output_txt_path)
+    old_graph_path = old_graph_path or graph_snapshot_path(output_txt_path)
+    if index is None or not os.path.exists(old_graph_path) or str(index['dist_encoding']) != dist_encoding:
+        print("[안내] 인덱스/이전 그래프가 없거나 거리 인코딩이 달라 전체를 다시 생성합니다.")
+        generate_training_file(output_txt_path, dist_encoding)
+        n = int((load_index(output_txt_path)['line_off'] >= 0).sum())
+        return {'pairs_recomputed': n, 'pairs_reused': 0, 'full_rebuild': True}
+
+    old_graph = load_graph(old_graph_path)
+    old_nodes = {n['id']: n for n in old_graph['nodes']}
+    old_adj = {}
+    for e in old_graph['edges']:
+        old_adj.setdefault(e['source'], []).append((e['target'], e['weight']))
+
+    old_node_ids = [str(x) for x in index['node_ids']]
+    old_col = {nid: k for k, nid in enumerate(old_node_ids)}
+    old_room_ids = [str(x) for x in index['room_ids']]
+    old_row = {rid: k for k, rid in enumerate(old_room_ids)}
+    dist_old, pred_old = index['dist'], index['pred']
+    line_off_old, line_len_old = index['line_off'], index['line_len']
+
+    # 1) 간선/노드 변경 집합
+    es_old, es_new = _edge_summary(old_adj), _edge_summary(adj)
+    inf_col = len(old_node_ids)   # 이전 그래프에 없던 노드 → 거리 inf 인 가상 열
+    inc_u, inc_v, dec_u, dec_v, dec_w = [], [], [], [], []
+    first_changed = set()   # 거리 토큰 값이 달라지는 간선
+    for (u, v), (mn, first) in es_old.items():
+        new = es_new.get((u, v))
+        if new is None or new[0] > mn or new[1] != first:
+            inc_u.append(old_col[u]); inc_v.append(old_col[v])
+        if new is not None and new[1] != first:
+            first_changed.add((u, v))
+    for (u, v), (mn, first) in es_new.items():
+        old = es_old.get((u, v))
+        if (old is None or mn < old[0]) and u in old_col:
+            dec_u.append(old_col[u]); dec_v.append(old_col.get(v, inf_col)); dec_w.append(mn)
+    changed_nodes = {
+        nid for nid, n in nodes.items()
+        if nid in old_nodes and any(n.get(k) != old_nodes[nid].get(k) for k in ('type', 'x', 'y', 'name'))
+    }
+    changed_nodes |= {nid for nid in old_nodes if nid not in nodes}
+    changed_cols = [old_col[nid] for nid in changed_nodes if nid in old_col]
+
+    # 2) 저장된 거리/트리로 영향받는 시작 방을 한꺼번에 판정
+    dist_ext = np.concatenate([dist_old, np.full((len(old_room_ids), 1), np.inf)], axis=1)
+    affected = np.zeros(len(old_room_ids), dtype=bool)
+    if inc_u:
+        affected |= (pred_old[:, inc_v] == np.array(inc_u)).any(axis=1)
+    if dec_u:
+        du = dist_ext[:, dec_u] + np.array(dec_w)
+        affected |= ((du <= dist_ext[:, dec_v]) & np.isfinite(du)).any(axis=1)
+    if changed_cols:
+        affected |= np.isfinite(dist_old[:, changed_cols]).any(axis=1)
+
+    # 3) 새 방 목록 기준으로 파일/인덱스 재작성
+    room_nodes = [n for n in nodes.values() if n['type'] == 'Room']
+    room_ids = [n['id'] for n in room_nodes]
+    room_names = {n['id']: n['name'] for n in room_nodes}
+    node_ids = list(nodes)
+    col = {nid: k for k, nid in enumerate(node_ids)}
+    N = len(room_ids)
+    dist_mat = np.full((N, len(node_ids)), np.inf)
+    pred_mat = np.full((N, len(node_ids)), -1, dtype=np.int32)
+    line_off = np.full((N, N), -1, dtype=np.int64)
+    line_len = np.zeros((N, N), dtype=np.int32)
+
+    # 이전 열 → 새 열 매핑 (없어진 노드는 -1)
+    shared_old = np.array([old_col[nid] for nid in node_ids if nid in old_col], dtype=np.int64)
+    shared_new = np.array([col[nid] for nid in node_ids if nid in old_col], dtype=np.int64)
+    old_to_new = np.full(len(old_node_ids) + 1, -1, dtype=np.int32)
+    old_to_new[shared_old] = shared_new
+
+    recomputed = reused = 0
+    sources_affected = 0
+    tmp_path = output_txt_path + '.tmp'
+    with open(output_txt_path, 'rb') as fold, open(tmp_path, 'wb') as fout:
+        for i, start_id in enumerate(room_ids):
+            oi = old_row.get(start_id)
+            fresh = oi is None or affected[oi]
+            if fresh:
+                sources_affected += 1
+                dist, prev = shortest_path_tree(start_id)
+                for v, d in dist.items():
+                    dist_mat[i, col[v]] = d
+                for v, u in prev.items():
+                    pred_mat[i, col[v]] = col[u]
+            else:
+                dist_mat[i, shared_new] = dist_old[oi, shared_old]
+                p = pred_old[oi, shared_old]
+                pred_mat[i, shared_new] = np.where(p >= 0, old_to_new[p], -1)
+
+            for j, end_id in enumerate(room_ids):
+                if i == j:
+                    continue
+                oj = old_row.get(end_id)
+                line = None
+                if fresh:
+                    path_ids = tree_path(prev, start_id, end_id)
+                    if not path_ids:
+                        continue
+                    if oi is not None and oj is not None and line_off_old[oi, oj] >= 0 \
+                       and changed_nodes.isdisjoint(path_ids) \
+                       and first_changed.isdisjoint(zip(path_ids, path_ids[1:])) \
+                       and path_ids == [old_node_ids[k] for k in _old_tree_path(pred_old[oi], old_col[start_id], old_col[end_id])]:
+                        fold.seek(line_off_old[oi, oj])
+                        line = fold.read(line_len_old[oi, oj])
+                        reused += 1
+                    else:
+                        feat_seq_str = " ".join(path_to_feature_sequence(path_ids, dist_encoding))
+                        line = f"{room_names[start_id]} {room_names[end_id]} | {feat_seq_str}\n".encode('utf-8')
+                        recomputed += 1
+                else:
+                    if oj is None or line_off_old[oi, oj] < 0:
+                        continue  # 영향 없는 소스에서 새 방은 도달 불가 (도달 가능했다면 추가 간선으로 영향 판정됨)
+                    fold.seek(line_off_old[oi, oj])
+                    line = fold.read(line_len_old[oi, oj])
+                    reused += 1
+                line_off[i, j] = fout.tell()
+                line_len[i, j] = len(line)
+                fout.write(line)
+    os.replace(tmp_path, output_txt_path)
+
+    save_index(output_txt_path, {
+        'room_ids': np.array(room_ids),
+        'node_ids': np.array(node_ids),
+        'dist': dist_mat,
+        'pred': pred_mat,
+        'line_off': line_off,
+        'line_len': line_len,
+        'dist_encoding': np.array(dist_encoding),
+    })
+    save_graph_snapshot(output_txt_path, graph)
+
+    stats = {
+        'pairs_recomputed': recomputed,
+        'pairs_reused': reused,
+        'sources_affected': sources_affected,
+        'sources_total': N,
+        'edges_changed': len(inc_u) + len(dec_u),
+        'nodes_changed': len(changed_nodes),
+        'full_rebuild': False,
+    }
+    print(f"[완료] 증분 재생성: {recomputed}쌍 재계산, {reused}쌍 재사용 "
+          f"(영향받은 시작 방 {sources_affected}/{N})")
+    return stats
+
+
+def _old_tree_path(pred_row, s_col, t_col):
+    """인덱스에 저장된 pred 행(열 번호)으로 이전 경로의 열 번호 리스트 복원."""
+    path = []
+    u = t_col
+    while u != s_col:
+        path.append(u)
+        u = pred_row[u]
+        if u < 0:
+            return []
+    path.append(s_col)
+    return path[::-1]
+
+
 if __name__ == '__main__':
     # 실행 예시:
     # python generate_training_data.py
-    output_path = "training_data.txt"
-    if os.path.exists(output_path):
+    # python generate_training_data.py --dist-encoding digits
+    # python generate_training_data.py --incremental            # 마지막 생성 때의 그래프 스냅샷과 비교
+    # python generate_training_data.py --incremental --old-graph old_merged.json
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default="training_data.txt")
+    parser.add_argument('--dist-encoding', choices=DIST_ENCODINGS, default='round5')
+    parser.add_argument('--incremental', action='store_true', help='이전 그래프 대비 바뀐 쌍만 다시 생성')
+    parser.add_argument('--old-graph', default=None)
+    args = parser.parse_args()
+    output_path = args.output
+    if args.incremental and os.path.exists(output_path):
+        regenerate_incremental(output_path, args.old_graph, args.dist_encoding)
+    elif os.path.exists(output_path):
         print(f"'{output_path}' 파일이 이미 존재합니다. 덮어쓰기를 원하면 삭제 후 다시 실행하세요.")
     else:
-        generate_training_file(output_path)
+        generate_training_file(output_path, args.dist_encoding)
@@ -0,0 +1,736 @@
+# graph_engine.py
+#
+# 경로 탐색에 쓰는 공용 그래프 엔진.
+#   - 노드 id 를 정렬 순서대로 0..N-1 정수 인덱스로 바꾸고, 간선을 CSR(indptr / indices / weights) 배열로 압축
+#   - 힙에는 (거리, 정수 인덱스) 를 넣는다. 인덱스 순서가 id 정렬 순서와 같아서
+#     거리가 같을 때의 선택(tie-break)이 기존 pathfinder 의 문자열 id 비교와 동일하다
+#   - pathfinder.py 와 graphmaker 의 경로 미리보기가 같은 구현을 사용
+#   - 연결 요소 라벨을 미리 계산해 두어 서로 다른 요소 사이의 "경로 없음" 은 탐색 없이 O(1) 로 판정
+#   - 가장 가까운 시설(화장실, 엘리베이터 ...)은 유형별 다중 출발 다익스트라 거리장(field)을 한 번 만들어 두고
+#     이후 질의는 다음 노드 포인터만 따라가서 답한다
+#   - 라우팅 프로필(휠체어 / 최단 시간 / 층 이동 최소)은 같은 CSR 위의 프로필별 가중치 배열로 표현.
+#     프로필을 바꿔도 그래프를 다시 만들지 않고, 연결 요소 / 거리장 같은 캐시는 프로필마다 따로 둔다
+#   - 노드/간선 폐쇄(set_closures)는 폐쇄 간선을 inf 로 바꾼 가중치로 프로필을 다시 만들고,
+#     캐시된 경로와 거리장 중 폐쇄된 간선을 실제로 지나던 것만 지운다 (간선 → 캐시 경로 역색인)
+#   - k 개의 대안 경로는 Yen 알고리즘. 도착점 기준 최단 경로 트리를 한 번 만들어 두고
+#     spur 경로는 트리를 그대로 따라갈 수 있으면 탐색 없이, 아니면 트리 거리를 휴리스틱으로 쓰는 A* 로 찾는다
+#   - 노드 속성은 NodeStore 의 배열로 보관 (유형 코드 uint8, 좌표 float32, 건물/층 번호 uint16, 이름 리스트).
+#     노드마다 dict 를 들고 있지 않아 건물이 늘고 워커 프로세스가 많아져도 메모리가 노드 수에 비례해 작게 유지되고,
+#     유형 비교는 정수 비교, 건물/층은 id 문자열을 다시 자르지 않고 번호로 비교한다.
+#     engine.nodes[nid] 는 예전 dict 처럼 n['type'], n.get('x') 로 읽을 수 있는 __slots__ 뷰를 돌려준다
+#   - turn_angles: 경로 하나의 회전 각도 / 좌우를 numpy 로 한 번에 계산 (pathfinder.format_path, 학습 데이터 생성이 공유)
+#   - 점대점 탐색의 확장 노드 / 힙 push 수, 경로 길이, 경로 캐시 적중은 metrics 로 기록 (ROUTE_METRICS=1 일 때만)
+
+import heapq
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+import metrics
+
+
+# 노드 유형. 여기 없는 유형은 NodeStore 가 뒤에 이어 붙여 코드를 준다 (이 순서의 코드는 항상 같음)
+NODE_TYPES = ('Room', 'Corridor', 'Stair', 'Elevator', 'Restroom', 'Door', 'Outside')
+TYPE_CODE = {t: k for k, t in enumerate(NODE_TYPES)}
+
+# 간선 종류: 같은 층 이동 / 층간 엘리베이터 / 층간 계단 / 같은 층에서 계단 노드로 드나드는 간선 / 건물 사이 도로
+EDGE_CLASSES = ('floor', 'elevator', 'stair', 'stair_access', 'road')
+
+WALK_SPEED = 1.3              # m/s
+STAIR_SECONDS = 15.0          # 계단 한 층
+ELEVATOR_SECONDS = 30.0       # 엘리베이터 대기 + 한 층
+FLOOR_CHANGE_PENALTY = 1000.0
+
+# 프로필 → {간선 종류: (배율, 더할 값) 또는 None(간선 제거)}. 적지 않은 종류는 (1, 0)
+PROFILES = {
+    'default': {},
+    'wheelchair': {'stair': None, 'stair_access': None},
+    'fastest': {
+        'floor': (1 / WALK_SPEED, 0.0),
+        'stair_access': (1 / WALK_SPEED, 0.0),
+        'road': (1 / WALK_SPEED, 0.0),
+        'elevator': (0.0, ELEVATOR_SECONDS),
+        'stair': (0.0, STAIR_SECONDS),
+    },
+    'fewest_floors': {'elevator': (1.0, FLOOR_CHANGE_PENALTY), 'stair': (1.0, FLOOR_CHANGE_PENALTY)},
+}
+
+
+def split_id(nid):
+    """'산학협력관_1f_3' → ('산학협력관', '1f'), 건물 병합 전 '1f_3' → ('', '1f'). 층을 모르면 None."""
+    parts = str(nid).split('_')
+    for k in range(len(parts) - 1):
+        if re.fullmatch(r'\d+f', parts[k]):
+            return '_'.join(parts[:k]), parts[k]
+    return None
+
+
+def turn_angles(x, y, group):
+    """
+    경로 전체의 회전을 한 번에 계산. x, y: 경로 순서대로의 노드 좌표, group: 노드별 건물 번호.
+    반환 (angle, direction), 둘 다 경로 길이 배열:
+      angle     prev→curr 와 curr→next 벡터 사이 각도(도). 앞뒤 노드가 다른 건물이거나 길이 0 이면 nan
+      direction +1 우회전, -1 좌회전, 0 직진 (양 끝, nan, 180±10도는 직진)
+    판정 기준은 예전 compute_turn 과 같다 (cross > 0 → 우회전).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    g = np.asarray(group)
+    n = len(x)
+    angle = np.full(n, np.nan)
+    direction = np.zeros(n, dtype=np.int8)
+    if n < 3:
+        return angle, direction
+    v1x, v1y = x[1:-1] - x[:-2], y[1:-1] - y[:-2]
+    v2x, v2y = x[2:] - x[1:-1], y[2:] - y[1:-1]
+    n1, n2 = np.hypot(v1x, v1y), np.hypot(v2x, v2y)
+    ok = (g[:-2] == g[1:-1]) & (g[1:-1] == g[2:]) & (n1 != 0) & (n2 != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_a = np.clip((v1x * v2x + v1y * v2y) / (n1 * n2), -1, 1)
+    a = np.where(ok, np.degrees(np.arccos(cos_a)), np.nan)
+    turning = ok & ~(np.abs(a - 180) < 10)
+    cross = v1x * v2y - v1y * v2x
+    angle[1:-1] = a
+    direction[1:-1] = np.where(turning, np.where(cross > 0, 1, -1), 0)
+    return angle, direction
+
+
+def connected_components(n, src, tgt):
+    """
+    간선 (src[i], tgt[i]) 를 무방향으로 본 연결 요소 라벨 (0..k-1, 길이 n 배열).
+    numpy 로 벡터화한 union-find: 간선 양 끝의 루트 중 큰 쪽을 작은 쪽에 붙이고(hook)
+    parent 를 parent[parent] 로 압축하는 과정을 모든 간선의 양 끝 루트가 같아질 때까지 반복한다.
+    """
+    parent = np.arange(n, dtype=np.int64)
+    src = np.asarray(src, dtype=np.int64)
+    tgt = np.asarray(tgt, dtype=np.int64)
+    while True:
+        ps, pt = parent[src], parent[tgt]
+        differ = ps != pt
+        if not differ.any():
+            break
+        lo, hi = np.minimum(ps[differ], pt[differ]), np.maximum(ps[differ], pt[differ])
+        # 압축 후라 hi 는 항상 루트이고, parent 값은 줄어들기만 하므로 순환이 생기지 않는다
+        np.minimum.at(parent, hi, lo)
+        while True:
+            pp = parent[parent]
+            if np.array_equal(pp, parent):
+                break
+            parent = pp
+    return np.unique(parent, return_inverse=True)[1].reshape(-1)
+
+
+class NodeView:
+    """
+    NodeStore 의 노드 하나. 예전 노드 dict 처럼 n['name'], n.get('x') 로도, n.name, n.x 로도 읽는다.
+    code / building_code / floor_code 는 정수 비교용.
+    """
+    __slots__ = ('store', 'i')
+    KEYS = ('id', 'name', 'type', 'x', 'y')
+
+    def __init__(self, store, i):
+        self.store = store
+        self.i = i
+
+    id = property(lambda self: self.store.ids[self.i])
+    name = property(lambda self: self.store.names[self.i])
+    code = property(lambda self: int(self.store.type_code[self.i]))
+    type = property(lambda self: self.store.types[self.store.type_code[self.i]])
+    x = property(lambda self: float(self.store.x[self.i]))
+    y = property(lambda self: float(self.store.y[self.i]))
+    building_code = property(lambda self: int(self.store.building[self.i]))
+    floor_code = property(lambda self: int(self.store.floor[self.i]))
+    building = property(lambda self: self.store.buildings[self.store.building[self.i]])
+    floor = property(lambda self: self.store.floors[self.store.floor[self.i]])
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.KEYS}
+
+    def __repr__(self):
+        return f"NodeView({self.as_dict()})"
+
+
+class NodeStore(Mapping):
+    """
+    노드 id → NodeView 매핑. 속성은 노드 인덱스(정렬된 id 순서) 기준 배열에 보관:
+      type_code (uint8, types[코드] 가 유형 문자열), x / y (float32, 없으면 nan),
+      building / floor (uint16, buildings / floors[번호], 0 은 '' = 모름), names (문자열 리스트)
+    """
+
+    def __init__(self, nodes):
+        records = {n['id']: n for n in nodes}   # 같은 id 가 여러 번 나오면 마지막 것 (예전 dict 와 같게)
+        self.ids = sorted(records)
+        self.index = {nid: i for i, nid in enumerate(self.ids)}
+        n = len(self.ids)
+        self.names = [str(records[nid].get('name', '')) for nid in self.ids]
+
+        self.types = list(NODE_TYPES)
+        code = dict(TYPE_CODE)
+        self.type_code = np.zeros(n, dtype=np.uint8)
+        self.x = np.full(n, np.nan, dtype=np.float32)
+        self.y = np.full(n, np.nan, dtype=np.float32)
+        self.buildings, self.floors = [''], ['']
+        building_code, floor_code = {'': 0}, {'': 0}
+        self.building = np.zeros(n, dtype=np.uint16)
+        self.floor = np.zeros(n, dtype=np.uint16)
+        for i, nid in enumerate(self.ids):
+            r = records[nid]
+            t = r.get('type', '')
+            if t not in code:
+                code[t] = len(self.types)
+                self.types.append(t)
+            self.type_code[i] = code[t]
+            if r.get('x') is not None:
+                self.x[i] = r['x']
+            if r.get('y') is not None:
+                self.y[i] = r['y']
+            b, f = split_id(nid) or ('', '')
+            self.building[i] = building_code.setdefault(b, len(building_code))
+            self.floor[i] = floor_code.setdefault(f, len(floor_code))
+            if len(self.buildings) < len(building_code):
+                self.buildings.append(b)
+            if len(self.floors) < len(floor_code):
+                self.floors.append(f)
+        if len(self.types) > 256:
+            raise ValueError(f"too many node types ({len(self.types)}) for uint8 codes")
+
+    def code(self, ntype):
+        """유형 문자열 → 코드. 그래프에 없는 유형이면 None."""
+        try:
+            return self.types.index(ntype)
+        except ValueError:
+            return None
+
+    def of_type(self, ntype):
+        """ntype 노드의 인덱스 배열."""
+        k = self.code(ntype)
+        return np.flatnonzero(self.type_code == k) if k is not None else np.empty(0, dtype=np.int64)
+
+    def view(self, i):
+        return NodeView(self, i)
+
+    def __getitem__(self, nid):
+        return NodeView(self, self.index[nid])
+
+    def __contains__(self, nid):
+        return nid in self.index
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+ROUTE_CACHE_SIZE = 4096
+
+
+class RouteCache:
+    """
+    (프로필, 출발, 도착) → 경로 인덱스 리스트 LRU 캐시.
+    경로가 지나는 간선 (u, v) 마다 그 경로 키를 역색인해 두어, 간선이 닫히면 그 간선을 쓰던 경로만 지운다.
+    """
+
+    def __init__(self, limit=ROUTE_CACHE_SIZE):
+        self.limit = limit
+        self.routes = OrderedDict()
+        self.by_edge = {}   # (u, v) → {키}
+
+    def __len__(self):
+        return len(self.routes)
+
+    def get(self, key):
+        path = self.routes.get(key)
+        if path is not None:
+            self.routes.move_to_end(key)
+        return path
+
+    def put(self, key, path):
+        if key in self.routes:
+            return
+        self.routes[key] = path
+        for edge in zip(path, path[1:]):
+            self.by_edge.setdefault(edge, set()).add(key)
+        while len(self.routes) > self.limit:
+            self._drop(next(iter(self.routes)))
+
+    def _drop(self, key):
+        path = self.routes.pop(key, None)
+        if path is None:
+            return
+        for edge in zip(path, path[1:]):
+            keys = self.by_edge.get(edge)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_edge[edge]
+
+    def invalidate_edges(self, edges):
+        """간선 (u, v) 들을 지나는 캐시 경로를 지우고 지운 개수를 반환."""
+        keys = set()
+        for edge in edges:
+            keys |= self.by_edge.get(edge, set())
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def clear(self):
+        self.routes.clear()
+        self.by_edge.clear()
+
+
+class Profile:
+    """프로필 하나의 가중치와, 그 가중치로 계산한 캐시 (인접 목록, 연결 요소, 역방향 목록, 시설 거리장)."""
+
+    def __init__(self, name, indptr, sources, indices, weights):
+        self.name = name
+        self.weights = weights
+        n = len(indptr) - 1
+        keep = np.isfinite(weights)
+        # 다익스트라 내부 루프용: numpy 스칼라 인덱싱보다 파이썬 리스트 순회가 훨씬 빠르다
+        ind, wt, ok = indices.tolist(), weights.tolist(), keep.tolist()
+        ptr = indptr.tolist()
+        self.neighbors = [[(ind[k], wt[k]) for k in range(ptr[i], ptr[i + 1]) if ok[k]] for i in range(n)]
+
+        # 무방향 연결 요소: 요소가 다르면 경로가 없다 (같아도 일방 간선 때문에 없을 수는 있음)
+        self.component = connected_components(n, sources[keep], indices[keep])
+        self.component_list = self.component.tolist()
+
+        self._reverse = None
+        self.fields = {}   # 시설 유형 → (dist, next, facility) 리스트
+
+    @property
+    def reverse_neighbors(self):
+        """들어오는 간선 목록 (v 로 들어오는 (u, w)). 시설까지의 거리장을 만들 때 처음 한 번 계산."""
+        if self._reverse is None:
+            rev = [[] for _ in self.neighbors]
+            for u, lst in enumerate(self.neighbors):
+                for v, w in lst:
+                    rev[v].append((u, w))
+            self._reverse = rev
+        return self._reverse
+
+
+class CompiledGraph:
+    def __init__(self, nodes, edges):
+        """
+        nodes: [{'id', 'name', 'type', 'x', 'y', ...}], edges: [{'source', 'target', 'weight'}] (병합 JSON 형식).
+        양 끝이 nodes 에 없는 간선은 버린다. 같은 출발 노드의 간선 순서는 입력 순서를 유지한다.
+        """
+        self.nodes = NodeStore(nodes)
+        self.ids = self.nodes.ids
+        self.index = self.nodes.index
+        n = len(self.ids)
+
+        kept = [(self.index[e['source']], self.index[e['target']], e['weight']) for e in edges
+                if e['source'] in self.index and e['target'] in self.index]
+        src = np.fromiter((s for s, _, _ in kept), dtype=np.int64, count=len(kept))
+        tgt = np.fromiter((t for _, t, _ in kept), dtype=np.int64, count=len(kept))
+        w = np.fromiter((w for _, _, w in kept), dtype=np.float64, count=len(kept))
+        order = np.argsort(src, kind='stable')
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+        self.sources = src[order]
+        self.indices = tgt[order]
+        self.weights = w[order]
+        self.edge_class = self._edge_classes()
+
+        self.closed_nodes = set()   # 노드 인덱스
+        self.closed_edges = set()   # (u, v) 인덱스 쌍, 방향별
+        self.closed = np.zeros(len(self.indices), dtype=bool)
+        self.route_cache = RouteCache()
+
+        self.profiles = {}
+        default = self.profile('default')
+        self.neighbors = default.neighbors
+        self.component = default.component
+
+    def _edge_classes(self):
+        """CSR 간선마다 EDGE_CLASSES 의 인덱스 (uint8). NodeStore 의 유형 코드와 건물/층 번호로 한 번에 계산."""
+        store = self.nodes
+        building, floor = store.building, store.floor
+        elevator = store.type_code == TYPE_CODE['Elevator']
+        stair = store.type_code == TYPE_CODE['Stair']
+        s, t = self.sources, self.indices
+
+        cls = np.zeros(len(s), dtype=np.uint8)
+        same_building = building[s] == building[t]
+        same_floor = floor[s] == floor[t]
+        inter = same_building & ~same_floor
+        cls[~same_building] = EDGE_CLASSES.index('road')
+        cls[inter & elevator[s] & elevator[t]] = EDGE_CLASSES.index('elevator')
+        cls[inter & stair[s] & stair[t]] = EDGE_CLASSES.index('stair')
+        cls[same_building & same_floor & (stair[s] | stair[t])] = EDGE_CLASSES.index('stair_access')
+        return cls
+
+    def profile_weights(self, name):
+        """프로필 name 의 CSR 가중치 배열 (제거되거나 폐쇄된 간선은 inf)."""
+        if name not in PROFILES:
+            raise ValueError(f"unknown profile '{name}' (one of {', '.join(PROFILES)})")
+        w = self.weights.copy()
+        for kind, rule in PROFILES[name].items():
+            mask = self.edge_class == EDGE_CLASSES.index(kind)
+            if rule is None:
+                w[mask] = np.inf
+            else:
+                scale, add = rule
+                w[mask] = w[mask] * scale + add
+        w[self.closed] = np.inf
+        return w
+
+    def profile(self, name='default'):
+        """프로필 객체 (처음 쓸 때 한 번 만들고 캐시)."""
+        p = self.profiles.get(name)
+        if p is None:
+            p = self.profiles[name] = Profile(name, self.indptr, self.sources, self.indices, self.profile_weights(name))
+        return p
+
+    # -- 폐쇄 -----------------------------------------------------------------------------------------------------------
+
+    def _closed_mask(self, node_idx, edge_pairs):
+        n = len(self.ids)
+        node_closed = np.zeros(n, dtype=bool)
+        node_closed[list(node_idx)] = True
+        mask = node_closed[self.sources] | node_closed[self.indices]
+        if edge_pairs:
+            keys = np.array([u * n + v for u, v in edge_pairs], dtype=np.int64)
+            mask |= np.isin(self.sources * n + self.indices, keys)
+        return mask
+
+    def set_closures(self, node_ids=(), edges=()):
+        """
+        닫힌 노드 id 들과 간선 (source id, target id) 들을 통째로 교체한다 (간선은 양방향 모두 닫음).
+        새로 닫힌 간선만 있으면 그 간선을 지나던 캐시 경로 / 거리장만 지우고,
+        다시 열린 것이 있으면 더 짧은 경로가 생길 수 있으므로 모든 캐시를 지운다.
+        반환값: {'closed_edges', 'routes_dropped', 'fields_dropped'}
+        """
+        index = self.index
+        nodes = {index[nid] for nid in node_ids if nid in index}
+        pairs = set()
+        for a, b in edges:
+            if a in index and b in index:
+                pairs.add((index[a], index[b]))
+                pairs.add((index[b], index[a]))
+        mask = self._closed_mask(nodes, pairs)
+        newly = np.flatnonzero(mask & ~self.closed)
+        reopened = bool((self.closed & ~mask).any())
+        self.closed_nodes, self.closed_edges, self.closed = nodes, pairs, mask
+        if not len(newly) and not reopened:
+            return {'closed_edges': int(mask.sum()), 'routes_dropped': 0, 'fields_dropped': 0}
+
+        closed_pairs = list(zip(self.sources[newly].tolist(), self.indices[newly].tolist()))
+        if reopened:
+            dropped = len(self.route_cache)
+            self.route_cache.clear()
+        else:
+            dropped = self.route_cache.invalidate_edges(closed_pairs)
+
+        fields_dropped = 0
+        for name, old in list(self.profiles.items()):
+            p = Profile(name, self.indptr, self.sources, self.indices, self.profile_weights(name))
+            for ntype, field in old.fields.items():
+                _, nxt, facility = field
+                # 거리장의 최단 경로 트리가 닫힌 간선을 쓰거나 닫힌 노드가 시설이면 다시 만든다
+                used = any(nxt[u] == v for u, v in closed_pairs) or any(facility[u] == u for u in nodes)
+                if reopened or used:
+                    fields_dropped += 1
+                else:
+                    p.fields[ntype] = field
+            self.profiles[name] = p
+        default = self.profiles['default']
+        self.neighbors = default.neighbors
+        self.component = default.component
+        return {'closed_edges': int(mask.sum()), 'routes_dropped': dropped, 'fields_dropped': fields_dropped}
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            graph = json.load(f)
+        return cls(graph['nodes'], graph['edges'])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def shortest_path_idx(self, s, t, profile='default'):
+        """정수 인덱스 s → t 최단 경로 (인덱스 리스트). 경로가 없으면 빈 리스트."""
+        p = self.profile(profile)
+        if p.component_list[s] != p.component_list[t]:
+            return []
+        dist = [math.inf] * len(self.ids)
+        prev = {}
+        dist[s] = 0
+        pq = [(0, s)]
+        neighbors = p.neighbors
+        push, pop, finish = metrics.heap_ops()   # 계측이 꺼져 있으면 heapq.heappush / heappop 그대로
+        while pq:
+            d, u = pop(pq)
+            if u == t:
+                break
+            if d > dist[u]:
+                continue
+            for v, w in neighbors[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    push(pq, (nd, v))
+        finish()
+        path = []
+        u = t
+        while u != s:
+            path.append(u)
+            u = prev.get(u)
+            if u is None:
+                return []
+        path.append(s)
+        return path[::-1]
+
+    def shortest_path(self, start_id, end_id, profile='default'):
+        """노드 id 기준 최단 경로. 모르는 id 이거나 경로가 없으면 빈 리스트. 결과는 route_cache 에 남긴다."""
+        if start_id not in self.index or end_id not in self.index:
+            return []
+        key = (profile, self.index[start_id], self.index[end_id])
+        path = self.route_cache.get(key)
+        if path is None:
+            metrics.inc('route_cache_misses')
+            with metrics.timer('dijkstra'):
+                path = self.shortest_path_idx(key[1], key[2], profile)
+            self.route_cache.put(key, path)
+            metrics.observe('path_nodes', len(path))
+        else:
+            metrics.inc('route_cache_hits')
+        ids = self.ids
+        return [ids[i] for i in path]
+
+    def distances_idx(self, s, profile='default'):
+        """s 에서 모든 노드까지의 최단 거리 (float64 배열, 도달 불가는 inf). 목적지 없이 트리 전체를 끝까지 계산."""
+        dist = [math.inf] * len(self.ids)
+        dist[s] = 0.0
+        pq = [(0.0, s)]
+        neighbors = self.profile(profile).neighbors
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            for v, w in neighbors[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(pq, (nd, v))
+        return np.array(dist)
+
+    def distances(self, start_id, profile='default'):
+        """start_id 기준 distances_idx. 배열 순서는 self.ids."""
+        return self.distances_idx(self.index[start_id], profile)
+
+    def nearest_idx(self, s, targets, profile='default'):
+        """s 에서 targets(인덱스 집합) 중 가장 가까운 곳까지 다익스트라 한 번. (도착 인덱스, 경로) 또는 (None, [])."""
+        targets = set(targets)
+        dist = [math.inf] * len(self.ids)
+        prev = {}
+        dist[s] = 0
+        pq = [(0, s)]
+        neighbors = self.profile(profile).neighbors
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            if u in targets:
+                path = [u]
+                while u != s:
+                    u = prev[u]
+                    path.append(u)
+                return path[0], path[::-1]
+            for v, w in neighbors[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(pq, (nd, v))
+        return None, []
+
+    def facility_field(self, sources, profile='default'):
+        """
+        sources(인덱스들) 전부를 출발점으로 역방향 다익스트라. 반환값 (dist, next, facility) 리스트:
+        dist[u] 는 u 에서 가장 가까운 source 까지 거리, next[u] 는 그쪽으로 가는 다음 노드 (source 와 도달 불가는 -1),
+        facility[u] 는 도착하는 source (도달 불가는 -1).
+        """
+        n = len(self.ids)
+        dist, nxt, facility = [math.inf] * n, [-1] * n, [-1] * n
+        pq = []
+        for f in sources:
+            dist[f] = 0
+            facility[f] = f
+            pq.append((0, f))
+        heapq.heapify(pq)
+        reverse = self.profile(profile).reverse_neighbors
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            for v, w in reverse[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    nxt[v] = u
+                    facility[v] = facility[u]
+                    heapq.heappush(pq, (nd, v))
+        return dist, nxt, facility
+
+    def nearest_of_type(self, start_id, ntype, profile='default'):
+        """
+        start_id 에서 가장 가까운 ntype 노드까지 (시설 id, 경로 id 리스트, 거리). 없으면 (None, [], inf).
+        유형별 거리장은 프로필마다 처음 질의할 때 만들어 캐시한다.
+        """
+        if start_id not in self.index:
+            return None, [], math.inf
+        p = self.profile(profile)
+        if ntype not in p.fields:
+            sources = [i for i in self.nodes.of_type(ntype).tolist() if i not in self.closed_nodes]
+            p.fields[ntype] = self.facility_field(sources, profile)
+        dist, nxt, facility = p.fields[ntype]
+        u = self.index[start_id]
+        if facility[u] < 0:
+            return None, [], math.inf
+        path = [u]
+        while nxt[u] >= 0:
+            u = nxt[u]
+            path.append(u)
+        ids = self.ids
+        return ids[facility[path[0]]], [ids[i] for i in path], dist[path[0]]
+
+    def _spur_path(self, spur, t, banned_nodes, banned_edges, tree, neighbors, limit=math.inf):
+        """
+        banned 노드/간선을 피해 spur → t 최단 경로 (인덱스 리스트, 비용). 없거나 비용이 limit 이상이면 (None, inf).
+        tree 는 t 로 가는 최단 경로 트리 (dist, next): 트리 경로가 막히지 않았으면 그대로 쓰고,
+        막혔으면 dist 를 휴리스틱으로 A* (간선을 빼면 거리는 늘기만 하므로 dist 는 하한).
+        """
+        h, nxt, _ = tree
+        if h[spur] == math.inf:
+            return None, math.inf
+        u, path = spur, [spur]
+        while u != t and nxt[u] >= 0 and nxt[u] not in banned_nodes and (u, nxt[u]) not in banned_edges:
+            u = nxt[u]
+            path.append(u)
+        if u == t:
+            return path, h[spur]
+
+        g = {spur: 0.0}
+        prev = {}
+        pq = [(h[spur], spur)]
+        while pq:
+            f, u = heapq.heappop(pq)
+            if f >= limit:
+                break
+            d = g[u]
+            if f > d + h[u]:
+                continue
+            if u == t:
+                path = [u]
+                while u != spur:
+                    u = prev[u]
+                    path.append(u)
+                return path[::-1], d
+            for v, w in neighbors[u]:
+                if v in banned_nodes or (u, v) in banned_edges or h[v] == math.inf:
+                    continue
+                nd = d + w
+                if nd < g.get(v, math.inf):
+                    g[v] = nd
+                    prev[v] = u
+                    heapq.heappush(pq, (nd + h[v], v))
+        return None, math.inf
+
+    def k_shortest_paths(self, start_id, end_id, k=3, profile='default', budget_ms=None):
+        """
+        Yen 알고리즘으로 비용 순서의 단순(루프 없는) 경로 최대 k 개. [(비용, 경로 id 리스트)].
+        budget_ms 를 넘기면 그때까지 찾은 경로만 반환한다 (첫 경로는 항상 포함).
+        후보가 이미 충분하면, 트리 거리로 구한 하한이 남은 자리의 후보 비용 이상인 spur 는 탐색하지 않는다.
+        """
+        if start_id not in self.index or end_id not in self.index:
+            return []
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000
+        s, t = self.index[start_id], self.index[end_id]
+        p = self.profile(profile)
+        neighbors = p.neighbors
+        tree = self.facility_field([t], profile)
+        first, cost = self._spur_path(s, t, set(), set(), tree, neighbors)
+        if first is None:
+            return []
+
+        def edge_cost(u, v):
+            return min(w for x, w in neighbors[u] if x == v)
+
+        found = [(cost, first)]
+        seen = {tuple(first)}
+        candidates = []
+        while len(found) < k:
+            last = found[-1][1]
+            root_cost = 0.0
+            for i in range(len(last) - 1):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return [(c, [self.ids[u] for u in path]) for c, path in found]
+                root = last[:i + 1]
+                banned_nodes = set(root[:-1])
+                banned_edges = {(path[i], path[i + 1]) for _, path in found if path[:i + 1] == root}
+                needed = k - len(found)
+                bound = heapq.nsmallest(needed, candidates)[-1][0] if len(candidates) >= needed else math.inf
+                spur = last[i]
+                lower = min((w + tree[0][v] for v, w in neighbors[spur]
+                             if v not in banned_nodes and (spur, v) not in banned_edges), default=math.inf)
+                spur_path = None
+                if root_cost + lower < bound:
+                    spur_path, spur_cost = self._spur_path(spur, t, banned_nodes, banned_edges, tree, neighbors,
+                                                           bound - root_cost)
+                if spur_path is not None:
+                    full = root[:-1] + spur_path
+                    if tuple(full) not in seen:
+                        seen.add(tuple(full))
+                        heapq.heappush(candidates, (root_cost + spur_cost, full))
+                root_cost += edge_cost(last[i], last[i + 1])
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates))
+        return [(c, [self.ids[u] for u in path]) for c, path in found]
+
+    def reachable(self, start_id, end_id, profile='default'):
+        """두 노드가 같은 연결 요소에 있는지 (탐색 없이 O(1))."""
+        if start_id not in self.index or end_id not in self.index:
+            return False
+        component = self.profile(profile).component_list
+        return component[self.index[start_id]] == component[self.index[end_id]]
+
+    def path_length(self, path_ids, profile='default'):
+        """
+        경로의 총 비용 (기본 프로필은 거리 m, fastest 는 초).
+        연속한 두 노드 사이 간선 중 가장 짧은 것을 쓴다 (다익스트라가 고르는 간선).
+        """
+        neighbors = self.profile(profile).neighbors
+        total = 0.0
+        for a, b in zip(path_ids, path_ids[1:]):
+            j = self.index[b]
+            total += min(w for v, w in neighbors[self.index[a]] if v == j)
+        return total
+
+    def first_weight(self, u, v):
+        """
+        u → v 간선 중 입력에서 처음 나온 것의 weight (병합 JSON 값 그대로, 프로필·폐쇄 무관). 간선이 없으면 None.
+        CSR 은 출발 노드별 입력 순서를 유지하므로 구간에서 처음 맞는 것이 곧 처음 나온 간선이다.
+        """
+        i, j = self.index[u], self.index[v]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        hit = np.flatnonzero(self.indices[lo:hi] == j)
+        return float(self.weights[lo + hit[0]]) if len(hit) else None
@@ -0,0 +1,161 @@
+# isochrone.py
+#
+# 한 출발점에서 모든 노드까지의 거리장 / 등거리(등시간) 구간을 계산해 층별로 내보낸다 (시설 계획용 히트맵).
+#   - 거리: CompiledGraph.distances (다익스트라 트리 전체, numpy 배열). profile=fastest 이면 초 단위
+#   - 구간: np.searchsorted 로 한 번에 분류 (bands=[30, 60, 120] → 0: ≤30, 1: ≤60, 2: ≤120, 3: 그 밖, -1: 도달 불가)
+#   - 여러 출발점: 프로세스 풀로 나눠 계산 (워커마다 그래프를 한 번만 읽고 closures.json 도 반영) → (출발점 수, 노드 수) 행렬
+#   - 내보내기: 건물/층마다 노드 좌표(x, y, 층 도면 픽셀)와 거리 / 구간
+#       단일 출발점  → <out>/<건물>_<층>.json
+#       여러 출발점  → <out>/<건물>_<층>.npz (sources, ids, x, y, dist[출발점, 노드])
+#
+# 실행 예시:
+#   python isochrone.py --source 85101 --bands 30 60 120 --out isochrones
+#   python isochrone.py --source 85101 --profile fastest --bands 60 120 180 --out isochrones_time
+#   python isochrone.py --sources-type Restroom --workers 4 --out restroom_fields
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from closures import ClosureBoard
+from graph_engine import CompiledGraph
+
+GRAPH_FILE = 'merged_buildings_graph.json'
+
+_engine = None   # 프로세스 풀 워커마다 한 번 읽은 그래프
+
+
+def bucket(dist, bands):
+    """거리 배열을 구간 번호로 (bands 오름차순). 도달 불가(inf)는 -1."""
+    bands = np.asarray(bands, dtype=np.float64)
+    out = np.searchsorted(bands, dist, side='left')
+    out[~np.isfinite(dist)] = -1
+    return out
+
+
+def floor_groups(engine):
+    """(건물, 층) → 노드 인덱스 배열 (self.ids 순서 기준). NodeStore 의 건물/층 번호로 묶는다."""
+    store = engine.nodes
+    key = store.building.astype(np.int64) * len(store.floors) + store.floor
+    groups = {}
+    for k in np.unique(key).tolist():
+        b, f = divmod(k, len(store.floors))
+        groups[(store.buildings[b], store.floors[f])] = np.flatnonzero(key == k)
+    return groups
+
+
+def coordinates(engine):
+    return engine.nodes.x, engine.nodes.y
+
+
+def floor_file(out_dir, place, ext):
+    building, floor = place
+    name = '_'.join(p for p in (building, floor) if p) or 'graph'
+    return os.path.join(out_dir, f"{name}.{ext}")
+
+
+# -- 여러 출발점 (프로세스 풀) ------------------------------------------------------------------------------------------
+
+def _init_worker(graph_path, profile):
+    global _engine
+    _engine = CompiledGraph.from_json(graph_path)
+    ClosureBoard(os.path.join(os.path.dirname(os.path.abspath(graph_path)), 'closures.json')).sync(_engine)
+    _engine.profile(profile)
+
+
+def _distance_rows(sources, profile):
+    return np.stack([_engine.distances_idx(_engine.index[s], profile) for s in sources]).astype(np.float32)
+
+
+def many_sources(graph_path, sources, profile='default', workers=None, chunk=16):
+    """
+    sources(노드 id 리스트) 각각의 거리 배열을 프로세스 풀에서 계산해 (len(sources), 노드 수) float32 행렬로.
+    열 순서는 CompiledGraph.ids.
+    """
+    chunks = [sources[i:i + chunk] for i in range(0, len(sources), chunk)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graph_path, profile)) as pool:
+        rows = list(pool.map(_distance_rows, chunks, [profile] * len(chunks)))
+    return np.concatenate(rows) if rows else np.empty((0, 0), dtype=np.float32)
+
+
+# -- 내보내기 -----------------------------------------------------------------------------------------------------------
+
+def export_isochrone(engine, source, dist, bands, out_dir, profile='default'):
+    """단일 출발점 거리/구간을 층별 JSON 으로. 만든 파일 경로 리스트 반환."""
+    os.makedirs(out_dir, exist_ok=True)
+    band = bucket(dist, bands)
+    x, y = coordinates(engine)
+    written = []
+    for place, idx in sorted(floor_groups(engine).items()):
+        nodes = []
+        for i in idx.tolist():
+            n = engine.nodes.view(i)
+            d = float(dist[i])
+            nodes.append({'id': n.id, 'name': n.name, 'type': n.type,
+                          'x': float(x[i]), 'y': float(y[i]),
+                          'dist': d if np.isfinite(d) else None, 'band': int(band[i])})
+        path = floor_file(out_dir, place, 'json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'source': source, 'profile': profile, 'bands': list(bands), 'nodes': nodes},
+                      f, ensure_ascii=False, indent=2)
+        written.append(path)
+    return written
+
+
+def export_matrix(engine, sources, matrix, out_dir, profile='default'):
+    """여러 출발점 거리 행렬을 층별 npz 로. 만든 파일 경로 리스트 반환."""
+    os.makedirs(out_dir, exist_ok=True)
+    x, y = coordinates(engine)
+    ids = np.array(engine.ids, dtype=object)
+    written = []
+    for place, idx in sorted(floor_groups(engine).items()):
+        path = floor_file(out_dir, place, 'npz')
+        np.savez_compressed(path, sources=np.array(sources, dtype=str), ids=ids[idx].astype(str),
+                            x=x[idx], y=y[idx], dist=matrix[:, idx], profile=profile)
+        written.append(path)
+    return written
+
+
+def resolve_source(query, graph_path):
+    from name_index import NameIndex
+    index = NameIndex.load(graph_path)
+    text, building, floor = index.parse_query(query)
+    matches = index.exact(text, building, floor)
+    if len(matches) != 1:
+        raise SystemExit(f"'{query}' 에 맞는 노드가 {len(matches)}개입니다 (노드 id 나 '건물 층 이름' 으로 지정하세요)")
+    return matches[0]['id']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--source', help='출발 노드 id 또는 이름')
+    src.add_argument('--sources', nargs='+', help='여러 출발 노드 id')
+    src.add_argument('--sources-type', help='이 유형의 모든 노드를 출발점으로 (예: Restroom)')
+    parser.add_argument('--graph', default=GRAPH_FILE)
+    parser.add_argument('--profile', default='default')
+    parser.add_argument('--bands', nargs='+', type=float, default=[30, 60, 120], help='구간 경계 (m, fastest 는 초)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='isochrones')
+    args = parser.parse_args()
+
+    engine = CompiledGraph.from_json(args.graph)
+    ClosureBoard(os.path.join(os.path.dirname(os.path.abspath(args.graph)), 'closures.json')).sync(engine)
+    if args.source:
+        source = args.source if args.source in engine.index else resolve_source(args.source, args.graph)
+        dist = engine.distances(source, args.profile)
+        files = export_isochrone(engine, source, dist, sorted(args.bands), args.out, args.profile)
+        counts = np.bincount(bucket(dist, sorted(args.bands)) + 1, minlength=len(args.bands) + 2)
+        print(f"{source}: 도달 불가 {counts[0]}개, 구간별 노드 수 {counts[1:].tolist()}")
+    else:
+        sources = args.sources or [engine.ids[i] for i in engine.nodes.of_type(args.sources_type).tolist()]
+        missing = [s for s in sources if s not in engine.index]
+        if missing:
+            raise SystemExit(f"모르는 노드 id: {missing[:5]}")
+        matrix = many_sources(args.graph, sources, args.profile, args.workers)
+        files = export_matrix(engine, sources, matrix, args.out, args.profile)
+        print(f"출발점 {len(sources)}개 x 노드 {matrix.shape[1]}개")
+    print(f"층별 파일 {len(files)}개 → {args.out}")
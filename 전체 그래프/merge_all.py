@@ -1,50 +1,74 @@
 import json
-import glob
 import os
+import hashlib
+import argparse
 
-def merge_buildings_json(input_pattern="*.json", output_file="merged_buildings_graph.json"):
+# 캠퍼스 그래프에 들어가는 건물. 이 폴더의 <건물>.json 을 이 순서대로 병합한다
+# (폴더의 다른 JSON 산출물은 nodes/edges 가 있어도 건물로 취급하지 않음)
+BUILDINGS = ['산학협력관', '제2공학관']
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_path(output_file):
+    return os.path.splitext(output_file)[0] + '.manifest.json'
+
+
+def building_files(buildings=BUILDINGS, folder="."):
     """
-    여러 건물(graph) JSON 파일을 하나의 그래프로 병합합니다.
+    병합할 건물 그래프 파일 경로 리스트 (<folder>/<건물>.json, buildings 순서).
+    없는 파일이 있으면 FileNotFoundError.
+    """
+    files = [os.path.join(folder, f"{b}.json") for b in buildings]
+    missing = [p for p in files if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"건물 그래프 파일이 없습니다: {', '.join(missing)}")
+    return files
 
-    - 각 노드의 id에 건물명(파일명) 접두사를 추가하여 충돌 방지
-    - edges는 양방향으로 추가
-    - Outside 타입의 road1~road4 노드를 찾아서 매핑
-    - road3↔road4: weight=1.0
-    - road2↔road1: weight=85.0
+
+def _load_building(filepath):
     """
-    nodes = []
-    edges = []
-    road_map = {}  # road 이름 -> 새로운 id
+    건물 그래프 하나를 읽어 노드 id 에 건물명 접두사를 붙이고 간선을 양방향으로 펼친다.
+    반환값: (nodes, edges, road_map)  road_map: road 이름 -> 새로운 id
+    """
+    building = os.path.splitext(os.path.basename(filepath))[0]  # ex: '산학협력관'
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    nodes, edges = [], []
+    road_map = {}
 
-    # 입력 파일 찾기 (출력 파일 제외)
-    files = sorted(glob.glob(input_pattern))
-    files = [f for f in files if os.path.basename(f) != output_file]
+    # 노드 처리
+    for node in data.get("nodes", []):
+        old_id = node["id"]
+        new_id = f"{building}_{old_id}"
+        node["id"] = new_id
 
-    for filepath in files:
-        building = os.path.splitext(os.path.basename(filepath))[0]  # ex: '산학협력관'
-        data = json.load(open(filepath, 'r', encoding='utf-8'))
+        # road 노드 매핑 (Outside 타입, 이름이 'roadX'인 경우)
+        if node.get("type") == "Outside" and node.get("name", "").startswith("road"):
+            road_map[node["name"]] = new_id
 
-        # 노드 처리
-        for node in data.get("nodes", []):
-            old_id = node["id"]
-            new_id = f"{building}_{old_id}"
-            node["id"] = new_id
+        nodes.append(node)
 
-            # road 노드 매핑 (Outside 타입, 이름이 'roadX'인 경우)
-            if node.get("type") == "Outside" and node.get("name", "").startswith("road"):
-                road_map[node["name"]] = new_id
+    # 엣지 처리 (양방향)
+    for edge in data.get("edges", []):
+        src = f"{building}_{edge['source']}"
+        tgt = f"{building}_{edge['target']}"
+        weight = edge.get("weight", 1.0)
+        edges.append({"source": src, "target": tgt, "weight": weight})
+        edges.append({"source": tgt, "target": src, "weight": weight})
 
-            nodes.append(node)
+    return nodes, edges, road_map
 
-        # 엣지 처리 (양방향)
-        for edge in data.get("edges", []):
-            src = f"{building}_{edge['source']}"
-            tgt = f"{building}_{edge['target']}"
-            weight = edge.get("weight", 1.0)
-            edges.append({"source": src, "target": tgt, "weight": weight})
-            edges.append({"source": tgt, "target": src, "weight": weight})
 
-    # 건물 간 도로 연결 추가
+def _link_roads(road_map):
+    """건물 간 도로 연결 간선."""
+    edges = []
     # road3 <-> road4, weight = 1m
     if "road3" in road_map and "road4" in road_map:
         a, b = road_map["road3"], road_map["road4"]
@@ -56,11 +80,116 @@ def merge_buildings_json(input_pattern="*.json", output_file="merged_buildings_g
         a, b = road_map["road2"], road_map["road1"]
         edges.append({"source": a, "target": b, "weight": 25.0})
         edges.append({"source": b, "target": a, "weight": 25.0})
+    return edges
+
+
+def merge_buildings_json(buildings=BUILDINGS, output_file="merged_buildings_graph.json"):
+    """
+    여러 건물(graph) JSON 파일을 하나의 그래프로 병합합니다.
+
+    - 각 노드의 id에 건물명(파일명) 접두사를 추가하여 충돌 방지
+    - edges는 양방향으로 추가
+    - Outside 타입의 road1~road4 노드를 찾아서 매핑
+    - road3↔road4: weight=1.0
+    - road2↔road1: weight=85.0
+    """
+    nodes = []
+    edges = []
+    road_map = {}  # road 이름 -> 새로운 id
+
+    for filepath in building_files(buildings):
+        b_nodes, b_edges, b_roads = _load_building(filepath)
+        nodes.extend(b_nodes)
+        edges.extend(b_edges)
+        road_map.update(b_roads)
+
+    # 건물 간 도로 연결 추가
+    edges.extend(_link_roads(road_map))
 
     # 결과 저장
     merged = {"nodes": nodes, "edges": edges}
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(merged, f, ensure_ascii=False, indent=4)
 
+
+def merge_buildings_json_incremental(buildings=BUILDINGS, output_file="merged_buildings_graph.json"):
+    """
+    merge_buildings_json 과 같은 결과를 만드는 증분 병합.
+
+    출력 옆의 manifest(merged_buildings_graph.manifest.json)에 건물 파일별 sha256,
+    병합 결과에서 차지하는 nodes/edges 구간, road_map 을 기록해 두고
+    해시가 바뀐 건물만 다시 읽어 접두사를 붙인다. 도로 연결은 road_map 으로 매번 다시 만든다.
+
+    반환값: {"changed": [...], "removed": [...], "reused": [...]} (건물 파일명)
+    """
+    files = building_files(buildings)
+    hashes = {os.path.basename(p): file_sha256(p) for p in files}
+
+    old = {}
+    prev = None
+    mpath = manifest_path(output_file)
+    if os.path.exists(mpath) and os.path.exists(output_file):
+        with open(mpath, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        if old.get("output_sha256") != file_sha256(output_file):
+            old = {}  # 출력이 수동/전체 병합으로 바뀌었으면 처음부터
+    old_inputs = old.get("inputs", {})
+
+    changed = [name for name, h in hashes.items() if old_inputs.get(name, {}).get("sha256") != h]
+    removed = [name for name in old_inputs if name not in hashes]
+    reused = [name for name in hashes if name not in changed]
+    if not changed and not removed and old:
+        return {"changed": [], "removed": [], "reused": reused}
+    if reused:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            prev = json.load(f)
+
+    nodes, edges = [], []
+    road_map = {}
+    inputs = {}
+    for filepath in files:
+        name = os.path.basename(filepath)
+        if name in changed:
+            b_nodes, b_edges, b_roads = _load_building(filepath)
+        else:
+            entry = old_inputs[name]
+            b_nodes = prev["nodes"][entry["nodes"][0]:entry["nodes"][1]]
+            b_edges = prev["edges"][entry["edges"][0]:entry["edges"][1]]
+            b_roads = entry["roads"]
+        inputs[name] = {
+            "sha256": hashes[name],
+            "nodes": [len(nodes), len(nodes) + len(b_nodes)],
+            "edges": [len(edges), len(edges) + len(b_edges)],
+            "roads": b_roads,
+        }
+        nodes.extend(b_nodes)
+        edges.extend(b_edges)
+        road_map.update(b_roads)
+    links = _link_roads(road_map)
+    manifest_links = [len(edges), len(edges) + len(links)]
+    edges.extend(links)
+
+    merged = {"nodes": nodes, "edges": edges}
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, ensure_ascii=False, indent=4)
+    manifest = {
+        "output": os.path.basename(output_file),
+        "output_sha256": file_sha256(output_file),
+        "inputs": inputs,
+        "links": manifest_links,
+    }
+    with open(mpath, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return {"changed": changed, "removed": removed, "reused": reused}
+
+
 if __name__ == "__main__":
-    merge_buildings_json()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full', action='store_true', help='manifest 를 무시하고 모든 건물을 다시 병합')
+    parser.add_argument('--buildings', nargs='+', default=BUILDINGS, help='병합할 건물 (<건물>.json)')
+    args = parser.parse_args()
+    if args.full:
+        merge_buildings_json(args.buildings)
+    else:
+        result = merge_buildings_json_incremental(args.buildings)
+        print(f"changed: {result['changed']} removed: {result['removed']} reused: {len(result['reused'])}")
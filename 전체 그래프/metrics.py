@@ -0,0 +1,230 @@
+# metrics.py
+#
+# 경로 탐색 / 추론 hot path 계측 (카운터, 히스토그램, 구간 시간) 과 선택적 프로파일러.
+#   - ROUTE_METRICS=1 일 때만 기록. 꺼져 있으면 inc / observe / timer 가 아무것도 하지 않는 함수로 바뀌고
+#     다익스트라는 heapq 함수를 그대로 쓰므로 (heap_ops) 추가 비용이 거의 없다
+#   - 내보내기: prometheus_text() (Prometheus text format 0.0.4), as_dict() / dump_json(path)
+#   - ROUTE_PROFILE=cprofile : 프로세스 전체를 cProfile 로 기록해 종료 시 ROUTE_PROFILE_OUT(.prof) 로 저장
+#     ROUTE_PROFILE=torch    : profiled(name) 구간을 torch.profiler 로 기록해 종료 시 chrome trace(.json) 로 저장
+#
+# 실행 예시:
+#   ROUTE_METRICS=1 python route_server.py            # GET /metrics, /metrics.json
+#   ROUTE_PROFILE=cprofile python compare_runtime.py  # route_profile.prof 생성
+
+import atexit
+import bisect
+import contextlib
+import functools
+import heapq
+import json
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('ROUTE_METRICS', '') not in ('', '0')
+PROFILE = os.environ.get('ROUTE_PROFILE', '').lower()
+PROFILE_OUT = os.environ.get('ROUTE_PROFILE_OUT', '')
+
+# 이름이 _seconds 로 끝나면 시간 구간, 아니면 개수 구간
+TIME_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+DESCRIPTIONS = {
+    'dijkstra_runs': 'shortest path searches',
+    'dijkstra_nodes_expanded': 'heap pops per search',
+    'dijkstra_heap_pushes': 'heap pushes per search',
+    'path_nodes': 'nodes in returned paths',
+    'route_cache_hits': 'route cache hits',
+    'route_cache_misses': 'route cache misses',
+    'format_segment_hits': 'route text segments served from cache',
+    'format_segment_misses': 'route text segments rendered',
+    'decode_steps': 'greedy decoding steps per batch',
+    'decode_batch_size': 'rows per decoding batch',
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _inc(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def _observe(name, value):
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram(TIME_BUCKETS if name.endswith('_seconds') else COUNT_BUCKETS)
+        h.observe(value)
+
+
+@contextlib.contextmanager
+def _timer(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(f'{name}_seconds', time.perf_counter() - t)
+
+
+class _CountingHeap:
+    """켜져 있을 때 다익스트라에 넘기는 heappush / heappop. 탐색이 끝나면 finish() 로 히스토그램에 기록."""
+    __slots__ = ('pushes', 'pops')
+
+    def __init__(self):
+        self.pushes = 0
+        self.pops = 0
+
+    def push(self, heap, item):
+        self.pushes += 1
+        heapq.heappush(heap, item)
+
+    def pop(self, heap):
+        self.pops += 1
+        return heapq.heappop(heap)
+
+    def finish(self):
+        _inc('dijkstra_runs')
+        _observe('dijkstra_nodes_expanded', self.pops)
+        _observe('dijkstra_heap_pushes', self.pushes)
+
+
+def _heap_ops():
+    h = _CountingHeap()
+    return h.push, h.pop, h.finish
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+_NULL = contextlib.nullcontext()
+
+
+def _null_timer(name):
+    return _NULL
+
+
+def _plain_heap_ops():
+    return heapq.heappush, heapq.heappop, _noop
+
+
+def enable(on=True):
+    """계측을 켜고/끈다 (환경 변수 대신 코드에서). 이미 import 한 모듈은 metrics.inc 처럼 속성으로 불러야 반영된다."""
+    global ENABLED, inc, observe, timer, heap_ops
+    ENABLED = on
+    if on:
+        inc, observe, timer, heap_ops = _inc, _observe, _timer, _heap_ops
+    else:
+        inc, observe, timer, heap_ops = _noop, _noop, _null_timer, _plain_heap_ops
+
+
+enable(ENABLED)
+
+
+def timed(name):
+    """함수 전체를 name 구간으로 재는 데코레이터. 켜짐/꺼짐은 호출할 때 확인한다."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with timer(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# -- 내보내기 -----------------------------------------------------------------------------------------------------------
+
+def as_dict():
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'histograms': {name: {'buckets': list(h.buckets), 'counts': list(h.counts), 'sum': h.sum, 'count': h.count}
+                           for name, h in _histograms.items()},
+        }
+
+
+def dump_json(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(as_dict(), f, indent=2)
+
+
+def prometheus_text(prefix='route_'):
+    lines = []
+    data = as_dict()
+    for name, value in sorted(data['counters'].items()):
+        metric = f'{prefix}{name}_total'
+        lines.append(f'# HELP {metric} {DESCRIPTIONS.get(name, name)}')
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {value}')
+    for name, h in sorted(data['histograms'].items()):
+        metric = f'{prefix}{name}'
+        lines.append(f'# HELP {metric} {DESCRIPTIONS.get(name, name)}')
+        lines.append(f'# TYPE {metric} histogram')
+        cumulative = 0
+        for bound, count in zip(h['buckets'], h['counts']):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {h["count"]}')
+        lines.append(f'{metric}_sum {h["sum"]:.9g}')
+        lines.append(f'{metric}_count {h["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+# -- 프로파일러 ---------------------------------------------------------------------------------------------------------
+
+_torch_prof = None
+
+
+def profiled(name):
+    """ROUTE_PROFILE=torch 일 때 name 구간을 torch.profiler 에 기록. 아니면 아무것도 하지 않는 컨텍스트."""
+    global _torch_prof
+    if PROFILE != 'torch':
+        return _NULL
+    import torch
+    if _torch_prof is None:
+        _torch_prof = torch.profiler.profile(
+            activities=[torch.profiler.ProfilerActivity.CPU]
+            + ([torch.profiler.ProfilerActivity.CUDA] if torch.cuda.is_available() else []),
+            record_shapes=True)
+        _torch_prof.__enter__()
+
+        def _export():
+            _torch_prof.__exit__(None, None, None)
+            _torch_prof.export_chrome_trace(PROFILE_OUT or 'route_profile.trace.json')
+        atexit.register(_export)
+    return torch.profiler.record_function(name)
+
+
+if PROFILE == 'cprofile':
+    import cProfile
+    _cprof = cProfile.Profile()
+    _cprof.enable()
+
+    def _dump_cprofile():
+        _cprof.disable()
+        _cprof.dump_stats(PROFILE_OUT or 'route_profile.prof')
+    atexit.register(_dump_cprofile)
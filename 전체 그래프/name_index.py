@@ -0,0 +1,179 @@
+# name_index.py
+#
+# 노드 이름 → 노드 id 검색 인덱스 (pathfinder 의 출발/도착 이름 해석용).
+#   - exact : 이름이 정확히 같은 노드 전부 (중복 이름을 덮어쓰지 않음)
+#   - prefix: 정렬된 이름 배열에서 bisect 로 범위 검색 (ex: '2512' → 25121 ... 25129)
+#   - fuzzy : 이름의 trigram 역색인으로 후보를 모으고 겹치는 trigram 비율(Dice)로 점수
+#   - 결과는 건물 / 층으로 좁힐 수 있고, 질의 문자열 안의 '제2공학관', '3f' 같은 토큰도 필터로 해석
+#   - 인덱스는 그래프 파일 옆(<graph>.names.json)에 저장하고, 그래프 sha256 이 같으면 다시 만들지 않음
+#
+# 실행 예시:
+#   python name_index.py 2512
+#   python name_index.py "제2공학관 27226"
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+
+from graph_engine import split_id
+
+INDEX_VERSION = 1
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def normalize(name):
+    return re.sub(r'\s+', '', str(name)).lower()
+
+
+def trigrams(text):
+    """앞뒤를 공백으로 채운 trigram 집합 (두 글자 이하 질의도 후보를 찾도록)."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    def __init__(self, keys, ids, places, trigram_lists):
+        self.keys = keys                # 정규화한 이름, 정렬됨
+        self.ids = ids                  # keys[k] 이름을 가진 노드 id 리스트
+        self.places = places            # 노드 id → (건물, 층)
+        self.trigrams = trigram_lists   # trigram → keys 위치 리스트
+        self.slot = {key: k for k, key in enumerate(keys)}
+        self.sizes = [len(trigrams(key)) for key in keys]
+        self.buildings = sorted({b for b, _ in places.values() if b})
+
+    @classmethod
+    def build(cls, nodes):
+        by_name = {}
+        places = {}
+        for n in nodes:
+            by_name.setdefault(normalize(n['name']), []).append(n['id'])
+            where = split_id(n['id'])
+            places[n['id']] = where if where else ('', '')
+        keys = sorted(by_name)
+        tri = {}
+        for k, key in enumerate(keys):
+            for t in trigrams(key):
+                tri.setdefault(t, []).append(k)
+        return cls(keys, [by_name[key] for key in keys], places, tri)
+
+    # -- 저장 / 불러오기 -------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def cache_path(graph_path):
+        return os.path.splitext(graph_path)[0] + '.names.json'
+
+    def save(self, path, graph_sha256):
+        data = {
+            'version': INDEX_VERSION,
+            'graph_sha256': graph_sha256,
+            'keys': self.keys,
+            'ids': self.ids,
+            'places': self.places,
+            'trigrams': self.trigrams,
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, graph_path='merged_buildings_graph.json'):
+        """저장된 인덱스가 그래프와 같은 해시로 만들어졌으면 그대로 읽고, 아니면 새로 만들어 저장."""
+        sha = file_sha256(graph_path)
+        path = cls.cache_path(graph_path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION and data.get('graph_sha256') == sha:
+                places = {nid: tuple(p) for nid, p in data['places'].items()}
+                return cls(data['keys'], data['ids'], places, data['trigrams'])
+        with open(graph_path, 'r', encoding='utf-8') as f:
+            index = cls.build(json.load(f)['nodes'])
+        index.save(path, sha)
+        return index
+
+    # -- 검색 ------------------------------------------------------------------------------------------------------------
+
+    def _matches(self, slots, building, floor, kind, scores=None):
+        out = []
+        for k in slots:
+            for nid in self.ids[k]:
+                b, f = self.places[nid]
+                if (building and b != building) or (floor and f != floor):
+                    continue
+                out.append({'id': nid, 'name': self.keys[k], 'building': b, 'floor': f, 'match': kind,
+                            'score': 1.0 if scores is None else scores[k]})
+        return out
+
+    def exact(self, name, building=None, floor=None):
+        k = self.slot.get(normalize(name))
+        return self._matches([] if k is None else [k], building, floor, 'exact')
+
+    def prefix(self, text, building=None, floor=None, limit=20):
+        key = normalize(text)
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_left(self.keys, key + '\uffff')
+        return self._matches(range(lo, hi), building, floor, 'prefix')[:limit]
+
+    def fuzzy(self, text, building=None, floor=None, limit=10, min_score=0.3):
+        """trigram Dice 계수 2|A∩B| / (|A|+|B|) 가 min_score 이상인 이름들, 점수 내림차순."""
+        query = trigrams(normalize(text))
+        shared = Counter()
+        for t in query:
+            shared.update(self.trigrams.get(t, ()))
+        scores = {}
+        for k, c in shared.items():
+            s = 2 * c / (len(query) + self.sizes[k])
+            if s >= min_score:
+                scores[k] = s
+        ranked = sorted(scores, key=lambda k: (-scores[k], self.keys[k]))
+        return self._matches(ranked, building, floor, 'fuzzy', scores)[:limit]
+
+    def parse_query(self, query):
+        """'제2공학관 3f 27226' → ('27226', '제2공학관', '3f'). 건물/층 토큰이 없으면 None."""
+        building = floor = None
+        rest = []
+        for tok in query.split():
+            if tok in self.buildings:
+                building = tok
+            elif re.fullmatch(r'\d+[fF]', tok):
+                floor = tok.lower()
+            else:
+                rest.append(tok)
+        return ' '.join(rest), building, floor
+
+    def resolve(self, query, building=None, floor=None, limit=10):
+        """
+        exact → prefix → fuzzy 순서로 처음 결과가 나오는 단계의 후보 리스트.
+        인자로 준 building / floor 가 질의 문자열 안의 건물/층 토큰보다 우선한다.
+        """
+        text, q_building, q_floor = self.parse_query(query)
+        building, floor = building or q_building, floor or q_floor
+        return (self.exact(text, building, floor)
+                or self.prefix(text, building, floor, limit)
+                or self.fuzzy(text, building, floor, limit))
+
+
+def describe(match):
+    where = ' '.join(p for p in (match['building'], match['floor']) if p)
+    return f"{match['name']} ({where}, id: {match['id']}, {match['match']})"
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('usage: python name_index.py <name> [graph.json]')
+        sys.exit(1)
+    index = NameIndex.load(sys.argv[2] if len(sys.argv) > 2 else 'merged_buildings_graph.json')
+    for m in index.resolve(sys.argv[1]):
+        print(describe(m))
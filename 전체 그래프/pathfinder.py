@@ -1,140 +1,165 @@
 import json
-import math
 import sys
-import heapq
+from collections import OrderedDict
 
-# Load merged graph
-with open('merged_buildings_graph.json', 'r', encoding='utf-8') as f:
+import numpy as np
+
+import metrics
+from graph_engine import CompiledGraph, TYPE_CODE, turn_angles
+
+# Load merged graph (phase timings / counters are recorded only with ROUTE_METRICS=1, see metrics.py)
+with metrics.timer('graph_load'), open('merged_buildings_graph.json', 'r', encoding='utf-8') as f:
     graph = json.load(f)
 
-# Build node and adjacency maps
-nodes = {n['id']: n for n in graph['nodes']}
-adj = {}
-for e in graph['edges']:
-    src, tgt, w = e['source'], e['target'], e['weight']
-    adj.setdefault(src, []).append((tgt, w))
-
-# Dijkstra's algorithm to find shortest path
-def shortest_path(start_id, end_id):
-    dist = {nid: math.inf for nid in nodes}
-    prev = {}
-    dist[start_id] = 0
-    pq = [(0, start_id)]
-    while pq:
-        d, u = heapq.heappop(pq)
-        if u == end_id:
-            break
-        if d > dist[u]:
-            continue
-        for v, w in adj.get(u, []):
-            nd = d + w
-            if nd < dist[v]:
-                dist[v] = nd
-                prev[v] = u
-                heapq.heappush(pq, (nd, v))
-    # reconstruct path
-    path = []
-    u = end_id
-    while u != start_id:
-        path.append(u)
-        u = prev.get(u)
-        if u is None:
-            return []
-    path.append(start_id)
-    return list(reversed(path))
-
-# Compute turn angle; swap left/right mapping
-def compute_turn(prev_node, curr_node, next_node):
-    f1 = prev_node['id'].split('_')[0]
-    f2 = curr_node['id'].split('_')[0]
-    f3 = next_node['id'].split('_')[0]
-    if f1 != f2 or f2 != f3:
-        return '직진'
-    v1 = (curr_node['x'] - prev_node['x'], curr_node['y'] - prev_node['y'])
-    v2 = (next_node['x'] - curr_node['x'], next_node['y'] - curr_node['y'])
-    norm1 = math.hypot(*v1)
-    norm2 = math.hypot(*v2)
-    if norm1 == 0 or norm2 == 0:
-        return '직진'
-    cos_a = max(-1, min(1, (v1[0]*v2[0] + v1[1]*v2[1]) / (norm1*norm2)))
-    angle = math.degrees(math.acos(cos_a))
-    if abs(angle - 180) < 10:
+# Shortest paths run on the shared CSR engine (same tie-breaking as a Dijkstra over node id strings)
+# profile: 'default', 'wheelchair' (no stairs), 'fastest' (seconds) or 'fewest_floors' (see graph_engine.PROFILES)
+with metrics.timer('graph_compile'):
+    engine = CompiledGraph(graph['nodes'], graph['edges'])
+
+# Node records live in the engine's array-backed NodeStore: nodes[nid] is a slotted view that still reads
+# like the old dict (n['name'], n['x']); the raw JSON is dropped so each worker keeps only the compact arrays.
+# Hop distances in the route text come from the CSR too (engine.first_weight), so there is no second adjacency map
+nodes = engine.nodes
+del graph
+
+CORRIDOR, STAIR, ELEVATOR = TYPE_CODE['Corridor'], TYPE_CODE['Stair'], TYPE_CODE['Elevator']
+
+def shortest_path(start_id, end_id, profile='default'):
+    return engine.shortest_path(start_id, end_id, profile)
+
+# Up to k loopless alternatives in cost order (Yen), stopping early after budget_ms
+def alternative_paths(start_id, end_id, k=3, profile='default', budget_ms=None):
+    return engine.k_shortest_paths(start_id, end_id, k, profile, budget_ms)
+
+# Nearest node of a type (Restroom, Elevator, Stair, Door, Outside) from one start: uses the cached per-type distance field
+FACILITY_TYPES = ('Restroom', 'Elevator', 'Stair', 'Door', 'Outside')
+
+def nearest_facility(start_id, ntype, profile='default'):
+    facility_id, path, _ = engine.nearest_of_type(start_id, ntype, profile)
+    if facility_id is None:
+        return None, [], ''
+    return facility_id, path, format_path(path) if len(path) > 1 else ''
+
+# Turn angles for a whole path in one vectorised pass (graph_engine.turn_angles): angle in degrees and
+# direction +1 우회전 / -1 좌회전 / 0 직진 per node; buildings are compared by NodeStore code
+def path_turns(path_ids):
+    idx = [nodes.index[nid] for nid in path_ids]
+    return turn_angles(nodes.x[idx], nodes.y[idx], nodes.building[idx])
+
+def turn_text(angle, direction):
+    if direction == 0:
         return '직진'
-    cross = v1[0]*v2[1] - v1[1]*v2[0]
     # swapped: positive cross => 우회전, negative => 좌회전
-    direction = '우회전' if cross > 0 else '좌회전'
-    return f"{int(angle)}도 {direction}"
+    return f"{int(angle)}도 {'우회전' if direction > 0 else '좌회전'}"
 
-# Format path: collapse small-angle corridor nodes and hide weights for elevator/stair segments
-def format_path(path_ids):
-    def node_str(nid):
+# Compute turn angle for one prev -> curr -> next triple
+def compute_turn(prev_node, curr_node, next_node):
+    angle, direction = path_turns([prev_node['id'], curr_node['id'], next_node['id']])
+    return turn_text(angle[1], direction[1])
+
+# Route text is assembled from cached segments. A segment is one hop between consecutive stops
+# ("-> 12.34m -> (id: ..)" plus the turn taken at the arriving stop); it is keyed by the stop pair together with the
+# path nodes between them and the node after the arriving stop, which are exactly what its distance and turn depend on
+SEGMENT_CACHE_SIZE = 8192
+segment_cache = OrderedDict()
+_node_text = {}
+
+def node_str(nid):
+    text = _node_text.get(nid)
+    if text is None:
         n = nodes[nid]
-        return f"(id: {n['id']}, name: {n['name']}, type: {n['type']})"
-
-    # determine important stops
-    stops = [path_ids[0]]
-    L = len(path_ids)
-    for i in range(1, L-1):
-        nid = path_ids[i]
-        ntype = nodes[nid]['type']
-        if ntype in ('Elevator', 'Stair'):
-            stops.append(nid)
-        elif ntype != 'Corridor':
-            stops.append(nid)
-        else:
-            turn = compute_turn(nodes[path_ids[i-1]], nodes[nid], nodes[path_ids[i+1]])
-            if turn != '직진':
-                try:
-                    angle = int(turn.split('도')[0])
-                except:
-                    angle = None
-                if angle is not None and angle <= 15 \
-                   and nodes[path_ids[i-1]]['type']=='Corridor' \
-                   and nodes[path_ids[i+1]]['type']=='Corridor':
-                    continue
-                stops.append(nid)
-    stops.append(path_ids[-1])
-
-    out = []
-    out.append(node_str(stops[0]))
-    for j in range(1, len(stops)):
-        prev = stops[j-1]
-        curr = stops[j]
-        prev_type = nodes[prev]['type']
-        curr_type = nodes[curr]['type']
-        # elevator->elevator or stair->stair: hide weight
-        if prev_type == curr_type and prev_type in ('Elevator', 'Stair'):
-            out.append("-> ")
-            out.append(node_str(curr))
-            continue
+        text = _node_text[nid] = f"(id: {n.id}, name: {n.name}, type: {n.type})"
+    return text
+
+def stop_record(nid, distance=None, turn=None):
+    n = nodes[nid]
+    return {'id': n.id, 'name': n.name, 'type': n.type, 'building': n.building, 'floor': n.floor,
+            'distance': distance, 'turn': turn}
+
+# Collapse small-angle corridor nodes: positions in path_ids of the stops to mention.
+# Interior stops are non-corridor nodes and corridor turns, except turns of 15 degrees or less between corridors
+def route_stops(codes, angle, direction):
+    corridor = codes == CORRIDOR
+    with np.errstate(invalid='ignore'):
+        small = np.trunc(angle[1:-1]) <= 15
+    slight = small & corridor[:-2] & corridor[2:]
+    keep = ~corridor[1:-1] | ((direction[1:-1] != 0) & ~slight)
+    return [0] + (np.flatnonzero(keep) + 1).tolist() + [len(codes) - 1]
+
+# One hop i_prev -> i_curr as (text, stop record); elevator/stair hops hide the weight
+def _segment(path_ids, codes, angle, direction, i_prev, i_curr):
+    last = i_curr == len(path_ids) - 1
+    key = (tuple(path_ids[i_prev:i_curr+2]), last)
+    hit = segment_cache.get(key)
+    if hit is not None:
+        segment_cache.move_to_end(key)
+        metrics.inc('format_segment_hits')
+        return hit
+    metrics.inc('format_segment_misses')
+    curr = path_ids[i_curr]
+    if codes[i_prev] == codes[i_curr] and codes[i_curr] in (ELEVATOR, STAIR):
+        hit = (' ' + ' '.join(["-> ", node_str(curr)]), stop_record(curr))
+    else:
         # sum distance
         dist = 0
-        i_prev = path_ids.index(prev)
-        i_curr = path_ids.index(curr)
         for k in range(i_prev, i_curr):
-            for v, w in adj[path_ids[k]]:
-                if v == path_ids[k+1]:
-                    dist += w
-                    break
-        out.append(f"-> {dist:.2f}m -> ")
-        out.append(node_str(curr))
+            dist += engine.first_weight(path_ids[k], path_ids[k+1]) or 0
+        parts = [f"-> {dist:.2f}m -> ", node_str(curr)]
+        turn = None
         # add turn if needed
-        if curr not in (path_ids[0], path_ids[-1]) and curr_type not in ('Elevator', 'Stair'):
-            i = path_ids.index(curr)
-            turn = compute_turn(nodes[path_ids[i-1]], nodes[curr], nodes[path_ids[i+1]])
-            if turn != '직진':
-                out.append(f" <{turn}>")
-    return ' '.join(out)
+        if 0 < i_curr and not last and codes[i_curr] not in (ELEVATOR, STAIR) and direction[i_curr] != 0:
+            turn = turn_text(angle[i_curr], direction[i_curr])
+            parts.append(f" <{turn}>")
+        hit = (' ' + ' '.join(parts), stop_record(curr, dist, turn))
+    segment_cache[key] = hit
+    if len(segment_cache) > SEGMENT_CACHE_SIZE:
+        segment_cache.popitem(last=False)
+    return hit
+
+# Text and structured stops in one pass: stops are records {id, name, type, building, floor, distance, turn}
+# where distance is the walk from the previous stop (None at the start and across elevator/stair hops)
+def render_path(path_ids):
+    idx = [nodes.index[nid] for nid in path_ids]
+    codes = nodes.type_code[idx]
+    angle, direction = turn_angles(nodes.x[idx], nodes.y[idx], nodes.building[idx])
+    stops = route_stops(codes, angle, direction)
+    codes, angle, direction = codes.tolist(), angle.tolist(), direction.tolist()
+    text = [node_str(path_ids[0])]
+    records = [stop_record(path_ids[0])]
+    for i_prev, i_curr in zip(stops, stops[1:]):
+        seg_text, record = _segment(path_ids, codes, angle, direction, i_prev, i_curr)
+        text.append(seg_text)
+        records.append(dict(record))
+    return ''.join(text), records
+
+# Format path: collapse small-angle corridor nodes and hide weights for elevator/stair segments
+@metrics.timed('format_path')
+def format_path(path_ids):
+    return render_path(path_ids)[0]
+
+# Same route as a list of stop records, for clients that render it themselves
+def format_stops(path_ids):
+    return render_path(path_ids)[1]
+
+# Resolve a typed name through the name index; ask which one when several nodes match
+def pick_node(index, prompt):
+    matches = index.resolve(input(prompt))
+    if len(matches) <= 1:
+        return matches[0]['id'] if matches else None
+    for k, m in enumerate(matches, start=1):
+        print(f"  {k}. {describe(m)}")
+    choice = input(f"choose 1-{len(matches)} [1]: ").strip()
+    return matches[int(choice) - 1 if choice.isdigit() and 1 <= int(choice) <= len(matches) else 0]['id']
 
 if __name__ == '__main__':
-    start_name = input("start name: ")
-    end_name = input("end name: ")
-    start_ids = [nid for nid, n in nodes.items() if n['name'] == start_name]
-    end_ids = [nid for nid, n in nodes.items() if n['name'] == end_name]
-    if not start_ids or not end_ids:
+    from name_index import NameIndex, describe
+    index = NameIndex.load('merged_buildings_graph.json')
+    start_id = pick_node(index, "start name: ")
+    end_id = pick_node(index, "end name: ")
+    if start_id is None or end_id is None:
         print('Node name not found')
         sys.exit(1)
-    path = shortest_path(start_ids[0], end_ids[0])
+    path = shortest_path(start_id, end_id)
     if not path:
         print('No path found')
         sys.exit(1)
@@ -0,0 +1,289 @@
+# pipeline.py
+#
+# 층별 JSON → 건물 병합 → 캠퍼스 병합 → 학습 데이터 → vocab / 토큰 매핑 까지의 산출물을
+# 콘텐츠 해시 DAG 로 관리하는 재빌드 러너.
+#   - 각 스테이지의 입력/출력 sha256 을 .pipeline_state.json 에 기록하고
+#     입력 해시와 출력 해시가 기록과 같으면 건너뜀
+#   - 의존성이 끝난 스테이지들은 병렬 실행 (건물별 graphmerge 등)
+#   - 스테이지가 실패하면 새 스테이지를 시작하지 않고 즉시 종료
+#
+# 실행 예시:
+#   python pipeline.py run            # 바뀐 스테이지만 재실행
+#   python pipeline.py check          # 오래된(stale) 산출물이 있으면 목록 출력 후 exit 1
+#   python pipeline.py run --force training_data
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from merge_all import BUILDINGS as MERGED_BUILDINGS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+STATE_FILE = os.path.join(HERE, '.pipeline_state.json')
+
+# 층별 JSON 을 가진 건물 폴더 / 그 중 캠퍼스 그래프(merged_buildings_graph.json)에 들어가는 건물
+BUILDINGS = ['산학협력관', '제1공학관', '제2공학관']
+CAMPUS_BUILDINGS = MERGED_BUILDINGS
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Stage:
+    def __init__(self, name, inputs, outputs, run, deps=(), params=None):
+        self.name = name
+        self.inputs = inputs      # 절대 경로 리스트 (스크립트 자신 포함)
+        self.outputs = outputs
+        self.run = run            # callable(prev): prev 는 지난 실행 기록 (없으면 None)
+        self.deps = list(deps)
+        self.params = params or {}
+
+
+def run_script(cwd, *args):
+    """건물/캠퍼스 폴더를 CWD 로 두고 스크립트 실행 (스크립트들이 CWD 기준으로 파일을 읽음)."""
+    subprocess.run([sys.executable, *args], cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def build_stages(dist_encoding='round5'):
+    stages = []
+    for b in BUILDINGS:
+        bdir = os.path.join(ROOT, b)
+        floors = sorted(glob.glob(os.path.join(bdir, '*f.json')))
+        stages.append(Stage(
+            f'merge:{b}',
+            inputs=floors + [os.path.join(bdir, 'graphmerge.py')],
+            outputs=[os.path.join(bdir, 'merged_graph.json')],
+            run=lambda prev, bdir=bdir: run_script(bdir, 'graphmerge.py'),
+        ))
+    for b in CAMPUS_BUILDINGS:
+        src = os.path.join(ROOT, b, 'merged_graph.json')
+        dst = os.path.join(HERE, f'{b}.json')
+        stages.append(Stage(
+            f'copy:{b}', inputs=[src], outputs=[dst],
+            run=lambda prev, src=src, dst=dst: shutil.copyfile(src, dst),
+            deps=[f'merge:{b}'],
+        ))
+
+    graph = os.path.join(HERE, 'merged_buildings_graph.json')
+    data = os.path.join(HERE, 'training_data.txt')
+    stages.append(Stage(
+        'merge_all',
+        inputs=[os.path.join(HERE, f'{b}.json') for b in CAMPUS_BUILDINGS] + [os.path.join(HERE, 'merge_all.py')],
+        outputs=[graph],
+        run=lambda prev: run_script(HERE, 'merge_all.py'),
+        deps=[f'copy:{b}' for b in CAMPUS_BUILDINGS],
+    ))
+
+    data_index = data + '.idx.npz'
+    data_graph = data + '.graph.gz'
+
+    scripts = [os.path.join(HERE, p) for p in ('generate_training_data.py', 'distance_tokens.py')]
+
+    def gen_training(prev):
+        # 생성 스크립트는 그대로이고 이전 인덱스/그래프 스냅샷이 있으면 바뀐 쌍만 다시 만듦
+        same_scripts = prev is not None and all(prev['inputs'].get(_rel(p)) == file_sha256(p) for p in scripts)
+        if same_scripts and all(os.path.exists(p) for p in (data, data_index, data_graph)):
+            run_script(HERE, 'generate_training_data.py', '--incremental', '--dist-encoding', dist_encoding)
+            return
+        # generate_training_data.py 는 기존 파일을 덮어쓰지 않으므로 먼저 지움
+        if os.path.exists(data):
+            os.remove(data)
+        run_script(HERE, 'generate_training_data.py', '--dist-encoding', dist_encoding)
+
+    stages.append(Stage(
+        'training_data',
+        inputs=[graph] + scripts,
+        outputs=[data, data_index, data_graph],
+        run=gen_training,
+        deps=['merge_all'],
+        params={'dist_encoding': dist_encoding},
+    ))
+    stages.append(Stage(
+        'vocab',
+        inputs=[data, os.path.join(HERE, 'build_vocab.py')],
+        outputs=[os.path.join(HERE, 'token2idx.json')],
+        run=lambda prev: run_script(HERE, 'build_vocab.py'),
+        deps=['training_data'],
+    ))
+    stages.append(Stage(
+        'token_to_graphid',
+        inputs=[graph, os.path.join(HERE, 'generate_token_to_graphid.py')],
+        outputs=[os.path.join(HERE, 'token_to_graphid.json')],
+        run=lambda prev: run_script(HERE, 'generate_token_to_graphid.py'),
+        deps=['merge_all'],
+    ))
+    return stages
+
+
+# -- 상태 기록 / 비교 ------------------------------------------------------------------------------------------------
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def _rel(path):
+    return os.path.relpath(path, ROOT)
+
+
+def _hashes(paths):
+    return {_rel(p): file_sha256(p) if os.path.exists(p) else None for p in paths}
+
+
+def stale_reason(stage, state):
+    """스테이지가 최신이면 None, 아니면 이유 문자열."""
+    rec = state.get(stage.name)
+    if rec is None:
+        return 'never built'
+    if rec.get('params', {}) != stage.params:
+        return 'parameters changed'
+    missing = [_rel(p) for p in stage.inputs if not os.path.exists(p)]
+    if missing:
+        return f'missing input {missing[0]}'
+    cur_in = _hashes(stage.inputs)
+    for p, h in cur_in.items():
+        if rec['inputs'].get(p) != h:
+            return f'input changed: {p}'
+    for p, h in _hashes(stage.outputs).items():
+        if h is None:
+            return f'missing output {p}'
+        if rec['outputs'].get(p) != h:
+            return f'output modified: {p}'
+    return None
+
+
+def check(stages):
+    """모든 스테이지를 위상 순서로 검사해 (이름, 이유) 리스트 반환. 상위가 stale 이면 하위도 stale."""
+    state = load_state()
+    stale = {}
+    for st in stages:
+        reason = stale_reason(st, state)
+        if reason is None and any(d in stale for d in st.deps):
+            reason = 'upstream stale'
+        if reason:
+            stale[st.name] = reason
+    return list(stale.items())
+
+
+def require_fresh(artifacts, stages=None):
+    """
+    artifacts(HERE 기준 파일명) 를 만드는 스테이지나 그 상위가 stale 이면 RuntimeError.
+    파이프라인을 한 번도 돌리지 않은 작업 폴더(상태 파일 없음)는 검사하지 않는다.
+    """
+    if not os.path.exists(STATE_FILE):
+        return
+    stages = stages or build_stages(load_state().get('training_data', {}).get('params', {}).get('dist_encoding', 'round5'))
+    wanted = {os.path.join(HERE, a) for a in artifacts}
+    producers = {st.name for st in stages if wanted & set(st.outputs)}
+    stale = [(n, r) for n, r in check(stages) if n in producers]
+    if stale:
+        raise RuntimeError('stale artifacts: ' + ', '.join(f'{n} ({r})' for n, r in stale)
+                           + " - run 'python pipeline.py run' first")
+
+
+def run(stages, force=(), jobs=4, dry_run=False):
+    """
+    의존성이 풀린 스테이지를 병렬로 실행. 입력 해시가 기록과 같으면 건너뛴다.
+    상위 스테이지가 다시 실행됐어도 출력 해시가 그대로면 하위 스테이지는 건너뛰게 된다.
+    """
+    state = load_state()
+    by_name = {st.name: st for st in stages}
+    pending = set(by_name)
+    done = set()
+    ran, skipped = [], []
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while pending or running:
+            ready = [n for n in sorted(pending) if all(d in done for d in by_name[n].deps)]
+            for name in ready:
+                pending.discard(name)
+                st = by_name[name]
+                reason = 'forced' if name in force else stale_reason(st, state)
+                if reason is None:
+                    skipped.append(name)
+                    done.add(name)
+                    continue
+                print(f"[run ] {name}: {reason}")
+                if dry_run:
+                    ran.append(name)
+                    done.add(name)
+                    continue
+                running[pool.submit(st.run, state.get(name))] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                st = by_name[name]
+                try:
+                    fut.result()
+                except Exception as e:
+                    # 실패 즉시 중단: 이미 실행 중인 스테이지만 끝까지 기다림
+                    for other in running:
+                        other.cancel()
+                    save_state(state)
+                    raise RuntimeError(f"stage '{name}' failed: {e}") from e
+                state[name] = {
+                    'params': st.params,
+                    'inputs': _hashes(st.inputs),
+                    'outputs': _hashes(st.outputs),
+                }
+                save_state(state)
+                ran.append(name)
+                done.add(name)
+    return ran, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='그래프 → 학습 산출물 재빌드 파이프라인')
+    parser.add_argument('command', choices=['run', 'check'])
+    parser.add_argument('--dist-encoding', default='round5')
+    parser.add_argument('--jobs', type=int, default=4)
+    parser.add_argument('--force', nargs='*', default=[], help='강제로 다시 실행할 스테이지 이름')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    stages = build_stages(args.dist_encoding)
+
+    if args.command == 'check':
+        stale = check(stages)
+        for name, reason in stale:
+            print(f"[stale] {name}: {reason}")
+        if stale:
+            sys.exit(1)
+        print("all artifacts up to date")
+        return
+
+    try:
+        ran, skipped = run(stages, force=set(args.force), jobs=args.jobs, dry_run=args.dry_run)
+    except RuntimeError as e:
+        print(f"[fail] {e}")
+        sys.exit(1)
+    print(f"ran {len(ran)} stage(s), {len(skipped)} up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+# route_server.py
+#
+# 그래프와 모델을 메모리에 올려 둔 채로 경로 요청을 받는 asyncio HTTP 서버 (표준 라이브러리만 사용).
+#   - GET /route?start=..&end=..            다익스트라 경로 (노드 id 리스트, 총 거리)
+#   - GET /route/formatted?start=..&end=..  format_path 문장과 경유 지점 목록 (stops: id, name, type, building, floor,
+#                                           distance: 앞 지점부터 거리, turn: 회전 안내. 클라이언트가 직접 그릴 때)
+#   - GET /route/model?start=..&end=..      Transformer greedy 디코딩 토큰
+#   - GET /route/alternatives?start=..&end=..&k=3  비용 순 대안 경로 k 개 (Yen, ALT_BUDGET_MS 안에서)
+#   - GET /nearest?start=..&type=Restroom   가장 가까운 시설과 경로 (Restroom / Elevator / Stair / Door / Outside)
+#   - GET /health
+#   - GET /closures, POST /closures {"close_nodes", "open_nodes", "close_edges", "open_edges", "clear"}
+#     폐쇄 목록은 closures.json 으로 공유되고, 모든 서버 프로세스가 요청마다 바뀌었는지 확인해 반영 (closures.py)
+#   - GET /metrics (Prometheus text), GET /metrics.json: ROUTE_METRICS=1 로 띄웠을 때 엔드포인트별 처리 시간,
+#     다익스트라 확장 노드 수, 디코딩 step 수 등 (metrics.py)
+#   start / end 는 노드 id 또는 이름 (name_index 로 해석, building / floor 파라미터로 좁힘).
+#   /route, /route/formatted, /nearest 는 profile 파라미터 (default / wheelchair / fastest / fewest_floors) 를 받는다.
+#   같은 파라미터를 POST JSON 본문으로 보내도 된다.
+#   - 모델 디코딩은 크기가 정해진 스레드 풀에서 실행해 이벤트 루프를 막지 않고,
+#     동시에 들어온 모델 요청은 최대 --max-batch 개씩 모아 greedy_decode 한 번으로 처리
+#   - 기본 주소는 127.0.0.1 (로컬에서만 접속)
+#
+# 실행 예시 (전체 그래프 폴더에서):
+#   python route_server.py --port 8080
+#   curl "http://127.0.0.1:8080/route/formatted?start=85101&end=25122"
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import metrics
+import pathfinder
+from closures import ClosureBoard
+from graph_engine import PROFILES
+from name_index import NameIndex
+
+HOST = '127.0.0.1'
+PORT = 8080
+MAX_BATCH = 32       # 한 번의 forward 에 넣을 최대 요청 수
+BATCH_WAIT_MS = 5    # 첫 요청이 들어온 뒤 다른 요청을 기다리는 시간
+QUEUE_LIMIT = 256    # 대기 중인 모델 요청이 이보다 많으면 503
+MAX_BODY = 1 << 16
+MAX_ALTERNATIVES = 10
+ALT_BUDGET_MS = 50
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'error': message, **extra}
+
+
+class ModelBatcher:
+    """모델 요청을 큐에 모아 배치로 디코딩. 동시에 실행되는 배치 수는 풀 크기로 제한된다."""
+
+    def __init__(self, model, workers=1, max_batch=MAX_BATCH, wait_ms=BATCH_WAIT_MS, queue_limit=QUEUE_LIMIT):
+        import transformer_pathfinder as tp
+        self.tp = tp
+        self.model = model
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = asyncio.Semaphore(workers)
+        self.queue = asyncio.Queue(maxsize=queue_limit)
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+        self.pool.shutdown(wait=True)
+
+    async def submit(self, start_tok, end_tok):
+        tp = self.tp
+        if start_tok not in tp.token2idx or end_tok not in tp.token2idx:
+            raise HTTPError(404, 'token not in vocabulary', start=start_tok, end=end_tok)
+        src = [tp.token2idx['<SOS>'], tp.token2idx[start_tok], tp.token2idx[end_tok], tp.token2idx['<EOS>']]
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((src, fut))
+        except asyncio.QueueFull:
+            raise HTTPError(503, 'model queue full')
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.slots.acquire()
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            rows = await asyncio.get_running_loop().run_in_executor(self.pool, self.decode, [s for s, _ in batch])
+            for (_, fut), row in zip(batch, rows):
+                if not fut.done():
+                    fut.set_result(row)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self.slots.release()
+
+    def decode(self, srcs):
+        """풀 스레드에서 실행: 입력들을 <PAD> 로 맞춰 한 번에 greedy_decode 하고 행별 토큰 리스트 반환."""
+        tp = self.tp
+        pad, eos = tp.token2idx['<PAD>'], tp.token2idx['<EOS>']
+        width = max(len(s) for s in srcs)
+        src = tp.torch.tensor([s + [pad] * (width - len(s)) for s in srcs], dtype=tp.torch.long, device=tp.device)
+        rows = []
+        with metrics.timer('batch_decode'):
+            decoded = tp.greedy_decode(self.model, src).tolist()
+        for ys in decoded:
+            ys = ys[1:]
+            if eos in ys:
+                ys = ys[:ys.index(eos)]
+            rows.append([tp.idx2token[i] for i in ys if i != pad])
+        return rows
+
+
+class RouteService:
+    def __init__(self, batcher=None):
+        self.engine = pathfinder.engine
+        self.nodes = pathfinder.nodes
+        self.index = NameIndex.load('merged_buildings_graph.json')
+        self.batcher = batcher
+        self.board = ClosureBoard()
+
+    def resolve(self, params, key):
+        """노드 id 이면 그대로, 아니면 이름으로 찾는다. 후보가 여러 개면 409 와 후보 목록."""
+        value = params.get(key)
+        if not value or not isinstance(value, str):
+            raise HTTPError(400, f"missing parameter '{key}'")
+        if value in self.engine.index:
+            return value
+        matches = self.index.resolve(value, params.get('building'), params.get('floor'))
+        if not matches:
+            raise HTTPError(404, f"unknown node '{value}'")
+        if len(matches) > 1:
+            raise HTTPError(409, f"'{value}' is ambiguous", candidates=matches)
+        return matches[0]['id']
+
+    def profile(self, params):
+        name = params.get('profile', 'default')
+        if name not in PROFILES:
+            raise HTTPError(400, f"profile must be one of {', '.join(PROFILES)}")
+        return name
+
+    def route(self, params):
+        profile = self.profile(params)
+        s, t = self.resolve(params, 'start'), self.resolve(params, 'end')
+        path = self.engine.shortest_path(s, t, profile)
+        if not path:
+            raise HTTPError(404, 'no path', start=s, end=t, profile=profile)
+        return {'start': s, 'end': t, 'profile': profile, 'path': path,
+                'length': self.engine.path_length(path), 'cost': self.engine.path_length(path, profile)}
+
+    def formatted(self, params):
+        result = self.route(params)
+        result['text'], result['stops'] = pathfinder.render_path(result['path'])
+        return result
+
+    def alternatives(self, params):
+        profile = self.profile(params)
+        s, t = self.resolve(params, 'start'), self.resolve(params, 'end')
+        k = params.get('k', '3')
+        if not k.isdigit() or not 1 <= int(k) <= MAX_ALTERNATIVES:
+            raise HTTPError(400, f"k must be 1-{MAX_ALTERNATIVES}")
+        routes = pathfinder.alternative_paths(s, t, int(k), profile, ALT_BUDGET_MS)
+        if not routes:
+            raise HTTPError(404, 'no path', start=s, end=t, profile=profile)
+        out = []
+        for cost, path in routes:
+            text, stops = pathfinder.render_path(path)
+            out.append({'cost': cost, 'length': self.engine.path_length(path), 'path': path, 'text': text, 'stops': stops})
+        return {'start': s, 'end': t, 'profile': profile, 'routes': out}
+
+    def nearest(self, params):
+        profile = self.profile(params)
+        s = self.resolve(params, 'start')
+        ntype = params.get('type')
+        if ntype not in pathfinder.FACILITY_TYPES:
+            raise HTTPError(400, f"type must be one of {', '.join(pathfinder.FACILITY_TYPES)}")
+        facility, path, text = pathfinder.nearest_facility(s, ntype, profile)
+        if facility is None:
+            raise HTTPError(404, f"no reachable {ntype}", start=s, profile=profile)
+        return {'start': s, 'facility': facility, 'name': self.nodes[facility]['name'], 'profile': profile, 'path': path,
+                'length': self.engine.path_length(path), 'text': text}
+
+    async def model_route(self, params):
+        if self.batcher is None:
+            raise HTTPError(503, 'model not loaded')
+        # 모델 토큰은 노드 이름. id 로 받으면 이름으로 바꾼다
+        toks = []
+        for key in ('start', 'end'):
+            value = params.get(key)
+            if not value:
+                raise HTTPError(400, f"missing parameter '{key}'")
+            toks.append(self.nodes[value]['name'] if value in self.nodes else value)
+        return {'start': toks[0], 'end': toks[1], 'tokens': await self.batcher.submit(*toks)}
+
+    def closures(self, method, params):
+        if method == 'POST':
+            lists = {}
+            for key in ('close_nodes', 'open_nodes', 'close_edges', 'open_edges'):
+                value = params.get(key, [])
+                if not isinstance(value, list):
+                    raise HTTPError(400, f"'{key}' must be a list")
+                if key.endswith('_edges'):
+                    ok = all(isinstance(e, list) and len(e) == 2 and all(isinstance(n, str) for n in e)
+                             for e in value)
+                    if not ok:
+                        raise HTTPError(400, f"'{key}' must be a list of [source, target] id pairs")
+                elif not all(isinstance(n, str) for n in value):
+                    raise HTTPError(400, f"'{key}' must be a list of node ids")
+                lists[key] = value
+            clear = params.get('clear', False)
+            clear = clear if isinstance(clear, bool) else str(clear).lower() in ('1', 'true')
+            self.board.update(clear=clear, **lists)
+            self.board.sync(self.engine)
+        return self.board.read()
+
+    async def dispatch(self, method, path, params):
+        if method not in ('GET', 'POST'):
+            raise HTTPError(405, f"method {method} not allowed")
+        self.board.sync(self.engine)
+        if path == '/closures':
+            return self.closures(method, params)
+        if path == '/metrics':
+            return metrics.prometheus_text() if metrics.ENABLED else '# metrics disabled (start with ROUTE_METRICS=1)\n'
+        if path == '/metrics.json':
+            return metrics.as_dict()
+        if path == '/health':
+            return {'status': 'ok', 'nodes': len(self.engine), 'model': self.batcher is not None}
+        if path == '/route':
+            return self.route(params)
+        if path == '/route/formatted':
+            return self.formatted(params)
+        if path == '/route/alternatives':
+            return self.alternatives(params)
+        if path == '/nearest':
+            return self.nearest(params)
+        if path == '/route/model':
+            return await self.model_route(params)
+        raise HTTPError(404, f"no endpoint {path}")
+
+
+# -- HTTP ---------------------------------------------------------------------------------------------------------------
+
+async def read_request(reader):
+    """요청 하나를 읽어 (method, path, params, keep_alive) 반환. 연결이 닫혔으면 None."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, 'bad request line')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+
+    try:
+        # 헤더는 latin-1 로 읽었으니, 인코딩하지 않은 한글 쿼리는 원래 바이트로 되돌려 UTF-8 로 다시 읽는다
+        target = target.encode('latin-1').decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPError(400, 'request target is not UTF-8')
+    url = urlsplit(target)
+    params = dict(parse_qsl(url.query))
+    length = int(headers.get('content-length', 0) or 0)
+    if length > MAX_BODY:
+        raise HTTPError(413, 'body too large')
+    if length:
+        body = await reader.readexactly(length)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, 'body is not JSON')
+        if not isinstance(data, dict):
+            raise HTTPError(400, 'body must be a JSON object')
+        params.update({k: v if isinstance(v, list) else str(v) for k, v in data.items()})
+    keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+    return method, url.path, params, keep_alive
+
+
+def write_response(writer, status, payload, keep_alive):
+    """payload 가 문자열이면 text/plain (Prometheus 형식), 아니면 JSON."""
+    if isinstance(payload, str):
+        body, ctype = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body, ctype = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {ctype}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+
+
+async def handle(service, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                req = await read_request(reader)
+                if req is None:
+                    break
+                method, path, params, keep_alive = req
+                t = time.perf_counter()
+                status, payload = 200, await service.dispatch(method, path, params)
+                # 있는 엔드포인트만 이름으로 기록 (임의 경로로 지표가 늘어나지 않게)
+                metrics.observe('http' + path.replace('/', '_').replace('.', '_') + '_seconds', time.perf_counter() - t)
+            except HTTPError as e:
+                metrics.inc(f'http_errors_{e.status}')
+                status, payload = e.status, e.payload
+            except (asyncio.LimitOverrunError, ValueError) as e:
+                status, payload = 400, {'error': str(e)}
+            except Exception as e:
+                metrics.inc('http_errors_500')
+                status, payload = 500, {'error': repr(e)}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=HOST, port=PORT, model_path=None, workers=1, max_batch=MAX_BATCH, wait_ms=BATCH_WAIT_MS):
+    batcher = None
+    if model_path:
+        import transformer_pathfinder as tp
+        batcher = ModelBatcher(tp.load_model(model_path), workers, max_batch, wait_ms)
+        batcher.start()
+    service = RouteService(batcher)
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    print(f"listening on http://{host}:{port} (model: {'on' if batcher else 'off'})", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if batcher:
+            await batcher.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--model', default='transformer_maze_model.pt', help='체크포인트 경로 (없으면 모델 엔드포인트 비활성)')
+    parser.add_argument('--workers', type=int, default=1, help='모델 디코딩 스레드 수')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--batch-wait-ms', type=float, default=BATCH_WAIT_MS)
+    args = parser.parse_args()
+
+    model_path = args.model if os.path.exists(args.model) else None
+    if model_path is None:
+        print(f"모델 파일 없음 ({args.model}): /route/model 비활성")
+    try:
+        asyncio.run(serve(args.host, args.port, model_path, args.workers, args.max_batch, args.batch_wait_ms))
+    except KeyboardInterrupt:
+        pass
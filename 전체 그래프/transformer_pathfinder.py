@@ -6,6 +6,8 @@ import sys
 import torch
 import torch.nn as nn
 
+import metrics
+
 # 1) Device 설정
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
@@ -79,37 +81,98 @@ class TransformerSeq2Seq(nn.Module):
         )
         return self.fc_out(out)
 
+    def encode(self, src, src_key_padding_mask):
+        """인코더만 한 번 실행해 memory (B, S, d_model) 반환 (디코딩 스텝마다 재사용)."""
+        src_emb = self.pos_encoder(
+            self.embedding(src) * math.sqrt(self.embedding.embedding_dim)
+        )
+        return self.transformer.encoder(src_emb, src_key_padding_mask=src_key_padding_mask)
+
+    def decode(self, tgt, memory, tgt_key_padding_mask, memory_key_padding_mask):
+        """캐시된 memory 로 디코더만 실행해 로짓 (B, T, vocab_size) 반환."""
+        tgt_emb = self.pos_encoder(
+            self.embedding(tgt) * math.sqrt(self.embedding.embedding_dim)
+        )
+        tgt_mask = generate_square_subsequent_mask(tgt_emb.size(1)).to(tgt.device)
+        out = self.transformer.decoder(
+            tgt_emb, memory,
+            tgt_mask=tgt_mask,
+            tgt_key_padding_mask=tgt_key_padding_mask,
+            memory_key_padding_mask=memory_key_padding_mask
+        )
+        return self.fc_out(out)
+
 def create_padding_mask(seq):
     return (seq == 0)
 
-# 4) 모델 생성 후 가중치 로드
-model = TransformerSeq2Seq(vocab_size).to(device)
-model.load_state_dict(torch.load('transformer_maze_model.pt', map_location=device))
-model.eval()
+# 4) 모델 생성 후 가중치 로드 (처음 사용할 때 한 번만)
+MODEL_PATH = 'transformer_maze_model.pt'
+model = None
+
+def load_model(path=MODEL_PATH, map_location=None):
+    """체크포인트를 읽어 eval 모드의 TransformerSeq2Seq 를 반환."""
+    map_location = map_location or device
+    m = TransformerSeq2Seq(vocab_size).to(map_location)
+    m.load_state_dict(torch.load(path, map_location=map_location))
+    m.eval()
+    return m
+
+def get_model():
+    global model
+    if model is None:
+        with metrics.timer('model_load'):
+            model = load_model()
+    return model
+
+# 5) 배치 greedy 디코딩: 인코더는 한 번만, 끝난 행은 <PAD> 로 채움
+@torch.no_grad()
+def greedy_decode(m, src, max_len=100):
+    """
+    src: (B, S) long. 반환값 ys: (B, 1+T) long, <SOS> 로 시작하고
+    <EOS> 이후 위치는 <PAD>(0). 모든 행이 <EOS> 를 내면 조기 종료.
+    """
+    sos, eos, pad = token2idx['<SOS>'], token2idx['<EOS>'], token2idx['<PAD>']
+    src_pad = create_padding_mask(src)
+    with metrics.timer('encode'), metrics.profiled('encode'):
+        memory = m.encode(src, src_pad)
+    ys = torch.full((src.size(0), 1), sos, dtype=torch.long, device=src.device)
+    finished = torch.zeros(src.size(0), dtype=torch.bool, device=src.device)
+    steps = 0
+    for _ in range(max_len):
+        steps += 1
+        with metrics.timer('decode_step'), metrics.profiled('decode_step'):
+            out = m.decode(ys, memory, create_padding_mask(ys), src_pad)
+            next_tok = out[:, -1, :].argmax(dim=-1)
+            next_tok = next_tok.masked_fill(finished, pad)
+            ys = torch.cat([ys, next_tok.unsqueeze(1)], dim=1)
+            finished |= next_tok == eos
+            done = bool(finished.all())
+        if done:
+            break
+    metrics.observe('decode_steps', steps)
+    metrics.observe('decode_batch_size', src.size(0))
+    return ys
 
-# 5) 추론 함수: start_id, end_id 는 토큰으로 쓰이는 문자열이어야 합니다
+# 6) 추론 함수: start_id, end_id 는 토큰으로 쓰이는 문자열이어야 합니다
 @torch.no_grad()
 def infer_sequence(start_id, end_id, max_len=100):
     if start_id not in token2idx or end_id not in token2idx:
         raise ValueError(f"'{start_id}' or '{end_id}' not in token2idx.")
     sos, eos = token2idx['<SOS>'], token2idx['<EOS>']
-    src_idxs = [sos, token2idx[start_id], token2idx[end_id], eos]
-    src = torch.tensor([src_idxs], device=device)
-    src_pad = create_padding_mask(src)
-
-    ys = torch.tensor([[sos]], device=device)
-    for _ in range(max_len):
-        ys_pad = create_padding_mask(ys)
-        out = model(src, ys, src_pad, ys_pad, src_pad)
-        next_tok = out[:, -1, :].argmax(dim=-1).item()
-        ys = torch.cat([ys, torch.tensor([[next_tok]], device=device)], dim=1)
-        if next_tok == eos:
-            break
+    with metrics.timer('tokenize'):
+        src_idxs = [sos, token2idx[start_id], token2idx[end_id], eos]
+        src = torch.tensor([src_idxs], device=device)
 
-    tokens = [idx2token[idx] for idx in ys.squeeze().tolist()[1:-1]]
+    m = get_model()
+    with metrics.timer('decode'):
+        ys = greedy_decode(m, src, max_len=max_len)[0].tolist()[1:]
+    with metrics.timer('detokenize'):
+        if eos in ys:
+            ys = ys[:ys.index(eos)]
+        tokens = [idx2token[idx] for idx in ys]
     return tokens
 
-# 6) main: 노드 ID 토큰을 직접 입력
+# 7) main: 노드 ID 토큰을 직접 입력
 if __name__ == '__main__':
     start_token = input("start token: ").strip()
     end_token   = input("end token: ").strip()
@@ -0,0 +1,132 @@
+# validate_graph.py
+#
+# 병합 그래프(merged_buildings_graph.json 또는 건물별 merged_graph.json)를 경로 탐색 전에 검사한다.
+#   - 오류: 양 끝이 nodes 에 없는 간선 (format_path 의 adj[...] 가 KeyError), 음수/NaN 가중치, 중복 노드 id
+#   - 경고: 연결 요소가 여러 개 (다른 요소로는 경로 없음), 같은 이름의 노드 (token_to_graphid 는 마지막 것만 남김),
+#           인접 층에 짝이 없는 엘리베이터/계단 번호 (graphmerge 의 층간 연결이 빠짐), 자기 자신으로 가는 간선
+#   - 연결 요소는 graph_engine.connected_components (벡터화 union-find), 나머지도 numpy 로 한 번에 검사
+#
+# 실행 예시:
+#   python validate_graph.py                       # merged_buildings_graph.json
+#   python validate_graph.py ../제1공학관/merged_graph.json --json
+# 오류가 있으면 exit 1
+
+import argparse
+import json
+import re
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from graph_engine import connected_components, split_id
+
+# 이름이 여러 번 나와도 정상인 유형 (통로 노드는 NodeN 같은 자동 이름을 공유)
+SHARED_NAME_TYPES = {'Corridor'}
+LINK_NAME = {'Elevator': re.compile(r'elevator(\d+)'), 'Stair': re.compile(r'stair(\d+)')}
+
+
+def validate(graph, max_listed=20):
+    """
+    그래프 dict({'nodes', 'edges'})를 검사해 {'errors': {...}, 'warnings': {...}, 'stats': {...}} 를 반환.
+    각 항목은 문제 목록 (최대 max_listed 개) 과 전체 개수를 담는다.
+    """
+    nodes, edges = graph['nodes'], graph['edges']
+    ids = np.array([str(n['id']) for n in nodes], dtype=object)
+    names = np.array([n.get('name', '') for n in nodes], dtype=object)
+    types = np.array([n.get('type', '') for n in nodes], dtype=object)
+    errors, warnings = {}, {}
+
+    def report(target, key, items, count=None):
+        count = len(items) if count is None else count
+        if count:
+            target[key] = {'count': count, 'items': list(items[:max_listed])}
+
+    # 중복 id
+    uniq, counts = np.unique(ids, return_counts=True)
+    report(errors, 'duplicate_ids', uniq[counts > 1].tolist())
+
+    # 간선 끝점 / 가중치
+    src = np.array([str(e['source']) for e in edges], dtype=object)
+    tgt = np.array([str(e['target']) for e in edges], dtype=object)
+    w = np.array([e.get('weight', np.nan) for e in edges], dtype=np.float64)
+    src_ok, tgt_ok = np.isin(src, uniq), np.isin(tgt, uniq)
+    bad = np.flatnonzero(~(src_ok & tgt_ok))
+    report(errors, 'dangling_edges', [{'source': src[i], 'target': tgt[i]} for i in bad[:max_listed]], len(bad))
+    bad_w = np.flatnonzero(~(w >= 0))
+    report(errors, 'bad_weights', [{'source': src[i], 'target': tgt[i], 'weight': None if np.isnan(w[i]) else float(w[i])}
+                                   for i in bad_w[:max_listed]], len(bad_w))
+    loops = np.flatnonzero(src == tgt)
+    report(warnings, 'self_loops', sorted(set(src[loops].tolist())))
+
+    # 연결 요소 (끝점이 있는 간선만, 무방향)
+    ok = src_ok & tgt_ok
+    pos = np.searchsorted(uniq, np.concatenate([src[ok], tgt[ok]]))
+    m = int(ok.sum())
+    labels = connected_components(len(uniq), pos[:m], pos[m:])
+    sizes = np.bincount(labels)
+    main = int(np.argmax(sizes)) if len(sizes) else 0
+    # 가장 큰 요소 밖의 작은 요소들: 요소마다 노드 id 목록
+    others = [c for c in np.argsort(-sizes) if c != main]
+    report(warnings, 'disconnected_components',
+           [{'size': int(sizes[c]), 'nodes': uniq[labels == c][:max_listed].tolist()} for c in others[:max_listed]], len(others))
+
+    # 같은 이름 (통로 제외)
+    named = ~np.isin(types, list(SHARED_NAME_TYPES)) & (names != '')
+    n_uniq, n_inv, n_counts = np.unique(names[named], return_inverse=True, return_counts=True)
+    named_ids = ids[named]
+    dup = np.flatnonzero(n_counts > 1)
+    report(warnings, 'duplicate_names',
+           [{'name': n_uniq[k], 'ids': named_ids[n_inv == k].tolist()} for k in dup[:max_listed]], len(dup))
+
+    # 엘리베이터/계단 번호: 건물별로 인접 층 사이에 짝이 없는 번호
+    links = defaultdict(lambda: defaultdict(set))  # (건물, 유형) -> 층 -> {번호}
+    unnumbered = []
+    for i in np.flatnonzero(np.isin(types, list(LINK_NAME))):
+        where = split_id(ids[i])
+        match = LINK_NAME[types[i]].search(names[i])
+        if where is None:
+            continue
+        if not match:
+            unnumbered.append(ids[i])
+            continue
+        links[(where[0], types[i])][where[1]].add(match.group(1))
+    unmatched = []
+    for (building, kind), floors in sorted(links.items()):
+        order = sorted(floors, key=lambda f: int(f[:-1]))
+        for f1, f2 in zip(order, order[1:]):
+            for idx in sorted(floors[f1] ^ floors[f2]):
+                unmatched.append({'building': building, 'type': kind, 'index': idx,
+                                  'floors': [f1, f2], 'missing_on': f2 if idx in floors[f1] else f1})
+    report(warnings, 'unmatched_links', unmatched)
+    report(warnings, 'unnumbered_links', unnumbered)
+
+    stats = {'nodes': len(nodes), 'edges': len(edges), 'components': int(len(sizes)),
+             'largest_component': int(sizes.max()) if len(sizes) else 0}
+    return {'errors': errors, 'warnings': warnings, 'stats': stats}
+
+
+def print_report(result):
+    s = result['stats']
+    print(f"노드 {s['nodes']}개, 간선 {s['edges']}개, 연결 요소 {s['components']}개 (최대 {s['largest_component']})")
+    for level in ('errors', 'warnings'):
+        for key, entry in result[level].items():
+            print(f"[{'error' if level == 'errors' else 'warn '}] {key}: {entry['count']}")
+            for item in entry['items']:
+                print(f"    {item}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('graph', nargs='?', default='merged_buildings_graph.json')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON 으로 출력')
+    parser.add_argument('--max-listed', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.graph, 'r', encoding='utf-8') as f:
+        result = validate(json.load(f), args.max_listed)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_report(result)
+    sys.exit(1 if result['errors'] else 0)
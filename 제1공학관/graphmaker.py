@@ -2,14 +2,489 @@ import sys
 import os
 import json
 import math
+import threading
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QGraphicsView, QGraphicsScene,
-    QGraphicsEllipseItem, QGraphicsLineItem, QGraphicsPixmapItem, QGraphicsTextItem,
+    QGraphicsEllipseItem, QGraphicsLineItem, QGraphicsPixmapItem, QGraphicsSimpleTextItem,
     QGraphicsItem, QAction, QToolBar, QDockWidget, QWidget, QFormLayout, QLineEdit,
-    QComboBox, QPushButton, QInputDialog, QStatusBar
+    QComboBox, QPushButton, QInputDialog, QStatusBar, QStyleOptionGraphicsItem, QGraphicsPathItem,
+    QUndoCommand, QUndoStack, QUndoGroup
 )
-from PyQt5.QtGui import QBrush, QColor, QPen, QPixmap, QPainter
-from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QBrush, QColor, QPen, QPixmap, QPainter, QImage, QImageReader, QPainterPath, QKeySequence
+from PyQt5.QtCore import Qt, QPointF, QRectF, QRect, QTimer
+
+import graphmerge
+
+# Route preview runs on the shared shortest-path engine in ../전체 그래프
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '전체 그래프'))
+try:
+    from graph_engine import CompiledGraph
+except ImportError:
+    CompiledGraph = None
+# Auto Edges rules and kNN are shared with generate.py (auto-digitised floors)
+try:
+    from auto_edges import propose_edges
+except ImportError:
+    propose_edges = None
+
+# Node labels are not painted below this zoom level (view scale)
+LABEL_MIN_LOD = 0.5
+# Hit-test tolerance in scene pixels for clicks on nodes/edges
+PICK_TOLERANCE = 5
+# Moved edges are recomputed at most once per frame (~60 fps)
+FRAME_MS = 16
+# Background pyramid: tile edge in pixels, tiles kept decoded per background
+TILE_SIZE = 512
+TILE_CACHE_LIMIT = 64
+# bumped when the tile layout changes so pyramids cut by an older version are rebuilt
+TILE_FORMAT = 2
+# Project mode: merged graph / route preview is refreshed this long after the last edit
+PREVIEW_DELAY_MS = 150
+# Autosave journal is folded into the floor JSON after this many ops, or this long after the last edit
+JOURNAL_COMPACT_OPS = 256
+JOURNAL_IDLE_MS = 10000
+
+
+class SpatialGrid:
+    """
+    Uniform grid over scene coordinates used for hit-testing.
+    Nodes are stored by their bounding box, edges by the cells their segment passes through.
+    """
+    def __init__(self, cell=64.0):
+        self.cell = cell
+        self.cells = {}       # (cx, cy) -> set of items
+        self.item_cells = {}  # item -> list of (cx, cy)
+
+    def _rect_cells(self, x0, y0, x1, y1):
+        c = self.cell
+        return [(i, j)
+                for i in range(math.floor(x0 / c), math.floor(x1 / c) + 1)
+                for j in range(math.floor(y0 / c), math.floor(y1 / c) + 1)]
+
+    def _segment_cells(self, p1, p2, margin):
+        # walk the segment in half-cell steps and cover each sample +- margin
+        length = math.hypot(p2.x() - p1.x(), p2.y() - p1.y())
+        steps = max(1, int(length / (self.cell / 2)))
+        keys = set()
+        for k in range(steps + 1):
+            t = k / steps
+            x = p1.x() + (p2.x() - p1.x()) * t
+            y = p1.y() + (p2.y() - p1.y()) * t
+            keys.update(self._rect_cells(x - margin, y - margin, x + margin, y + margin))
+        return list(keys)
+
+    def _store(self, item, keys):
+        self.remove(item)
+        self.item_cells[item] = keys
+        for k in keys:
+            self.cells.setdefault(k, set()).add(item)
+
+    def insert_point(self, item, pos, radius):
+        self._store(item, self._rect_cells(pos.x() - radius, pos.y() - radius, pos.x() + radius, pos.y() + radius))
+
+    def insert_segment(self, item, p1, p2, margin=PICK_TOLERANCE):
+        self._store(item, self._segment_cells(p1, p2, margin))
+
+    def remove(self, item):
+        for k in self.item_cells.pop(item, ()):
+            bucket = self.cells.get(k)
+            if bucket is not None:
+                bucket.discard(item)
+                if not bucket:
+                    del self.cells[k]
+
+    def query(self, x, y, radius):
+        found = set()
+        for k in self._rect_cells(x - radius, y - radius, x + radius, y + radius):
+            found |= self.cells.get(k, set())
+        return found
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+
+
+class EdgeUpdateQueue:
+    """
+    Collects edges whose endpoints moved and recomputes each one once per frame,
+    instead of on every ItemPositionHasChanged of every dragged node.
+    """
+    def __init__(self, parent=None, on_flush=None):
+        self.dirty = {}  # insertion-ordered set of EdgeItem
+        self.on_flush = on_flush  # called after a flush that moved at least one edge
+        self.timer = QTimer(parent)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(FRAME_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def mark(self, edges):
+        self.dirty.update(dict.fromkeys(edges))
+        if self.dirty and not self.timer.isActive():
+            self.timer.start()
+
+    def discard(self, edge):
+        self.dirty.pop(edge, None)
+
+    def flush(self):
+        self.timer.stop()
+        dirty, self.dirty = self.dirty, {}
+        for edge in dirty:
+            edge.update_position()
+        if dirty and self.on_flush is not None:
+            self.on_flush()
+
+    def clear(self):
+        self.timer.stop()
+        self.dirty.clear()
+
+
+class LayerRoot(QGraphicsItem):
+    """Invisible parent of one floor's items; hiding it hides the whole floor."""
+    def __init__(self):
+        super().__init__()
+        self.setFlag(QGraphicsItem.ItemHasNoContents)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+
+class FloorLayer:
+    """
+    One floor of an open project. Holds the editor state that is swapped in
+    while the floor is active, plus its cached graphmerge.prefix_floor part.
+    """
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.root = LayerRoot()
+        self.nodes = {}
+        self.edges = {}
+        self.grid = SpatialGrid()
+        self.bg_item = None
+        self.scale_factor = 1.0
+        self.next_id = 1
+        self.part = None  # (nodes, edges, elevators, stairs) with floor-prefixed ids; None when stale
+        self.modified = False
+        self.undo_stack = None
+        self.journal = None
+
+
+def floor_json(nodes, edges, bg_item, scale):
+    """One floor graph in the editor's JSON schema."""
+    data = {
+        'background': getattr(bg_item, 'filePath', ''),
+        'scale': scale,
+        'nodes': [],
+        'edges': []
+    }
+    for nid, node in nodes.items():
+        p = node.pos()
+        data['nodes'].append({
+            'id': nid,
+            'name': node.name,
+            'type': node.ntype,
+            'x': p.x(),
+            'y': p.y()
+        })
+    for e in edges:
+        data['edges'].append({
+            'source': e.src.node_id,
+            'target': e.dst.node_id,
+            'weight': e.weight
+        })
+    return data
+
+
+def resolve_background(bg, json_path):
+    """Background path as stored, or the same file name next to the JSON (paths saved on another machine)."""
+    if bg and os.path.exists(bg):
+        return bg
+    local = os.path.join(os.path.dirname(os.path.abspath(json_path)), os.path.basename(bg.replace('\\', '/')))
+    return local if bg and os.path.exists(local) else None
+
+
+def apply_ops(data, ops):
+    """
+    Folds journal ops into a floor JSON dict in place:
+      ['n+', id, name, type, x, y]  ['n-', id]  ['mv', id, x, y]  ['nm', id, name]  ['ty', id, type]
+      ['e+', src, dst]  ['e-', src, dst]  ['sc', scale]
+    Weights of edges an op touches are recomputed as pixel length * scale, as EdgeItem does.
+    """
+    nodes = {n['id']: n for n in data.get('nodes', [])}
+    edges = data.get('edges', [])
+    scale = data.get('scale', 1.0)
+
+    def weight(src, dst):
+        a, b = nodes[src], nodes[dst]
+        return math.hypot(b['x'] - a['x'], b['y'] - a['y']) * scale
+
+    for op in ops:
+        kind = op[0]
+        if kind == 'n+':
+            nodes[op[1]] = {'id': op[1], 'name': op[2], 'type': op[3], 'x': op[4], 'y': op[5]}
+        elif kind == 'n-':
+            nodes.pop(op[1], None)
+            edges = [e for e in edges if op[1] not in (e['source'], e['target'])]
+        elif kind == 'mv' and op[1] in nodes:
+            nodes[op[1]]['x'], nodes[op[1]]['y'] = op[2], op[3]
+            for e in edges:
+                if op[1] in (e['source'], e['target']):
+                    e['weight'] = weight(e['source'], e['target'])
+        elif kind == 'nm' and op[1] in nodes:
+            nodes[op[1]]['name'] = op[2]
+        elif kind == 'ty' and op[1] in nodes:
+            nodes[op[1]]['type'] = op[2]
+        elif kind == 'e+' and op[1] in nodes and op[2] in nodes:
+            edges.append({'source': op[1], 'target': op[2], 'weight': weight(op[1], op[2])})
+        elif kind == 'e-':
+            for k in range(len(edges) - 1, -1, -1):
+                if edges[k]['source'] == op[1] and edges[k]['target'] == op[2]:
+                    del edges[k]
+                    break
+        elif kind == 'sc':
+            scale = data['scale'] = op[1]
+            for e in edges:
+                e['weight'] = weight(e['source'], e['target'])
+    data['nodes'] = list(nodes.values())
+    data['edges'] = edges
+    return data
+
+
+def read_ops(path, after):
+    """(ops, last seq) of a journal file, skipping ops with seq <= after and a torn last line."""
+    ops, seq = [], after
+    if not os.path.exists(path):
+        return ops, seq
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # partial write from a crash; nothing can follow it
+            if rec[0] > seq:
+                ops.append(rec[1:])
+                seq = rec[0]
+    return ops, seq
+
+
+def recover_floor(json_path):
+    """
+    Floor JSON with the journal ops not yet folded into it applied.
+    Returns (data, last journal seq, number of replayed ops).
+    """
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    seq = data.get('journal_seq', 0)
+    ops = []
+    for path in (json_path + '.journal.compacting', json_path + '.journal'):
+        more, seq = read_ops(path, seq)
+        ops.extend(more)
+    return apply_ops(data, ops), seq, len(ops)
+
+
+def compact_journal(json_path, ops_path):
+    """Folds a rotated journal into the floor JSON (atomic replace), then deletes it. Runs on a worker thread."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    ops, seq = read_ops(ops_path, data.get('journal_seq', 0))
+    data['journal_seq'] = seq
+    apply_ops(data, ops)
+    tmp = json_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp, json_path)
+    os.remove(ops_path)
+
+
+class Journal:
+    """
+    Delta autosave of one floor JSON. Every edit appends a compact op line
+    ([seq, op, ...]) to <floor>.json.journal; compaction renames the log to
+    <floor>.json.journal.compacting and folds it into the JSON on a worker
+    thread. The JSON records the last folded seq as 'journal_seq', so replay
+    after a crash at any point applies each op exactly once.
+    """
+    def __init__(self, json_path, seq=0, pending=0):
+        self.json_path = json_path
+        self.path = json_path + '.journal'
+        self.seq = seq
+        self.pending = pending  # ops in the log not yet handed to a compaction
+        self.file = None
+        self.worker = None
+
+    def append(self, ops):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        for op in ops:
+            self.seq += 1
+            self.file.write(json.dumps([self.seq] + op, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.file.flush()
+        self.pending += len(ops)
+
+    def compact_async(self):
+        if not self.pending or (self.worker is not None and self.worker.is_alive()):
+            return
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        rotated = self.path + '.compacting'
+        if os.path.exists(rotated):
+            # left over from a crash: fold it together with the current log
+            with open(self.path, 'r', encoding='utf-8') as src, open(rotated, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, rotated)
+        self.pending = 0
+        self.worker = threading.Thread(target=compact_journal, args=(self.json_path, rotated), daemon=True)
+        self.worker.start()
+
+    def wait(self):
+        if self.worker is not None:
+            self.worker.join()
+
+    def reset(self):
+        """Drops the logs after a full save wrote journal_seq = self.seq."""
+        self.wait()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for path in (self.path, self.path + '.compacting'):
+            if os.path.exists(path):
+                os.remove(path)
+        self.pending = 0
+
+    def close(self):
+        """Folds what is left into the JSON and closes the log."""
+        self.compact_async()
+        self.wait()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def point_segment_distance(px, py, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - x1, py - y1)
+    t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length2))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+def tile_dir(image_path):
+    return image_path + '.tiles'
+
+
+def build_tile_pyramid(image_path):
+    """
+    Cut the image into TILE_SIZE tiles at full resolution and at every 2x
+    downsample until one tile covers it, saved as <image>.tiles/L<level>_<row>_<col>.jpg.
+    Returns the pyramid metadata; an existing pyramid is reused while the
+    image's size and mtime are unchanged.
+    """
+    out = tile_dir(image_path)
+    meta_path = os.path.join(out, 'meta.json')
+    st = os.stat(image_path)
+    source = {'size': st.st_size, 'mtime': st.st_mtime}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('source') == source and meta.get('tile') == TILE_SIZE and meta.get('format') == TILE_FORMAT:
+            return meta
+
+    img = QImageReader(image_path).read()
+    if img.isNull():
+        return None
+    os.makedirs(out, exist_ok=True)
+    meta = {'source': source, 'tile': TILE_SIZE, 'format': TILE_FORMAT,
+            'width': img.width(), 'height': img.height(), 'levels': []}
+    level = 0
+    while True:
+        cols = math.ceil(img.width() / TILE_SIZE)
+        rows = math.ceil(img.height() / TILE_SIZE)
+        for r in range(rows):
+            for c in range(cols):
+                # last row/column tiles are smaller: copying past the edge would pad them with black
+                tile = img.copy(QRect(c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(img.rect()))
+                tile.save(os.path.join(out, f'L{level}_{r}_{c}.jpg'), 'JPG', 90)
+        meta['levels'].append({'cols': cols, 'rows': rows})
+        if cols == 1 and rows == 1:
+            break
+        img = img.scaled(max(1, img.width() // 2), max(1, img.height() // 2),
+                         Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        level += 1
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+class TiledBackgroundItem(QGraphicsItem):
+    """
+    Floor-plan background drawn from the tile pyramid: only tiles that
+    intersect the exposed rect are loaded, from the level whose resolution
+    matches the current zoom. Decoded tiles live in a small LRU cache.
+    """
+    def __init__(self, image_path, meta):
+        super().__init__()
+        self.filePath = image_path
+        self.dir = tile_dir(image_path)
+        self.meta = meta
+        self.cache = {}  # (level, row, col) -> QPixmap, oldest first
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setZValue(-1)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.meta['width'], self.meta['height'])
+
+    def tile(self, level, r, c):
+        key = (level, r, c)
+        pix = self.cache.pop(key, None)
+        if pix is None:
+            pix = QPixmap(os.path.join(self.dir, f'L{level}_{r}_{c}.jpg'))
+            if len(self.cache) >= TILE_CACHE_LIMIT:
+                del self.cache[next(iter(self.cache))]
+        self.cache[key] = pix
+        return pix
+
+    def paint(self, painter, option, widget=None):
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = 0 if lod >= 1 else int(math.log2(1 / lod))
+        level = min(level, len(self.meta['levels']) - 1)
+        span = TILE_SIZE * (1 << level)  # scene pixels covered by one tile at this level
+        grid = self.meta['levels'][level]
+        rect = option.exposedRect & self.boundingRect()
+        c0, c1 = int(rect.left() // span), min(grid['cols'] - 1, int(rect.right() // span))
+        r0, r1 = int(rect.top() // span), min(grid['rows'] - 1, int(rect.bottom() // span))
+        bounds = self.boundingRect()
+        painter.save()  # the view uses DontSavePainterState
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, level > 0 or lod < 1)
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                pix = self.tile(level, r, c)
+                if pix.isNull():
+                    continue
+                # downscaled edge tiles can reach slightly past the image; clip to the item and crop the source to match
+                target = QRectF(c * span, r * span, pix.width() * (1 << level), pix.height() * (1 << level)) & bounds
+                source = QRectF(0, 0, target.width() / (1 << level), target.height() / (1 << level))
+                painter.drawPixmap(target, pix, source)
+        painter.restore()
+
+
+def background_item(image_path):
+    """Tiled background for image_path, falling back to a plain pixmap item if tiling fails."""
+    meta = build_tile_pyramid(image_path)
+    if meta is not None:
+        return TiledBackgroundItem(image_path, meta)
+    item = QGraphicsPixmapItem(QPixmap(image_path))
+    item.filePath = image_path
+    item.setZValue(-1)
+    return item
+
 
 # Custom view class to support Ctrl + wheel zoom
 class ZoomableGraphicsView(QGraphicsView):
@@ -18,6 +493,9 @@ class ZoomableGraphicsView(QGraphicsView):
         self.setRenderHint(QPainter.Antialiasing)
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
+        # Only the changed regions are repainted; items restore their own painter state
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlags(QGraphicsView.DontSavePainterState | QGraphicsView.DontAdjustForAntialiasing)
         self.scale_factor = 1.0
         self.status_bar = None
 
@@ -36,11 +514,12 @@ class ZoomableGraphicsView(QGraphicsView):
 
 
 class EdgeItem(QGraphicsLineItem):
-    def __init__(self, src, dst, scale_factor, *args, **kwargs):
+    def __init__(self, src, dst, scale_factor, *args, grid=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.src = src
         self.dst = dst
         self.scale_factor = scale_factor
+        self.grid = grid
         self.setPen(QPen(QColor('#555555'), 2))
         self.selected = False
         self.update_position()
@@ -50,6 +529,8 @@ class EdgeItem(QGraphicsLineItem):
         p2 = self.dst.pos()
         self.setLine(p1.x(), p1.y(), p2.x(), p2.y())
         self.weight = math.hypot(p2.x() - p1.x(), p2.y() - p1.y()) * self.scale_factor
+        if self.grid is not None:
+            self.grid.insert_segment(self, p1, p2)
 
     def set_scale(self, scale):
         self.scale_factor = scale
@@ -61,9 +542,17 @@ class EdgeItem(QGraphicsLineItem):
         pen.setColor(QColor('#FF0000') if self.selected else QColor('#555555'))
         self.setPen(pen)
 
+class LabelItem(QGraphicsSimpleTextItem):
+    """Node label that skips painting when the view is zoomed out below LABEL_MIN_LOD."""
+    def paint(self, painter, option, widget=None):
+        if QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform()) < LABEL_MIN_LOD:
+            return
+        super().paint(painter, option, widget)
+
+
 class NodeItem(QGraphicsEllipseItem):
     RADIUS = 15
-    def __init__(self, node_id, name, ntype, color, *args, **kwargs):
+    def __init__(self, node_id, name, ntype, color, *args, grid=None, edge_queue=None, **kwargs):
         super().__init__(-self.RADIUS, -self.RADIUS, 2*self.RADIUS, 2*self.RADIUS, *args, **kwargs)
         self.node_id = node_id
         self.name = name
@@ -75,21 +564,183 @@ class NodeItem(QGraphicsEllipseItem):
             QGraphicsEllipseItem.ItemSendsGeometryChanges |
             QGraphicsEllipseItem.ItemIsMovable
         )
-        self.text = QGraphicsTextItem(name, self)
-        self.text.setDefaultTextColor(Qt.black)
+        self.text = LabelItem(name, self)
+        self.text.setBrush(QBrush(Qt.black))
+        # text layout is the costliest part of a node repaint; rasterise it once per zoom level
+        self.text.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.text.setPos(-self.RADIUS, -self.RADIUS - 20)
-        self.edges = []
+        self.edges = {}  # insertion-ordered set of EdgeItem (dict keys) for O(1) removal
+        self.grid = grid
+        self.edge_queue = edge_queue
 
     def set_name(self, new_name):
         self.name = new_name
-        self.text.setPlainText(new_name)
+        self.text.setText(new_name)
 
     def itemChange(self, change, value):
-        if change == QGraphicsItem.ItemPositionChange:
-            for edge in list(self.edges):
-                edge.update_position()
+        if change == QGraphicsItem.ItemPositionHasChanged:
+            if self.grid is not None:
+                self.grid.insert_point(self, self.pos(), self.RADIUS)
+            if self.edge_queue is not None:
+                self.edge_queue.mark(self.edges)
+            else:
+                for edge in list(self.edges):
+                    edge.update_position()
         return super().itemChange(change, value)
 
+class EditCommand(QUndoCommand):
+    """
+    Undoable edit of the active floor. Subclasses implement do()/revert()
+    with the GraphEditor helpers and return the journal ops they performed.
+    Nodes are referenced by id and edges by (src id, dst id), since undo
+    re-creates the items.
+    """
+    def __init__(self, editor, text):
+        super().__init__(text)
+        self.editor = editor
+
+    def redo(self):
+        self.editor.log(self.do())
+
+    def undo(self):
+        self.editor.log(self.revert())
+
+
+class AddNode(EditCommand):
+    def __init__(self, editor, node_id, name, ntype, x, y):
+        super().__init__(editor, 'Add Node')
+        self.args = (node_id, name, ntype, x, y)
+
+    def do(self):
+        self.editor.add_node(*self.args)
+        return [['n+', *self.args]]
+
+    def revert(self):
+        self.editor.remove_node(self.editor.nodes[self.args[0]])
+        return [['n-', self.args[0]]]
+
+
+class DeleteNode(EditCommand):
+    def __init__(self, editor, node):
+        super().__init__(editor, 'Delete Node')
+        p = node.pos()
+        self.args = (node.node_id, node.name, node.ntype, p.x(), p.y())
+        self.links = [(e.src.node_id, e.dst.node_id) for e in node.edges]
+
+    def do(self):
+        self.editor.remove_node(self.editor.nodes[self.args[0]])
+        return [['e-', s, d] for s, d in self.links] + [['n-', self.args[0]]]
+
+    def revert(self):
+        self.editor.add_node(*self.args)
+        for s, d in self.links:
+            self.editor.add_edge(self.editor.nodes[s], self.editor.nodes[d])
+        return [['n+', *self.args]] + [['e+', s, d] for s, d in self.links]
+
+
+class MoveNodes(EditCommand):
+    def __init__(self, editor, moves):
+        super().__init__(editor, 'Move Node')
+        self.moves = moves  # node id -> ((old x, old y), (new x, new y))
+
+    def _place(self, which):
+        ops = []
+        for nid, ends in self.moves.items():
+            x, y = ends[which]
+            self.editor.nodes[nid].setPos(x, y)
+            ops.append(['mv', nid, x, y])
+        return ops
+
+    def do(self):
+        return self._place(1)
+
+    def revert(self):
+        return self._place(0)
+
+
+class AddEdge(EditCommand):
+    def __init__(self, editor, src_id, dst_id):
+        super().__init__(editor, 'Add Edge')
+        self.ends = (src_id, dst_id)
+
+    def do(self):
+        s, d = self.ends
+        self.editor.add_edge(self.editor.nodes[s], self.editor.nodes[d])
+        return [['e+', s, d]]
+
+    def revert(self):
+        self.editor.remove_edge(self.editor.find_edge(*self.ends))
+        return [['e-', *self.ends]]
+
+
+class DeleteEdge(AddEdge):
+    def __init__(self, editor, edge):
+        super().__init__(editor, edge.src.node_id, edge.dst.node_id)
+        self.setText('Delete Edge')
+
+    def do(self):
+        return super().revert()
+
+    def revert(self):
+        return super().do()
+
+
+class RenameNode(EditCommand):
+    """Consecutive renames of one node (a keystroke each) merge into a single undo step."""
+    def __init__(self, editor, node, name):
+        super().__init__(editor, 'Rename Node')
+        self.node_id, self.old, self.new = node.node_id, node.name, name
+
+    def id(self):
+        return 1
+
+    def mergeWith(self, other):
+        if other.node_id != self.node_id:
+            return False
+        self.new = other.new
+        return True
+
+    def _set(self, name):
+        self.editor.rename_node(self.editor.nodes[self.node_id], name)
+        return [['nm', self.node_id, name]]
+
+    def do(self):
+        return self._set(self.new)
+
+    def revert(self):
+        return self._set(self.old)
+
+
+class RetypeNode(EditCommand):
+    def __init__(self, editor, node, ntype):
+        super().__init__(editor, 'Change Node Type')
+        self.node_id, self.old, self.new = node.node_id, node.ntype, ntype
+
+    def _set(self, ntype):
+        self.editor.retype_node(self.editor.nodes[self.node_id], ntype)
+        return [['ty', self.node_id, ntype]]
+
+    def do(self):
+        return self._set(self.new)
+
+    def revert(self):
+        return self._set(self.old)
+
+
+class SetScale(EditCommand):
+    def __init__(self, editor, old, new):
+        super().__init__(editor, 'Apply Scale')
+        self.old, self.new = old, new
+
+    def do(self):
+        self.editor.set_scale(self.new)
+        return [['sc', self.new]]
+
+    def revert(self):
+        self.editor.set_scale(self.old)
+        return [['sc', self.old]]
+
+
 class GraphEditor(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -104,10 +755,31 @@ class GraphEditor(QMainWindow):
             'Door': '#FFCC00'
         }
         self.nodes = {}
-        self.edges = []
+        self.edges = {}  # insertion-ordered set of EdgeItem; keeps save order stable
+        self.grid = SpatialGrid()
+        self.edge_queue = EdgeUpdateQueue(self, on_flush=self.graph_changed)
         self.next_id = 1
         self.mode = None
         self.temp_edge = []
+        # project mode: every *f.json of a building as switchable layers
+        self.layers = {}  # floor name -> FloorLayer, in floor order
+        self.floor = None
+        self.layer_root = None
+        self.route_ends = []  # merged ids of the preview route's start/end
+        self.route_items = []
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self.refresh_preview)
+        # undo: one QUndoStack per document (per floor in project mode); autosave: one Journal per floor JSON
+        self.undo_group = QUndoGroup(self)
+        self.undo_stack = self._new_undo_stack()
+        self.journal = None
+        self.drag_start = {}
+        self.compact_timer = QTimer(self)
+        self.compact_timer.setSingleShot(True)
+        self.compact_timer.setInterval(JOURNAL_IDLE_MS)
+        self.compact_timer.timeout.connect(self.compact_journals)
 
         self._init_ui()
 
@@ -131,8 +803,27 @@ class GraphEditor(QMainWindow):
                 act.triggered.connect(self.save_json)
             tb.addAction(act)
         tb.addSeparator()
+        act = self.undo_group.createUndoAction(self, 'Undo')
+        act.setShortcut(QKeySequence.Undo)
+        tb.addAction(act)
+        act = self.undo_group.createRedoAction(self, 'Redo')
+        act.setShortcut(QKeySequence.Redo)
+        tb.addAction(act)
+        tb.addSeparator()
+        act = QAction('Open Project', self)
+        act.triggered.connect(self.open_project)
+        tb.addAction(act)
+        act = QAction('Save Project', self)
+        act.triggered.connect(self.save_project)
+        tb.addAction(act)
+        self.floor_box = QComboBox()
+        self.floor_box.setEnabled(False)
+        self.floor_box.currentTextChanged.connect(self.switch_floor)
+        tb.addWidget(self.floor_box)
+        tb.addSeparator()
         self.mode_actions = {}
-        for name in ['Node Add', 'Node Edit', 'Node Delete', 'Edge Add', 'Edge Delete', 'Calibrate Scale']:
+        for name in ['Node Add', 'Node Edit', 'Node Delete', 'Edge Add', 'Edge Delete', 'Calibrate Scale',
+                     'Route Preview']:
             act = QAction(name, self)
             act.setCheckable(True)
             act.triggered.connect(lambda checked, n=name: self.set_mode(n))
@@ -142,6 +833,9 @@ class GraphEditor(QMainWindow):
         self.apply_scale_btn = QAction('Apply Scale', self)
         self.apply_scale_btn.triggered.connect(self.apply_scale)
         tb.addAction(self.apply_scale_btn)
+        act = QAction('Auto Edges', self)
+        act.triggered.connect(self.auto_edges)
+        tb.addAction(act)
 
         self.prop_dock = QDockWidget('Properties', self)
         props = QWidget()
@@ -162,6 +856,7 @@ class GraphEditor(QMainWindow):
         self.prop_dock.hide()
 
         self.scene.mousePressEvent = self.on_mouse_press
+        self.scene.mouseReleaseEvent = self.on_mouse_release
         self.setStatusBar(QStatusBar(self))
         self.statusBar().showMessage("Zoom: 100.0%")
 
@@ -179,81 +874,389 @@ class GraphEditor(QMainWindow):
         for node in self.nodes.values():
             node.setFlag(QGraphicsEllipseItem.ItemIsMovable, mode_name == 'Node Edit')
 
+    # Graph mutation helpers keep the scene, the adjacency sets and the spatial index in sync
+    def add_node(self, node_id, name, ntype, x, y):
+        node = NodeItem(node_id, name, ntype, self.node_types.get(ntype, '#CCCCCC'),
+                        grid=self.grid, edge_queue=self.edge_queue)
+        node.setPos(x, y)
+        node.setFlag(QGraphicsEllipseItem.ItemIsMovable, self.mode == 'Node Edit')
+        self._add_item(node)
+        self.grid.insert_point(node, node.pos(), NodeItem.RADIUS)
+        self.nodes[node_id] = node
+        self.next_id = max(self.next_id, node_id + 1)
+        self.graph_changed()
+        return node
+
+    def remove_node(self, node):
+        for e in list(node.edges):
+            self.remove_edge(e)
+        self.grid.remove(node)
+        self.scene.removeItem(node)
+        del self.nodes[node.node_id]
+        self.graph_changed()
+
+    def add_edge(self, src, dst):
+        edge = EdgeItem(src, dst, self.scale_factor, grid=self.grid)
+        self._add_item(edge)
+        src.edges[edge] = None
+        dst.edges[edge] = None
+        self.edges[edge] = None
+        self.graph_changed()
+        return edge
+
+    def remove_edge(self, edge):
+        self.edge_queue.discard(edge)
+        self.grid.remove(edge)
+        self.scene.removeItem(edge)
+        self.edges.pop(edge, None)
+        edge.src.edges.pop(edge, None)
+        edge.dst.edges.pop(edge, None)
+        self.graph_changed()
+
+    def find_edge(self, src_id, dst_id):
+        """Most recently added edge src -> dst."""
+        for e in reversed(self.nodes[src_id].edges):
+            if e.src.node_id == src_id and e.dst.node_id == dst_id:
+                return e
+        return None
+
+    def rename_node(self, node, name):
+        node.set_name(name)
+        if self.prop_name.text() != name and self.scene.selectedItems() == [node]:
+            self.prop_name.blockSignals(True)
+            self.prop_name.setText(name)
+            self.prop_name.blockSignals(False)
+        self.graph_changed()
+
+    def retype_node(self, node, ntype):
+        node.ntype = ntype
+        node.setBrush(QBrush(QColor(self.node_types.get(ntype, '#CCCCCC'))))
+        self.graph_changed()
+
+    def _add_item(self, item):
+        # in project mode items belong to the active floor's layer
+        if self.layer_root is not None:
+            item.setParentItem(self.layer_root)
+        else:
+            self.scene.addItem(item)
+
+    def node_at(self, pos):
+        """Nearest node whose circle is within PICK_TOLERANCE of pos, using the spatial grid."""
+        best, best_d = None, NodeItem.RADIUS + PICK_TOLERANCE
+        for it in self.grid.query(pos.x(), pos.y(), NodeItem.RADIUS + PICK_TOLERANCE):
+            if isinstance(it, NodeItem):
+                d = math.hypot(it.pos().x() - pos.x(), it.pos().y() - pos.y())
+                if d <= best_d:
+                    best, best_d = it, d
+        return best
+
+    def edge_at(self, pos):
+        """Nearest edge segment within PICK_TOLERANCE of pos, using the spatial grid."""
+        self.edge_queue.flush()
+        best, best_d = None, PICK_TOLERANCE + 1
+        for it in self.grid.query(pos.x(), pos.y(), PICK_TOLERANCE):
+            if isinstance(it, EdgeItem):
+                line = it.line()
+                d = point_segment_distance(pos.x(), pos.y(), line.x1(), line.y1(), line.x2(), line.y2())
+                if d <= best_d:
+                    best, best_d = it, d
+        return best
+
+    def edge_lengths(self, edges):
+        """Pixel lengths of edges, computed in one NumPy pass over node coordinate arrays."""
+        index = {node: k for k, node in enumerate(self.nodes.values())}
+        xy = np.array([(n.pos().x(), n.pos().y()) for n in self.nodes.values()], dtype=float).reshape(-1, 2)
+        src = np.fromiter((index[e.src] for e in edges), dtype=np.intp, count=len(edges))
+        dst = np.fromiter((index[e.dst] for e in edges), dtype=np.intp, count=len(edges))
+        d = xy[dst] - xy[src]
+        return np.hypot(d[:, 0], d[:, 1])
+
+    # -- undo / autosave journal --------------------------------------------------------------
+    def _new_undo_stack(self):
+        stack = QUndoStack(self.undo_group)
+        self.undo_group.setActiveStack(stack)
+        return stack
+
+    def log(self, ops):
+        """Appends the ops of an executed command to the active floor's journal."""
+        if self.journal is None or not ops:
+            return
+        self.journal.append(ops)
+        if self.journal.pending >= JOURNAL_COMPACT_OPS:
+            self.journal.compact_async()
+        self.compact_timer.start()
+
+    def _journals(self):
+        self._sync_floor()
+        if self.layers:
+            return [layer.journal for layer in self.layers.values() if layer.journal is not None]
+        return [self.journal] if self.journal is not None else []
+
+    def compact_journals(self):
+        for journal in self._journals():
+            journal.compact_async()
+
+    def write_floor(self, path, data, journal):
+        """
+        Full write of one floor JSON. Returns the journal for path with its log dropped,
+        since the file now holds everything (a journal for another file is folded and closed).
+        """
+        same = journal is not None and journal.json_path == path
+        if same:
+            journal.wait()
+        elif journal is not None:
+            journal.close()
+        data['journal_seq'] = journal.seq if same else 0
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=4)
+        if not same:
+            journal = Journal(path, data['journal_seq'])
+        journal.reset()
+        return journal
+
+    def closeEvent(self, event):
+        self.edge_queue.flush()
+        for journal in self._journals():
+            journal.close()
+        super().closeEvent(event)
+
+    def clear_graph(self):
+        self.edge_queue.clear()
+        self.preview_timer.stop()
+        self.compact_timer.stop()
+        for journal in self._journals():
+            journal.close()
+        self.journal = None
+        for stack in self.undo_group.stacks():
+            self.undo_group.removeStack(stack)
+            stack.deleteLater()
+        self.undo_stack = self._new_undo_stack()
+        self.drag_start = {}
+        self.scene.clear()
+        self.bg_item = None
+        # leaving project mode: drop the layers and start from fresh single-floor state
+        self.layers = {}
+        self.floor = None
+        self.layer_root = None
+        self.route_ends = []
+        self.route_items = []
+        self.floor_box.blockSignals(True)
+        self.floor_box.clear()
+        self.floor_box.blockSignals(False)
+        self.floor_box.setEnabled(False)
+        self.nodes = {}
+        self.edges = {}
+        self.grid = SpatialGrid()
+        self.temp_edge = []
+        self.next_id = 1
+
     def new_background(self):
         path, _ = QFileDialog.getOpenFileName(self, 'Select Background Image', '', 'Images (*.png *.jpg *.bmp)')
         if not path:
             return
-        self.scene.clear()
-        self.nodes.clear()
-        self.edges.clear()
-        self.next_id = 1
-        pix = QPixmap(path)
-        self.bg_item = QGraphicsPixmapItem(pix)
-        self.bg_item.filePath = path
-        self.bg_item.setZValue(-1)
-        self.scene.addItem(self.bg_item)
+        self.clear_graph()
+        self.statusBar().showMessage('Building background tiles...')
+        self.bg_item = background_item(path)
+        self._add_item(self.bg_item)
+        self.statusBar().clearMessage()
 
     def load_json(self):
         path, _ = QFileDialog.getOpenFileName(self, 'Open Graph JSON', '', 'JSON Files (*.json)')
         if not path:
             return
-        with open(path, 'r') as f:
-            data = json.load(f)
+        self.clear_graph()
+        data, seq, replayed = recover_floor(path)
+        self.load_graph_data(data, path)
+        self.journal = Journal(path, seq, replayed)
+        if replayed:
+            self.statusBar().showMessage(f'Recovered {replayed} unsaved edit(s) from the autosave journal')
+            self.compact_timer.start()
+
+    def load_graph_data(self, data, path):
+        """Adds one floor JSON (already parsed) to the current floor."""
         self.scale_factor = data.get('scale', 1.0)
-        bg = data.get('background', '')
-        self.scene.clear()
-        if os.path.exists(bg):
-            pix = QPixmap(bg)
-            self.bg_item = QGraphicsPixmapItem(pix)
-            self.bg_item.filePath = bg
-            self.bg_item.setZValue(-1)
-            self.scene.addItem(self.bg_item)
-        self.nodes.clear()
-        self.edges.clear()
-        self.next_id = 1
+        bg = resolve_background(data.get('background', ''), path)
+        if bg:
+            self.bg_item = background_item(bg)
+            self._add_item(self.bg_item)
         for nd in data.get('nodes', []):
-            node = NodeItem(nd['id'], nd['name'], nd['type'], self.node_types.get(nd['type'], '#CCCCCC'))
-            node.setPos(nd['x'], nd['y'])
-            self.scene.addItem(node)
-            self.nodes[nd['id']] = node
-            self.next_id = max(self.next_id, nd['id'] + 1)
+            self.add_node(nd['id'], nd['name'], nd['type'], nd['x'], nd['y'])
         for ed in data.get('edges', []):
             src = self.nodes.get(ed['source'])
             dst = self.nodes.get(ed['target'])
             if src and dst:
-                edge = EdgeItem(src, dst, self.scale_factor)
-                self.scene.addItem(edge)
-                src.edges.append(edge)
-                dst.edges.append(edge)
-                self.edges.append(edge)
+                self.add_edge(src, dst)
 
     def save_json(self):
         path, _ = QFileDialog.getSaveFileName(self, 'Save Graph JSON', '', 'JSON Files (*.json)')
         if not path:
             return
-        data = {
-            'background': getattr(self.bg_item, 'filePath', ''),
-            'scale': self.scale_factor,
-            'nodes': [],
-            'edges': []
-        }
-        for nid, node in self.nodes.items():
-            p = node.pos()
-            data['nodes'].append({
-                'id': nid,
-                'name': node.name,
-                'type': node.ntype,
-                'x': p.x(),
-                'y': p.y()
-            })
-        for e in self.edges:
-            data['edges'].append({
-                'source': e.src.node_id,
-                'target': e.dst.node_id,
-                'weight': e.weight
-            })
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=4)
+        self.edge_queue.flush()
+        data = floor_json(self.nodes, self.edges, self.bg_item, self.scale_factor)
+        self.journal = self.write_floor(path, data, self.journal)
+
+    # -- project mode -------------------------------------------------------------------------
+    def open_project(self):
+        """Opens every *f.json in a building folder as one layer per floor."""
+        folder = QFileDialog.getExistingDirectory(self, 'Open Building Folder')
+        if not folder:
+            return
+        files = graphmerge._floor_files(os.path.join(folder, '*f.json'))
+        if not files:
+            self.statusBar().showMessage('No *f.json floor files in ' + folder)
+            return
+        self.clear_graph()
+        recovered = 0
+        for path in files:
+            layer = FloorLayer(os.path.basename(path).split('.')[0], path)
+            self.scene.addItem(layer.root)
+            self.layers[layer.name] = layer
+            data, seq, replayed = recover_floor(path)
+            layer.undo_stack = self._new_undo_stack()
+            layer.journal = Journal(path, seq, replayed)
+            recovered += replayed
+            self._activate(layer)
+            self.load_graph_data(data, path)
+            self._stash_floor()
+            # until the floor is edited its merged part comes from the file as saved (stored weights)
+            layer.part = graphmerge.prefix_floor(layer.name, data)
+            layer.modified = False
+        if recovered:
+            self.compact_timer.start()
+        self.floor_box.blockSignals(True)
+        self.floor_box.addItems(list(self.layers))
+        self.floor_box.blockSignals(False)
+        self.floor_box.setEnabled(True)
+        self._activate(next(iter(self.layers.values())))
+        self.refresh_preview()
+
+    def _sync_floor(self):
+        # the editor's working state is the active floor's state; write it back to its layer
+        layer = self.floor
+        if layer is None:
+            return
+        layer.nodes, layer.edges, layer.grid = self.nodes, self.edges, self.grid
+        layer.bg_item, layer.scale_factor, layer.next_id = self.bg_item, self.scale_factor, self.next_id
+        layer.undo_stack, layer.journal = self.undo_stack, self.journal
+
+    def _stash_floor(self):
+        self._sync_floor()
+        if self.floor is not None:
+            self.floor.root.setVisible(False)
+
+    def _activate(self, layer):
+        self.floor = layer
+        self.layer_root = layer.root
+        self.nodes, self.edges, self.grid = layer.nodes, layer.edges, layer.grid
+        self.bg_item, self.scale_factor, self.next_id = layer.bg_item, layer.scale_factor, layer.next_id
+        self.undo_stack, self.journal = layer.undo_stack, layer.journal
+        self.undo_group.setActiveStack(self.undo_stack)
+        layer.root.setVisible(True)
+        for node in self.nodes.values():
+            node.setFlag(QGraphicsEllipseItem.ItemIsMovable, self.mode == 'Node Edit')
+        if self.floor_box.currentText() != layer.name:
+            self.floor_box.blockSignals(True)
+            self.floor_box.setCurrentText(layer.name)
+            self.floor_box.blockSignals(False)
+
+    def switch_floor(self, name):
+        layer = self.layers.get(name)
+        if layer is None or layer is self.floor:
+            return
+        self.edge_queue.flush()
+        self.temp_edge = []
+        self.scene.clearSelection()
+        self._stash_floor()
+        self._activate(layer)
+
+    def graph_changed(self):
+        """Marks the active floor's merged part stale and schedules a preview refresh."""
+        if self.floor is None:
+            return
+        self.floor.part = None
+        self.floor.modified = True
+        self.preview_timer.start()
+
+    def merged_graph(self):
+        """
+        Merged building graph of the open project, equal to what graphmerge.merge_graph_json
+        writes once the edited floors are saved. Only floors edited since the last call are re-prefixed;
+        elevator/stair links are rebuilt from the cached per-floor index maps.
+        """
+        self.edge_queue.flush()
+        self._sync_floor()
+        nodes, edges = [], []
+        elevator_map, stair_map = {}, {}
+        for name, layer in self.layers.items():
+            if layer.part is None:
+                layer.part = graphmerge.prefix_floor(
+                    name, floor_json(layer.nodes, layer.edges, layer.bg_item, layer.scale_factor))
+            f_nodes, f_edges, elevator_map[name], stair_map[name] = layer.part
+            nodes.extend(f_nodes)
+            edges.extend(f_edges)
+        edges.extend(graphmerge._link_floors(elevator_map, stair_map))
+        return {'nodes': nodes, 'edges': edges}
+
+    def refresh_preview(self):
+        self.preview_timer.stop()
+        if not self.layers:
+            return
+        merged = self.merged_graph()
+        msg = f"Merged: {len(merged['nodes'])} nodes, {len(merged['edges'])} edges"
+        route = self.draw_route(merged)
+        self.statusBar().showMessage(msg + (' | ' + route if route else ''))
+
+    def draw_route(self, merged):
+        """Redraws the preview route as one polyline per floor layer; returns a status summary."""
+        for item in self.route_items:
+            self.scene.removeItem(item)
+        self.route_items = []
+        if not self.route_ends:
+            return ''
+        if len(self.route_ends) == 1:
+            return f'Route from {self.route_ends[0]}: pick a destination'
+        if CompiledGraph is None:
+            return 'Route preview needs 전체 그래프/graph_engine.py'
+        engine = CompiledGraph(merged['nodes'], merged['edges'])
+        path = engine.shortest_path(*self.route_ends)
+        if not path:
+            return f'No route {self.route_ends[0]} -> {self.route_ends[1]}'
+        pen = QPen(QColor(0, 120, 255, 170), 8)
+        pen.setCapStyle(Qt.RoundCap)
+        pen.setJoinStyle(Qt.RoundJoin)
+        floors = []
+        for nid in path:
+            floor = nid.split('_', 1)[0]
+            n = engine.nodes[nid]
+            if not floors or floors[-1][0] != floor:
+                floors.append((floor, QPainterPath(QPointF(n['x'], n['y']))))
+            else:
+                floors[-1][1].lineTo(n['x'], n['y'])
+        for floor, qpath in floors:
+            item = QGraphicsPathItem(qpath, self.layers[floor].root)
+            item.setPen(pen)
+            item.setZValue(-0.5)  # above the background, below the floor's nodes and edges
+            self.route_items.append(item)
+        return f"Route: {engine.path_length(path):.2f}m, {len(path)} nodes, " + ' -> '.join(f for f, _ in floors)
+
+    def save_project(self):
+        """Writes every modified floor back to its JSON and re-merges merged_graph.json beside them."""
+        if not self.layers:
+            return
+        self.edge_queue.flush()
+        self._sync_floor()
+        saved = []
+        for layer in self.layers.values():
+            if layer.modified:
+                layer.journal = self.write_floor(
+                    layer.path, floor_json(layer.nodes, layer.edges, layer.bg_item, layer.scale_factor), layer.journal)
+                layer.modified = False
+                saved.append(layer.name)
+        self.journal = self.floor.journal
+        folder = os.path.dirname(next(iter(self.layers.values())).path)
+        graphmerge.merge_graph_json_incremental(os.path.join(folder, '*f.json'),
+                                                os.path.join(folder, 'merged_graph.json'))
+        self.statusBar().showMessage(f"Saved {', '.join(saved) or 'no changed floors'}; merged_graph.json updated")
 
     def add_node_type(self):
         text, ok = QInputDialog.getText(self, 'New Node Type', 'Type name and hex color (e.g. Office,#FFAACC):')
@@ -265,89 +1268,122 @@ class GraphEditor(QMainWindow):
     def on_name_change(self, text):
         if self.mode == 'Node Edit':
             items = self.scene.selectedItems()
-            if items and isinstance(items[0], NodeItem):
-                items[0].set_name(text)
+            if items and isinstance(items[0], NodeItem) and items[0].name != text:
+                self.undo_stack.push(RenameNode(self, items[0], text))
 
     def on_type_change(self, typ):
         if self.mode == 'Node Edit':
             items = self.scene.selectedItems()
-            if items and isinstance(items[0], NodeItem):
-                node = items[0]
-                node.ntype = typ
-                node.setBrush(QBrush(QColor(self.node_types.get(typ, '#CCCCCC'))))
+            if items and isinstance(items[0], NodeItem) and items[0].ntype != typ:
+                self.undo_stack.push(RetypeNode(self, items[0], typ))
 
     def on_mouse_press(self, event):
         pos = event.scenePos()
         if self.mode == 'Node Edit':
             QGraphicsScene.mousePressEvent(self.scene, event)
+            # remember where the dragged nodes started so the drag becomes one undo step
+            self.drag_start = {n.node_id: (n.pos().x(), n.pos().y()) for n in self.scene.selectedItems()
+                               if isinstance(n, NodeItem) and self.nodes.get(n.node_id) is n}
             return
         if self.mode == 'Node Add':
             name = self.prop_name.text() or f"Node{self.next_id}"
             ntype = self.prop_type.currentText()
-            color = self.node_types.get(ntype, '#CCCCCC')
-            node = NodeItem(self.next_id, name, ntype, color)
-            node.setPos(pos)
-            self.scene.addItem(node)
-            self.nodes[self.next_id] = node
-            self.next_id += 1
+            self.undo_stack.push(AddNode(self, self.next_id, name, ntype, pos.x(), pos.y()))
             return
         if self.mode == 'Node Delete':
-            for it in self.scene.items(QRectF(pos.x()-5, pos.y()-5, 10, 10)):
-                if isinstance(it, NodeItem):
-                    for e in list(it.edges):
-                        self.scene.removeItem(e)
-                        self.edges.remove(e)
-                        e.src.edges.remove(e)
-                        e.dst.edges.remove(e)
-                    self.scene.removeItem(it)
-                    del self.nodes[it.node_id]
-                    break
+            node = self.node_at(pos)
+            if node is not None:
+                self.undo_stack.push(DeleteNode(self, node))
             return
         if self.mode == 'Edge Add':
-            hits = [i for i in self.scene.items(QRectF(pos.x()-5, pos.y()-5, 10, 10)) if isinstance(i, NodeItem)]
-            if hits:
-                self.temp_edge.append(hits[0])
+            node = self.node_at(pos)
+            if node is not None:
+                self.temp_edge.append(node)
                 if len(self.temp_edge) == 2:
                     src, dst = self.temp_edge
-                    edge = EdgeItem(src, dst, self.scale_factor)
-                    self.scene.addItem(edge)
-                    src.edges.append(edge)
-                    dst.edges.append(edge)
-                    self.edges.append(edge)
+                    self.undo_stack.push(AddEdge(self, src.node_id, dst.node_id))
                     self.temp_edge = []
             return
         if self.mode == 'Edge Delete':
-            for it in self.scene.items(QRectF(pos.x()-5, pos.y()-5, 10, 10)):
-                if isinstance(it, EdgeItem):
-                    self.scene.removeItem(it)
-                    self.edges.remove(it)
-                    it.src.edges.remove(it)
-                    it.dst.edges.remove(it)
-                    break
+            edge = self.edge_at(pos)
+            if edge is not None:
+                self.undo_stack.push(DeleteEdge(self, edge))
             return
         if self.mode == 'Calibrate Scale':
-            for it in self.scene.items(QRectF(pos.x()-5, pos.y()-5, 10, 10)):
-                if isinstance(it, EdgeItem):
-                    it.toggle_selection()
-                    break
+            edge = self.edge_at(pos)
+            if edge is not None:
+                edge.toggle_selection()
+            return
+        if self.mode == 'Route Preview':
+            node = self.node_at(pos)
+            if node is not None and self.floor is not None:
+                nid = f"{self.floor.name}_{node.node_id}"
+                self.route_ends = self.route_ends + [nid] if len(self.route_ends) == 1 else [nid]
+                self.refresh_preview()
             return
         QGraphicsScene.mousePressEvent(self.scene, event)
 
+    def auto_edges(self):
+        """
+        Adds the edges propose_edges suggests for the selected nodes (all nodes of the
+        floor when nothing is selected) as one undo step.
+        """
+        if propose_edges is None:
+            self.statusBar().showMessage('Auto Edges needs 전체 그래프/auto_edges.py')
+            return
+        self.edge_queue.flush()
+        picked = [n for n in self.scene.selectedItems() if isinstance(n, NodeItem) and self.nodes.get(n.node_id) is n]
+        nodes = picked or list(self.nodes.values())
+        if len(nodes) < 2:
+            return
+        index = {node: k for k, node in enumerate(nodes)}
+        xy = np.array([(n.pos().x(), n.pos().y()) for n in nodes], dtype=float)
+        existing = [(index[e.src], index[e.dst]) for e in self.edges if e.src in index and e.dst in index]
+        pairs = propose_edges(xy, [n.ntype for n in nodes], existing)
+        if not len(pairs):
+            self.statusBar().showMessage('Auto Edges: nothing to add')
+            return
+        self.undo_stack.beginMacro(f'Auto Edges ({len(pairs)})')
+        for i, j in pairs.tolist():
+            self.undo_stack.push(AddEdge(self, nodes[i].node_id, nodes[j].node_id))
+        self.undo_stack.endMacro()
+        self.statusBar().showMessage(f'Auto Edges: added {len(pairs)} edge(s) (Undo removes them)')
+
+    def on_mouse_release(self, event):
+        QGraphicsScene.mouseReleaseEvent(self.scene, event)
+        moves = {}
+        for nid, old in self.drag_start.items():
+            node = self.nodes.get(nid)
+            if node is not None and (node.pos().x(), node.pos().y()) != old:
+                moves[nid] = (old, (node.pos().x(), node.pos().y()))
+        self.drag_start = {}
+        if moves:
+            self.undo_stack.push(MoveNodes(self, moves))
+
     def apply_scale(self):
         if self.mode != 'Calibrate Scale':
             return
         selected_edges = [e for e in self.edges if e.selected]
         if not selected_edges:
             return
-        pixel_sum = sum(math.hypot(e.dst.pos().x()-e.src.pos().x(), e.dst.pos().y()-e.src.pos().y()) for e in selected_edges)
+        self.edge_queue.flush()
+        pixel_sum = float(self.edge_lengths(selected_edges).sum())
         meters, ok = QInputDialog.getDouble(self, 'Scale Calibration', f'Selected total pixel length: {pixel_sum:.2f}. Enter real-world meters:')
         if ok and pixel_sum > 0:
-            self.scale_factor = meters / pixel_sum
-            for e in self.edges:
-                e.set_scale(self.scale_factor)
+            self.undo_stack.push(SetScale(self, self.scale_factor, meters / pixel_sum))
         for e in selected_edges:
             e.toggle_selection()
 
+    def set_scale(self, scale):
+        """Apply a new meters-per-pixel scale to every edge weight in one vectorised pass."""
+        self.scale_factor = scale
+        edges = list(self.edges)
+        weights = (self.edge_lengths(edges) * scale).tolist()
+        for e, w in zip(edges, weights):
+            e.scale_factor = scale
+            e.weight = w
+        self.graph_changed()
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     editor = GraphEditor()
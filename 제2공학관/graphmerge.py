@@ -2,78 +2,126 @@ import json
 import glob
 import os
 import re
+import hashlib
+import argparse
 
-def merge_graph_json(input_pattern="*f.json", output_file="merged_graph.json"):
-    """
-    Merge multiple floor graph JSON files into a single graph.
+ELEVATOR_WEIGHT = 1.0
+STAIR_WEIGHT = 6.0
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_path(output_file):
+    return os.path.splitext(output_file)[0] + '.manifest.json'
 
-    - Discards `background` and `scale`.
-    - Prefixes each node id with its floor (e.g., "1f_123").
-    - Merges nodes and edges across floors.
-    - Adds elevator connections between adjacent floors (weight 2.0).
-    - Adds stair connections between adjacent floors (weight 6.0).
-    """
-    nodes = []
-    edges = []
-    elevator_map = {}  # floor -> {index: new_id}
-    stair_map = {}     # floor -> {index: new_id}
 
+def _floor_files(input_pattern):
     # find and sort input files by floor number
-    files = sorted(
+    return sorted(
         glob.glob(input_pattern),
         key=lambda x: int(re.search(r"(\d+)f", os.path.basename(x)).group(1))
     )
 
-    for filepath in files:
-        floor = os.path.basename(filepath).split('.')[0]  # e.g. '1f'
-        data = json.load(open(filepath, 'r', encoding='utf-8'))
-        elevator_map[floor] = {}
-        stair_map[floor] = {}
-
-        # process nodes
-        for node in data.get("nodes", []):
-            old_id = node["id"]
-            new_id = f"{floor}_{old_id}"
-            node["id"] = new_id
-
-            # record elevator and stair nodes by their index extracted from name
-            if node["type"] == "Elevator":
-                m = re.search(r"elevator(\d+)", node["name"])
-                if m:
-                    elevator_map[floor][m.group(1)] = new_id
-            elif node["type"] == "Stair":
-                m = re.search(r"stair(\d+)", node["name"])
-                if m:
-                    stair_map[floor][m.group(1)] = new_id
-
-            nodes.append(node)
-
-        # process edges
-        for edge in data.get("edges", []):
-            src = f"{floor}_{edge['source']}"
-            tgt = f"{floor}_{edge['target']}"
-            edges.append({"source": src, "target": tgt, "weight": edge["weight"]})
-            edges.append({"source": tgt, "target": src, "weight": edge["weight"]})
 
-    # add inter-floor connections for elevators and stairs
+def _load_floor(filepath):
+    """Read one floor JSON and prefix it with the floor name (see prefix_floor)."""
+    floor = os.path.basename(filepath).split('.')[0]  # e.g. '1f'
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return prefix_floor(floor, data)
+
+
+def prefix_floor(floor, data):
+    """
+    Prefix the node ids of one floor graph (editor JSON schema) with the floor name.
+    Returns (nodes, edges, elevators, stairs) where elevators/stairs map the
+    index in the node name (e.g. "elevator2" -> "2") to the new node id.
+    """
+    nodes, edges = [], []
+    elevators, stairs = {}, {}
+
+    # process nodes
+    for node in data.get("nodes", []):
+        node = dict(node)
+        old_id = node["id"]
+        new_id = f"{floor}_{old_id}"
+        node["id"] = new_id
+
+        # record elevator and stair nodes by their index extracted from name
+        if node["type"] == "Elevator":
+            m = re.search(r"elevator(\d+)", node["name"])
+            if m:
+                elevators[m.group(1)] = new_id
+        elif node["type"] == "Stair":
+            m = re.search(r"stair(\d+)", node["name"])
+            if m:
+                stairs[m.group(1)] = new_id
+
+        nodes.append(node)
+
+    # process edges
+    for edge in data.get("edges", []):
+        src = f"{floor}_{edge['source']}"
+        tgt = f"{floor}_{edge['target']}"
+        edges.append({"source": src, "target": tgt, "weight": edge["weight"]})
+        edges.append({"source": tgt, "target": src, "weight": edge["weight"]})
+
+    return nodes, edges, elevators, stairs
+
+
+def _link_floors(elevator_map, stair_map):
+    """Elevator/stair edges between adjacent floors, matched by index."""
+    edges = []
     floors = sorted(
         elevator_map.keys(),
         key=lambda f: int(re.search(r"(\d+)", f).group(1))
     )
     for i in range(len(floors) - 1):
         f1, f2 = floors[i], floors[i + 1]
-        # elevators (weight 2.0)
+        # elevators
         for idx, id1 in elevator_map[f1].items():
             id2 = elevator_map[f2].get(idx)
             if id2:
-                edges.append({"source": id1, "target": id2, "weight": 1.0})
-                edges.append({"source": id2, "target": id1, "weight": 1.0})
-        # stairs (weight 6.0)
+                edges.append({"source": id1, "target": id2, "weight": ELEVATOR_WEIGHT})
+                edges.append({"source": id2, "target": id1, "weight": ELEVATOR_WEIGHT})
+        # stairs
         for idx, id1 in stair_map[f1].items():
             id2 = stair_map[f2].get(idx)
             if id2:
-                edges.append({"source": id1, "target": id2, "weight": 6.0})
-                edges.append({"source": id2, "target": id1, "weight": 6.0})
+                edges.append({"source": id1, "target": id2, "weight": STAIR_WEIGHT})
+                edges.append({"source": id2, "target": id1, "weight": STAIR_WEIGHT})
+    return edges
+
+
+def merge_graph_json(input_pattern="*f.json", output_file="merged_graph.json"):
+    """
+    Merge multiple floor graph JSON files into a single graph.
+
+    - Discards `background` and `scale`.
+    - Prefixes each node id with its floor (e.g., "1f_123").
+    - Merges nodes and edges across floors.
+    - Adds elevator connections between adjacent floors (weight ELEVATOR_WEIGHT).
+    - Adds stair connections between adjacent floors (weight STAIR_WEIGHT).
+    """
+    nodes = []
+    edges = []
+    elevator_map = {}  # floor -> {index: new_id}
+    stair_map = {}     # floor -> {index: new_id}
+
+    for filepath in _floor_files(input_pattern):
+        floor = os.path.basename(filepath).split('.')[0]
+        f_nodes, f_edges, elevator_map[floor], stair_map[floor] = _load_floor(filepath)
+        nodes.extend(f_nodes)
+        edges.extend(f_edges)
+
+    # add inter-floor connections for elevators and stairs
+    edges.extend(_link_floors(elevator_map, stair_map))
 
     # write merged graph to output
     merged = {"nodes": nodes, "edges": edges}
@@ -81,5 +129,87 @@ def merge_graph_json(input_pattern="*f.json", output_file="merged_graph.json"):
         json.dump(merged, f, ensure_ascii=False, indent=4)
 
 
+def merge_graph_json_incremental(input_pattern="*f.json", output_file="merged_graph.json"):
+    """
+    Incremental variant of merge_graph_json producing the same output.
+
+    A manifest next to the output (merged_graph.manifest.json) records, per
+    floor file, its sha256, the slice of nodes/edges it contributed to the
+    merged output and its elevator/stair index maps. Only floors whose hash
+    changed are re-read and re-prefixed; the others are copied from the
+    previous output. Inter-floor links are always rebuilt from the maps.
+
+    Returns {"changed": [...], "removed": [...], "reused": [...]} with floor
+    file names; the output is not rewritten when nothing changed.
+    """
+    files = _floor_files(input_pattern)
+    hashes = {os.path.basename(p): file_sha256(p) for p in files}
+
+    old = {}
+    prev = None
+    mpath = manifest_path(output_file)
+    if os.path.exists(mpath) and os.path.exists(output_file):
+        with open(mpath, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        if old.get("output_sha256") != file_sha256(output_file):
+            old = {}  # output was edited by hand or by a full merge; start over
+    old_inputs = old.get("inputs", {})
+
+    changed = [name for name, h in hashes.items() if old_inputs.get(name, {}).get("sha256") != h]
+    removed = [name for name in old_inputs if name not in hashes]
+    reused = [name for name in hashes if name not in changed]
+    if not changed and not removed and old:
+        return {"changed": [], "removed": [], "reused": reused}
+    if reused:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            prev = json.load(f)
+
+    nodes, edges = [], []
+    elevator_map, stair_map = {}, {}
+    inputs = {}
+    for filepath in files:
+        name = os.path.basename(filepath)
+        floor = name.split('.')[0]
+        if name in changed:
+            f_nodes, f_edges, elevator_map[floor], stair_map[floor] = _load_floor(filepath)
+        else:
+            entry = old_inputs[name]
+            f_nodes = prev["nodes"][entry["nodes"][0]:entry["nodes"][1]]
+            f_edges = prev["edges"][entry["edges"][0]:entry["edges"][1]]
+            elevator_map[floor], stair_map[floor] = entry["elevators"], entry["stairs"]
+        inputs[name] = {
+            "sha256": hashes[name],
+            "nodes": [len(nodes), len(nodes) + len(f_nodes)],
+            "edges": [len(edges), len(edges) + len(f_edges)],
+            "elevators": elevator_map[floor],
+            "stairs": stair_map[floor],
+        }
+        nodes.extend(f_nodes)
+        edges.extend(f_edges)
+    links = _link_floors(elevator_map, stair_map)
+    manifest_links = [len(edges), len(edges) + len(links)]
+    edges.extend(links)
+
+    merged = {"nodes": nodes, "edges": edges}
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, ensure_ascii=False, indent=4)
+    manifest = {
+        "output": os.path.basename(output_file),
+        "output_sha256": file_sha256(output_file),
+        "inputs": inputs,
+        "links": manifest_links,
+    }
+    with open(mpath, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return {"changed": changed, "removed": removed, "reused": reused}
+
+
 if __name__ == "__main__":
-    merge_graph_json()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full', action='store_true', help='ignore the manifest and merge every floor')
+    args = parser.parse_args()
+    if args.full:
+        merge_graph_json()
+    else:
+        result = merge_graph_json_incremental()
+        print(f"changed: {result['changed']} removed: {result['removed']} reused: {len(result['reused'])}")